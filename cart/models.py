@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from decimal import Decimal
 
 
@@ -31,11 +31,11 @@ class Cart(models.Model):
         return f"Cart {self.id} - User {self.user_id}"
     
     def get_total(self):
-        """Calcule le total du panier."""
-        total = Decimal('0.00')
-        for item in self.items.all():
-            total += item.get_subtotal()
-        return total
+        """Calcule le total du panier (SUM côté SQL)."""
+        total = self.items.aggregate(
+            total=models.Sum(models.F('price_snapshot') * models.F('quantity'))
+        )['total']
+        return total if total is not None else Decimal('0.00')
     
     def get_items_count(self):
         """Nombre total d'items dans le panier."""
@@ -123,18 +123,22 @@ class CartItem(models.Model):
     def update_quantity(self, new_quantity):
         """
         Met à jour la quantité avec validation du stock.
+        La nouvelle quantité est réservée pour ce panier (voir hold_stock).
         """
+        from products.queries_stock import hold_stock
+        
         if new_quantity <= 0:
             raise ValueError("La quantité doit être supérieure à 0")
         
-        # Vérifier le stock disponible
-        product = self.get_product_details()
-        if not product:
-            raise ValueError("Produit introuvable")
-        
-        if new_quantity > product['stock']:
-            raise ValueError(f"Stock insuffisant. Disponible : {product['stock']}")
-        
-        self.quantity = new_quantity
-        self.save()
+        with transaction.atomic():
+            # Vérifier et réserver le stock disponible
+            held, available = hold_stock(self.cart_id, self.id, self.product_id, new_quantity)
+            if available is None:
+                raise ValueError("Produit introuvable")
+            
+            if not held:
+                raise ValueError(f"Stock insuffisant. Disponible : {available}")
+            
+            self.quantity = new_quantity
+            self.save()
         return self
\ No newline at end of file
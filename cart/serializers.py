@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Cart, CartItem
+from .view_models import CartViewModel
 from decimal import Decimal
 
 
@@ -30,9 +31,15 @@ class CartItemSerializer(serializers.ModelSerializer):
     def get_product_details(self, obj):
         """
         Récupère les détails du produit depuis les queries SQL.
+        Utilise context['products'] (chargé en une requête) s'il est fourni.
         """
         from products import queries as product_queries
-        product = product_queries.get_product_detail(obj.product_id)
+        
+        products = self.context.get('products')
+        if products is not None:
+            product = products.get(obj.product_id)
+        else:
+            product = product_queries.get_product_detail(obj.product_id)
         
         if not product:
             return None
@@ -56,64 +63,52 @@ class CartItemSerializer(serializers.ModelSerializer):
 
 
 class CartSerializer(serializers.ModelSerializer):
-    """Serializer pour le panier complet."""
-    
-    items = CartItemSerializer(many=True, read_only=True)
-    total = serializers.SerializerMethodField()
-    items_count = serializers.SerializerMethodField()
-    items_by_producer = serializers.SerializerMethodField()
+    """
+    Serializer pour le panier complet.
+    Accepte un Cart ou un CartViewModel : les items, les produits, le total
+    et le groupement par producteur viennent de la vue (aucune requête par item).
+    """
     
     class Meta:
         model = Cart
         fields = [
             'id',
             'user_id',
-            'items',
-            'items_count',
-            'total',
-            'items_by_producer',
             'created_at',
             'updated_at'
         ]
         read_only_fields = ['id', 'user_id', 'created_at', 'updated_at']
     
-    def get_total(self, obj):
-        """Calcule le total du panier."""
-        return float(obj.get_total())
-    
-    def get_items_count(self, obj):
-        """Nombre d'items dans le panier."""
-        return obj.get_items_count()
-    
-    def get_items_by_producer(self, obj):
-        """
-        Groupe les items par producteur.
-        Utile pour afficher le panier organisé par producteur.
-        """
-        items_by_producer = {}
+    def to_representation(self, instance):
+        if isinstance(instance, CartViewModel):
+            view = instance
+        else:
+            view = CartViewModel.load(instance)
         
-        for item in obj.items.all():
-            product = item.get_product_details()
-            if not product:
-                continue
-            
-            producer_id = str(product['producer_id'])
-            
-            if producer_id not in items_by_producer:
-                items_by_producer[producer_id] = {
-                    'producer_id': product['producer_id'],
-                    'shop_name': product['shop_name'],
-                    'city': product.get('city'),
-                    'wilaya': product.get('wilaya'),
-                    'items': [],
-                    'subtotal': 0.0
-                }
-            
-            item_data = CartItemSerializer(item).data
-            items_by_producer[producer_id]['items'].append(item_data)
-            items_by_producer[producer_id]['subtotal'] += float(item.get_subtotal())
+        data = super().to_representation(view.cart)
         
-        return list(items_by_producer.values())
+        # Chaque item est sérialisé une seule fois, puis réutilisé dans les groupes
+        item_context = {**self.context, 'products': view.products}
+        items_data = {
+            item.id: CartItemSerializer(item, context=item_context).data
+            for item in view.items
+        }
+        
+        items_by_producer = [
+            {**group, 'items': [items_data[item.id] for item in group['items']]}
+            for group in view.items_by_producer.values()
+        ]
+        
+        return {
+            'id': data['id'],
+            'user_id': data['user_id'],
+            'items': list(items_data.values()),
+            'items_count': view.items_count,
+            'total': float(view.total),
+            'items_by_producer': items_by_producer,
+            'created_at': data['created_at'],
+            'updated_at': data['updated_at']
+        }
 
 
 class AddToCartSerializer(serializers.Serializer):
@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+
+class CartViewModel:
+    """
+    Vue précalculée d'un panier pour l'affichage.
+
+    Charge les items du panier puis tous les produits/producteurs en deux
+    requêtes, et calcule le total, le nombre d'items et le groupement par
+    producteur en un seul passage.
+    """
+
+    def __init__(self, cart, items, products):
+        self.cart = cart
+        self.items = items
+        self.products = products
+
+        self.total = Decimal('0.00')
+        self.items_by_producer = {}
+
+        for item in items:
+            subtotal = item.get_subtotal()
+            self.total += subtotal
+
+            product = products.get(item.product_id)
+            if not product:
+                continue
+
+            producer_id = str(product['producer_id'])
+
+            if producer_id not in self.items_by_producer:
+                self.items_by_producer[producer_id] = {
+                    'producer_id': product['producer_id'],
+                    'shop_name': product['shop_name'],
+                    'city': product.get('city'),
+                    'wilaya': product.get('wilaya'),
+                    'items': [],
+                    'subtotal': 0.0
+                }
+
+            group = self.items_by_producer[producer_id]
+            group['items'].append(item)
+            group['subtotal'] += float(subtotal)
+
+    @classmethod
+    def load(cls, cart, items=None, products=None):
+        """
+        Construit la vue du panier.
+        Requêtes : les items (sauf si fournis) + les produits (sauf si fournis).
+        """
+        from products import queries as product_queries
+
+        if items is None:
+            items = list(cart.items.order_by('id'))
+
+        if products is None:
+            products = product_queries.get_product_details_bulk(
+                [item.product_id for item in items]
+            )
+
+        return cls(cart, items, products)
+
+    @property
+    def items_count(self):
+        return len(self.items)
+
+    def get_item(self, item_id):
+        """Retourne l'item du panier correspondant (ou None)."""
+        for item in self.items:
+            if item.id == int(item_id):
+                return item
+        return None
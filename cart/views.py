@@ -5,12 +5,14 @@ from rest_framework.permissions import IsAuthenticated
 from django.db import transaction
 
 from .models import Cart, CartItem
+from .view_models import CartViewModel
 from .serializers import (
     CartSerializer,
     CartItemSerializer,
     AddToCartSerializer,
     UpdateCartItemSerializer
 )
+from products.queries_stock import get_available_stock, hold_stock
 from users.authentication import CustomJWTAuthentication
 from users.permissions import CanBuyProducts
 
@@ -35,7 +37,7 @@ class CartViewSet(viewsets.ViewSet):
         Récupère le panier de l'utilisateur connecté.
         """
         cart = self.get_or_create_cart(request.user.id)
-        serializer = CartSerializer(cart)
+        serializer = CartSerializer(CartViewModel.load(cart))
         
         return Response({
             'message': 'Votre panier',
@@ -95,13 +97,24 @@ class CartViewSet(viewsets.ViewSet):
                 if not created:
                     # Produit déjà dans le panier : mettre à jour la quantité
                     new_quantity = cart_item.quantity + quantity
-                    
-                    if new_quantity > product['stock']:
-                        return Response({
-                            'error': f"Stock insuffisant. Vous avez déjà {cart_item.quantity} "
-                                   f"dans votre panier. Stock disponible : {product['stock']}"
-                        }, status=status.HTTP_400_BAD_REQUEST)
-                    
+                else:
+                    new_quantity = quantity
+                
+                # Réserver la quantité pour ce panier (stock - réservations des autres paniers)
+                held, available = hold_stock(cart.id, cart_item.id, product_id, new_quantity)
+                
+                if not held:
+                    transaction.set_rollback(True)
+                    if not created:
+                        error = (f"Stock insuffisant. Vous avez déjà {cart_item.quantity} "
+                                 f"dans votre panier. Stock disponible : {available}")
+                    else:
+                        error = f"Stock insuffisant. Disponible : {available}"
+                    return Response({
+                        'error': error
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                
+                if not created:
                     cart_item.quantity = new_quantity
                     cart_item.save()
                     message = f"Quantité mise à jour : {cart_item.quantity}"
@@ -109,12 +122,12 @@ class CartViewSet(viewsets.ViewSet):
                     message = "Produit ajouté au panier"
                 
                 # Retourner le panier mis à jour
-                cart_serializer = CartSerializer(cart)
+                view = CartViewModel.load(cart)
                 
                 return Response({
                     'message': message,
-                    'cart': cart_serializer.data,
-                    'item': CartItemSerializer(cart_item).data
+                    'cart': CartSerializer(view).data,
+                    'item': CartItemSerializer(cart_item, context={'products': view.products}).data
                 }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
         
         except Exception as e:
@@ -150,12 +163,12 @@ class CartViewSet(viewsets.ViewSet):
             cart_item.update_quantity(new_quantity)
             
             # Retourner le panier mis à jour
-            cart_serializer = CartSerializer(cart)
+            view = CartViewModel.load(cart)
             
             return Response({
                 'message': 'Quantité mise à jour',
-                'cart': cart_serializer.data,
-                'item': CartItemSerializer(cart_item).data
+                'cart': CartSerializer(view).data,
+                'item': CartItemSerializer(cart_item, context={'products': view.products}).data
             })
         
         except CartItem.DoesNotExist:
@@ -188,11 +201,11 @@ class CartViewSet(viewsets.ViewSet):
             cart_item.delete()
             
             # Retourner le panier mis à jour
-            cart_serializer = CartSerializer(cart)
+            view = CartViewModel.load(cart)
             
             return Response({
                 'message': 'Produit retiré du panier',
-                'cart': cart_serializer.data
+                'cart': CartSerializer(view).data
             })
         
         except CartItem.DoesNotExist:
@@ -215,9 +228,12 @@ class CartViewSet(viewsets.ViewSet):
             cart = self.get_or_create_cart(request.user.id)
             cart.items.all().delete()
             
+            # Panier vide : aucune requête supplémentaire
+            view = CartViewModel(cart, items=[], products={})
+            
             return Response({
                 'message': 'Panier vidé',
-                'cart': CartSerializer(cart).data
+                'cart': CartSerializer(view).data
             })
         
         except Exception as e:
@@ -245,8 +261,15 @@ class CartViewSet(viewsets.ViewSet):
         
         from products import queries as product_queries
         
-        for item in cart.items.all():
-            product = product_queries.get_product_detail(item.product_id)
+        items = list(cart.items.all())
+        products = product_queries.get_product_details_bulk(
+            [item.product_id for item in items]
+        )
+        # Stock réellement disponible pour ce panier (hors réservations des autres)
+        available_stock = get_available_stock(products.keys(), cart_id=cart.id)
+        
+        for item in items:
+            product = products.get(item.product_id)
             
             if not product:
                 errors.append({
@@ -257,13 +280,14 @@ class CartViewSet(viewsets.ViewSet):
                 continue
             
             # Vérifier le stock
-            if item.quantity > product['stock']:
+            available = available_stock.get(item.product_id, product['stock'])
+            if item.quantity > available:
                 errors.append({
                     'item_id': item.id,
                     'product_name': product['name'],
                     'quantity_requested': float(item.quantity),
-                    'stock_available': float(product['stock']),
-                    'error': f"Stock insuffisant. Disponible : {product['stock']}"
+                    'stock_available': float(available),
+                    'error': f"Stock insuffisant. Disponible : {available}"
                 })
             
             # Vérifier si le prix a changé
@@ -289,5 +313,5 @@ class CartViewSet(viewsets.ViewSet):
             'valid': True,
             'warnings': warnings,
             'message': 'Votre panier est prêt pour la commande',
-            'cart': CartSerializer(cart).data
+            'cart': CartSerializer(CartViewModel(cart, items, products)).data
         })
\ No newline at end of file
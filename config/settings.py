@@ -101,6 +101,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'products.middleware.ProductIdentityMapMiddleware',  # Request-scoped product rows
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -200,6 +201,33 @@ DATABASES = {
 >>>>>>> 33f7a2d22d51c7734ecadb4759a1c8c2dc77ec6b
 
 
+# ==============================================================================
+# CACHE
+# ==============================================================================
+
+# Product details, principals and profile versions are cached
+# here: every gunicorn worker must see the same cache, otherwise a write
+# handled by one worker is never seen by the others. Their versions are
+# read on every request, so the cache must also be in memory: serving
+# without Redis is refused at startup unless DEBUG (users/apps.py).
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    # One process only: runserver, tests, management commands
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
 # ==============================================================================
 # PASSWORD VALIDATION
 # ==============================================================================
@@ -343,6 +371,17 @@ SIMPLE_JWT = {
     'JTI_CLAIM': 'jti',
 }
 
+# Stateless auth: build request.user from the access token claims (profile
+# ids, is_active, profile_version) instead of loading the user. Needs a
+# cache shared by every worker, which holds the profile versions: refused at
+# startup without one (users/apps.py).
+AUTH_STATELESS_TOKENS = config('AUTH_STATELESS_TOKENS', default=False, cast=bool)
+
+# Request threads per gunicorn worker (gunicorn --threads, see Procfile).
+# The password hashing pool admits at most half of them, so a login storm
+# always leaves request threads for the catalogue.
+WEB_THREADS = config('WEB_THREADS', default=4, cast=int)
+
 
 # ==============================================================================
 # CORS CONFIGURATION
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_wsgi_application()
+
+# Every worker must share the versioned caches (needs the apps loaded above)
+from users.apps import check_serving_cache  # noqa: E402
+
+check_serving_cache()
@@ -11,18 +11,15 @@ def django_db_setup():
     Configure test database.
     Uses the same database as development but with transaction rollback.
     """
-    settings.DATABASES['default'] = {
+    # Updated in place: connections opened by other threads read this
+    # dict, with the defaults Django already filled in (TIME_ZONE, ...)
+    settings.DATABASES['default'].update({
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': settings.DATABASES['default']['NAME'],
-        'USER': settings.DATABASES['default']['USER'],
-        'PASSWORD': settings.DATABASES['default']['PASSWORD'],
-        'HOST': settings.DATABASES['default']['HOST'],
-        'PORT': settings.DATABASES['default']['PORT'],
         'ATOMIC_REQUESTS': True,
         'OPTIONS': {
             'client_encoding': 'UTF8',
         }
-    }
+    })
 
 
 @pytest.fixture(scope='function')
@@ -47,9 +44,60 @@ def clean_db(django_db_setup, django_db_blocker):
             cursor.execute("SET CONSTRAINTS ALL IMMEDIATE;")
 
 
+@pytest.fixture
+def producer_products():
+    """Create a producer with 10 products, return their ids."""
+    from django.core.cache import cache
+    from django.db import connection
+    from products.product_cache import clear_local_product_cache
+
+    cache.clear()
+    clear_local_product_cache()
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO users (email, password, user_type, first_name, last_name)
+            VALUES ('bulk.producer@example.com', '!', 'producer', 'Bulk', 'Producer')
+            RETURNING id
+        """)
+        user_id = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO producers (user_id, shop_name, city, wilaya)
+            VALUES (%s, 'Bulk Farm', 'Blida', 'Blida')
+            RETURNING id
+        """, [user_id])
+        producer_id = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO products (producer_id, name, sale_type, price, stock, product_type)
+            SELECT %s, 'Bulk product ' || g, 'unit', 100, 50, 'fresh'
+            FROM generate_series(1, 10) AS g
+            RETURNING id
+        """, [producer_id])
+        product_ids = [row[0] for row in cursor.fetchall()]
+
+    yield product_ids
+
+    cache.clear()
+    clear_local_product_cache()
+
+
+@pytest.fixture
+def warm_revocation_filter(monkeypatch):
+    """Load the revoked token filter once, then stop polling it."""
+    from users import revocation
+
+    revocation.reset_revocation_filter()
+    revocation.is_token_revoked({})
+    monkeypatch.setattr(revocation, 'REVOCATION_POLL_INTERVAL', float('inf'))
+
+    yield
+
+    revocation.reset_revocation_filter()
+
+
 # Pytest configuration
 def pytest_configure(config):
     """Configure pytest settings."""
     # Suppress warnings if needed
     import warnings
-    warnings.filterwarnings('ignore', category=DeprecationWarning)
\ No newline at end of file
+    warnings.filterwarnings('ignore', category=DeprecationWarning)
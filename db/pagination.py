@@ -0,0 +1,164 @@
+"""
+Keyset (cursor) pagination helpers for DZ-Fellah.
+
+List queries order rows by a fixed sort key ending with the primary key,
+e.g. (created_at DESC, id DESC). Instead of OFFSET, the next page starts
+strictly after the last row of the previous one:
+
+    WHERE (p.created_at, p.id) < (%s, %s)
+    ORDER BY p.created_at DESC, p.id DESC
+    LIMIT page_size + 1
+
+The extra row only tells whether a next page exists. Cursors handed to
+clients are opaque url-safe strings encoding the sort key of the last row.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Accepted cursor value types of each sort key column
+CURSOR_VALUE_TYPES = {
+    'created_at': (datetime,),
+    'id': (int,),
+    'search_rank': (float, int),
+    'similarity': (float, int),
+}
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor that cannot be decoded."""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'n': str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        if 'n' in value:
+            return Decimal(value['n'])
+        raise InvalidCursor('Unknown cursor value')
+    return value
+
+
+def encode_cursor(values):
+    """Encode a sort key (list of values) into an opaque cursor string."""
+    payload = json.dumps([_encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, key_fields):
+    """
+    Decode a cursor produced by encode_cursor for the sort key key_fields.
+
+    Returns None when no cursor was sent, the list of sort key values
+    otherwise. Raises InvalidCursor for anything else, including values
+    whose type does not match their column (CURSOR_VALUE_TYPES).
+    """
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+
+    if not isinstance(values, list) or len(values) != len(key_fields):
+        raise InvalidCursor('Cursor does not match this listing')
+
+    try:
+        values = [_decode_value(value) for value in values]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(str(e))
+
+    for field, value in zip(key_fields, values):
+        # bool is an int subclass
+        if isinstance(value, bool) or not isinstance(value, CURSOR_VALUE_TYPES[field]):
+            raise InvalidCursor(f'Invalid cursor value for {field}')
+
+    return values
+
+
+def keyset_condition(columns):
+    """
+    Build the "after this row" condition for a DESC sort key.
+
+    Example:
+        keyset_condition(['p.created_at', 'p.id'])
+        # '(p.created_at, p.id) < (%s, %s)'
+    """
+    placeholders = ', '.join(['%s'] * len(columns))
+    return f"({', '.join(columns)}) < ({placeholders})"
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE):
+    """Parse a ?limit= query param, clamped to 1..MAX_PAGE_SIZE."""
+    try:
+        page_size = int(value) if value not in (None, '') else default
+    except (TypeError, ValueError):
+        page_size = default
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def paginate(rows, page_size, key_fields):
+    """
+    Trim a page fetched with LIMIT page_size + 1 and build the next cursor.
+
+    key_fields are the row keys holding the sort key, in ORDER BY order.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    if len(rows) <= page_size:
+        return rows, None
+
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor([last[field] for field in key_fields])
+
+
+def paginate_queryset(queryset, cursor, page_size, key_fields=('created_at', 'id')):
+    """
+    Django ORM version of the keyset pagination above.
+
+    Orders the queryset by key_fields DESC, keeps the rows after the cursor
+    and fetches page_size + 1 of them. Returns (objects, next_cursor);
+    raises InvalidCursor like decode_cursor.
+
+    The (a, b) < (x, y) condition is spelled a <= x AND (a < x OR (a = x AND
+    b < y)) so an index on (..., a DESC) still bounds the scan.
+    """
+    from django.db.models import Q
+
+    after = decode_cursor(cursor, key_fields)
+    queryset = queryset.order_by(*[f'-{field}' for field in key_fields])
+
+    if after is not None:
+        condition = Q()
+        for position, field in enumerate(key_fields):
+            equal = dict(zip(key_fields[:position], after[:position]))
+            condition |= Q(**equal, **{f'{field}__lt': after[position]})
+        queryset = queryset.filter(**{f'{key_fields[0]}__lte': after[0]}).filter(condition)
+
+    objects = list(queryset[:page_size + 1])
+    if len(objects) <= page_size:
+        return objects, None
+
+    objects = objects[:page_size]
+    last = objects[-1]
+    return objects, encode_cursor([getattr(last, field) for field in key_fields])
@@ -0,0 +1,24 @@
+-- ============================================
+-- AUTH SCHEMA - PostgreSQL
+-- DZ-Fellah Marketplace
+-- ============================================
+
+-- ============================================
+-- REVOKED TOKENS TABLE
+-- One row per revoked access token (logout: jti), or per user (password
+-- change, deactivation: every token of user_id issued before
+-- issued_before). Rows are useless once expires_at is past.
+-- Mirrored in memory by users/revocation.py.
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    id BIGSERIAL PRIMARY KEY,
+    jti VARCHAR(255) UNIQUE,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    issued_before TIMESTAMPTZ,
+    expires_at TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    CHECK (jti IS NOT NULL OR (user_id IS NOT NULL AND issued_before IS NOT NULL))
+);
+
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON revoked_tokens(expires_at);
@@ -0,0 +1,125 @@
+"""
+Search helpers for DZ-Fellah (full-text and trigram matching).
+
+Products, producers and seasonal baskets keep a ``search_vector`` tsvector
+column up to date through triggers (see
+products/migrations/0006_full_text_search.sql). The vectors are built with
+the French, English and Arabic configurations, so a search term is parsed
+with the same three configurations and the resulting queries are OR-ed.
+
+Every word of the search term is treated as a prefix ("toma" finds
+"tomates"), and all words must match.
+"""
+
+import re
+
+
+# Text search configurations used for both documents and queries
+SEARCH_CONFIGS = ('french', 'english', 'arabic')
+
+# ts_headline options for result snippets (SQL expression): matches are
+# delimited by chr(2)/chr(3), turned into <mark> tags once the snippet is
+# escaped (headline_sql)
+HEADLINE_OPTIONS = "'StartSel=' || chr(2) || ', StopSel=' || chr(3) || ', MaxWords=35, MinWords=15, MaxFragments=2'"
+
+# HTML escapes applied to snippets (& first)
+HTML_ESCAPES = (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'), ('"', '&quot;'), ("'", '&#x27;'))
+
+# Words longer than this are truncated before building the query
+MAX_TERM_LENGTH = 64
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def build_prefix_query(term):
+    """
+    Turn free text into a to_tsquery() expression.
+
+    Example:
+        build_prefix_query("Tomates cerises!")
+        # 'Tomates:* & cerises:*'
+
+    Returns None when the term has no searchable word.
+    """
+    if not term:
+        return None
+
+    words = [word[:MAX_TERM_LENGTH] for word in _WORD_RE.findall(term)]
+    if not words:
+        return None
+
+    return ' & '.join(f'{word}:*' for word in words)
+
+
+def tsquery_sql(term):
+    """
+    Build the SQL expression and params for a multi-language tsquery.
+
+    Returns (sql, params), or (None, []) when the term has no searchable
+    word. The expression is meant to be selected once in a CTE:
+
+        WITH q AS (SELECT <sql> AS query) ...
+
+    PostgreSQL: unaccent() folds accents so "legumes" finds "légumes".
+    """
+    query_text = build_prefix_query(term)
+    if query_text is None:
+        return None, []
+
+    parts = [
+        f"to_tsquery('{config}', unaccent(%s))"
+        for config in SEARCH_CONFIGS
+    ]
+    return '(' + ' || '.join(parts) + ')', [query_text] * len(SEARCH_CONFIGS)
+
+
+# ============================================
+# TRIGRAM (SUBSTRING / FUZZY) MATCHING
+# ============================================
+
+def substring_match_sql(column, term, fuzzy=False):
+    """
+    Build a WHERE fragment matching term inside column.
+
+    The plain mode is the historical ILIKE '%term%'. The fuzzy mode also
+    accepts typos ("Tizi Ouzo", "Algre") through pg_trgm word similarity.
+
+    Returns (sql, params).
+
+    PostgreSQL: ILIKE and <% are both served by the gin_trgm_ops index on
+    column (see products/migrations/0007_trigram_indexes.sql).
+    """
+    if fuzzy:
+        return f"({column} ILIKE %s OR %s <%% {column})", [f'%{term}%', term]
+    return f"{column} ILIKE %s", [f'%{term}%']
+
+
+def similarity_rank_sql(matches):
+    """
+    Build an ORDER BY expression ranking rows by their best fuzzy match.
+
+    matches is a list of (column, term) pairs. Returns (sql, params).
+    The rank is a float8, so a cursor holding it compares equal to it.
+    """
+    parts = [f"word_similarity(%s, {column})::float8" for column, _ in matches]
+    params = [term for _, term in matches]
+    if len(parts) == 1:
+        return parts[0], params
+    return 'GREATEST(' + ', '.join(parts) + ')', params
+
+
+def headline_sql(document, query):
+    """
+    ts_headline() snippet of a text column, safe to render as HTML.
+
+    The snippet is computed on the raw text (search terms never match
+    inside an entity), HTML-escaped like django.utils.html.escape, then its
+    matches are wrapped in <mark></mark>: the only tags of the result.
+
+    Example:
+        f"SELECT {headline_sql('p.shop_name', 'q.query')} AS shop_name_highlight ..."
+    """
+    sql = f"ts_headline('french', {document}, {query}, {HEADLINE_OPTIONS})"
+    for char, entity in HTML_ESCAPES:
+        sql = "replace({}, '{}', '{}')".format(sql, char.replace("'", "''"), entity)
+    return f"replace(replace({sql}, chr(2), '<mark>'), chr(3), '</mark>')"
@@ -74,6 +74,40 @@ def get_user_by_id(user_id):
         return dict_fetchone(cursor)
 
 
+def get_users_by_ids(user_ids):
+    """
+    Get several users by ID with profile data - SINGLE QUERY.
+    PostgreSQL: = ANY(array) instead of one query per user.
+    
+    Returns:
+        dict: {user_id: row}, same rows as get_user_by_id
+    """
+    user_ids = list(set(user_ids))
+    if not user_ids:
+        return {}
+    
+    sql = """
+        SELECT 
+            u.id, u.email, u.user_type, u.first_name, u.last_name,
+            u.phone, u.is_active, u.is_verified, u.created_at, u.updated_at,
+            p.id as producer_id, p.shop_name, p.description as producer_description,
+            p.photo_url as producer_photo, p.address as producer_address,
+            p.city as producer_city, p.wilaya as producer_wilaya,
+            p.methods, p.is_bio_certified, p.created_at as producer_created_at,
+            c.id as client_id, c.address as client_address,
+            c.city as client_city, c.wilaya as client_wilaya,
+            c.created_at as client_created_at
+        FROM users u
+        LEFT JOIN producers p ON u.id = p.user_id
+        LEFT JOIN clients c ON u.id = c.user_id
+        WHERE u.id = ANY(%s)
+    """
+    
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_ids])
+        return {row['id']: row for row in dict_fetchall(cursor)}
+
+
 def email_exists(email):
     """
     Check if email already exists.
@@ -188,6 +222,30 @@ def get_producer_profile_by_id(producer_id):
         return dict_fetchone(cursor)
 
 
+def get_producer_profiles_by_ids(producer_ids):
+    """
+    Get several producer profiles by producer ID - SINGLE QUERY.
+    PostgreSQL: = ANY(array) instead of one query per producer.
+    
+    Returns:
+        dict: {producer_id: row}, same rows as get_producer_profile_by_id
+    """
+    producer_ids = list(set(producer_ids))
+    if not producer_ids:
+        return {}
+    
+    sql = """
+        SELECT id, user_id, shop_name, description, photo_url, address,
+               city, wilaya, methods, is_bio_certified, created_at, updated_at
+        FROM producers
+        WHERE id = ANY(%s)
+    """
+    
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [producer_ids])
+        return {row['id']: row for row in dict_fetchall(cursor)}
+
+
 def update_producer_profile(user_id, updates):
     """
     Update producer profile with provided fields.
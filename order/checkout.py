@@ -0,0 +1,93 @@
+from decimal import Decimal
+
+from .models import Order, SubOrder, OrderItem
+from .numbering import format_sub_order_number
+
+
+def _set_prefetched(instance, related_name, objects):
+    """Remplit le cache de prefetch_related d'une relation inverse."""
+    queryset = getattr(instance, related_name).all()
+    queryset._result_cache = list(objects)
+    queryset._prefetch_done = True
+    instance._prefetched_objects_cache = {related_name: queryset}
+
+
+def materialize_order(client_id, cart_items, products, **order_fields):
+    """
+    Crée la commande, ses sous-commandes et ses items en quelques requêtes.
+
+    Les sous-totaux et le total sont calculés en mémoire à partir des items
+    du panier et des produits déjà chargés, puis écrits une seule fois :
+    1 INSERT pour la commande, 1 bulk_create pour les sous-commandes,
+    1 bulk_create pour les items, quel que soit le nombre de lignes.
+
+    La commande retournée a ses sous-commandes et leurs items déjà en cache
+    (aucune requête pour les relire lors de la sérialisation).
+    """
+    # 1. Grouper les lignes par producteur (ordre d'apparition dans le panier)
+    lines_by_producer = {}
+
+    for cart_item in cart_items:
+        product = products.get(cart_item.product_id)
+
+        if not product:
+            raise ValueError(f"Produit {cart_item.product_id} introuvable")
+
+        lines_by_producer.setdefault(product['producer_id'], []).append(
+            (cart_item, product)
+        )
+
+    # 2. Calculer les sous-totaux et le total en mémoire
+    subtotals = {
+        producer_id: sum(
+            (cart_item.price_snapshot * cart_item.quantity for cart_item, _ in lines),
+            Decimal('0.00')
+        )
+        for producer_id, lines in lines_by_producer.items()
+    }
+
+    # 3. Commande parent, avec son total définitif
+    order = Order.objects.create(
+        client_id=client_id,
+        status='pending',
+        total_amount=sum(subtotals.values(), Decimal('0.00')),
+        **order_fields
+    )
+
+    # 4. Sous-commandes (une par producteur)
+    sub_orders = SubOrder.objects.bulk_create([
+        SubOrder(
+            parent_order=order,
+            producer_id=producer_id,
+            sub_order_number=format_sub_order_number(order.order_number, index),
+            status='pending',
+            subtotal=subtotals[producer_id]
+        )
+        for index, producer_id in enumerate(lines_by_producer, start=1)
+    ])
+
+    # 5. Items de commande
+    items_by_sub_order = {
+        sub_order.producer_id: [
+            OrderItem(
+                sub_order=sub_order,
+                product_id=product['id'],
+                product_name=product['name'],
+                quantity_ordered=cart_item.quantity,
+                unit_price=cart_item.price_snapshot,
+                sale_type=product['sale_type']
+            )
+            for cart_item, product in lines_by_producer[sub_order.producer_id]
+        ]
+        for sub_order in sub_orders
+    }
+    OrderItem.objects.bulk_create([
+        item for items in items_by_sub_order.values() for item in items
+    ])
+
+    # Relations déjà connues : évite de les relire pour la réponse
+    for sub_order in sub_orders:
+        _set_prefetched(sub_order, 'items', items_by_sub_order[sub_order.producer_id])
+    _set_prefetched(order, 'sub_orders', sub_orders)
+
+    return order
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+# next_order_number_value(day): nextval() of a per-day sequence, created on
+# first use. Sequences never block concurrent checkouts and never hand out
+# the same value twice; rolled back checkouts only leave gaps.
+CREATE_FUNCTION = """
+CREATE OR REPLACE FUNCTION next_order_number_value(p_day DATE)
+RETURNS BIGINT AS $$
+DECLARE
+    seq_name TEXT := 'order_number_seq_' || to_char(p_day, 'YYYYMMDD');
+BEGIN
+    BEGIN
+        RETURN nextval(seq_name);
+    EXCEPTION WHEN undefined_table THEN
+        -- First order of the day (or a concurrent checkout creating it)
+        BEGIN
+            EXECUTE format('CREATE SEQUENCE IF NOT EXISTS %I', seq_name);
+        EXCEPTION WHEN unique_violation OR duplicate_table THEN
+            NULL;
+        END;
+        RETURN nextval(seq_name);
+    END;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+DROP_FUNCTION = "DROP FUNCTION IF EXISTS next_order_number_value(DATE);"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("order", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_FUNCTION, DROP_FUNCTION),
+    ]
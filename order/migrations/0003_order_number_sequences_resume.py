@@ -0,0 +1,71 @@
+from django.db import migrations
+
+
+# A new day's sequence continues after the orders already numbered that day
+# (orders created before 0002, or a sequence dropped with
+# drop_past_order_number_sequences), so it never hands out a taken number.
+# CREATE SEQUENCE without IF NOT EXISTS: only the session that creates the
+# sequence sets its start; the others wait for it, then use it.
+CREATE_FUNCTION = """
+CREATE OR REPLACE FUNCTION next_order_number_value(p_day DATE)
+RETURNS BIGINT AS $$
+DECLARE
+    day_text TEXT := to_char(p_day, 'YYYYMMDD');
+    seq_name TEXT := 'order_number_seq_' || day_text;
+    last_value BIGINT;
+BEGIN
+    BEGIN
+        RETURN nextval(seq_name);
+    EXCEPTION WHEN undefined_table THEN
+        -- First order of the day (or a concurrent checkout creating it)
+        BEGIN
+            EXECUTE format('CREATE SEQUENCE %I', seq_name);
+
+            SELECT MAX(substring(order_number FROM '^DZF-[0-9]{8}-([0-9]+)$')::BIGINT)
+            INTO last_value
+            FROM orders
+            WHERE order_number LIKE 'DZF-' || day_text || '-%';
+
+            IF last_value IS NOT NULL THEN
+                PERFORM setval(seq_name, last_value);
+            END IF;
+        EXCEPTION WHEN unique_violation OR duplicate_table THEN
+            NULL;
+        END;
+        RETURN nextval(seq_name);
+    END;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# Function of 0002
+REVERSE_FUNCTION = """
+CREATE OR REPLACE FUNCTION next_order_number_value(p_day DATE)
+RETURNS BIGINT AS $$
+DECLARE
+    seq_name TEXT := 'order_number_seq_' || to_char(p_day, 'YYYYMMDD');
+BEGIN
+    BEGIN
+        RETURN nextval(seq_name);
+    EXCEPTION WHEN undefined_table THEN
+        BEGIN
+            EXECUTE format('CREATE SEQUENCE IF NOT EXISTS %I', seq_name);
+        EXCEPTION WHEN unique_violation OR duplicate_table THEN
+            NULL;
+        END;
+        RETURN nextval(seq_name);
+    END;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("order", "0002_order_number_sequences"),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_FUNCTION, REVERSE_FUNCTION),
+    ]
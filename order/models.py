@@ -1,7 +1,21 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from decimal import Decimal
 
 
+def _items_total_subquery(sub_order_ref):
+    """SUM(prix × quantité réelle ou commandée) des items d'une sous-commande."""
+    return Subquery(
+        OrderItem.objects.filter(sub_order=sub_order_ref)
+        .values('sub_order')
+        .annotate(total=Sum(F('unit_price') * Coalesce('quantity_actual', 'quantity_ordered')))
+        .values('total')[:1],
+        output_field=models.DecimalField(max_digits=10, decimal_places=2)
+    )
+
+
 class Order(models.Model):
     """
     Commande Parent - Vue globale pour le client.
@@ -88,13 +102,8 @@ class Order(models.Model):
     def save(self, *args, **kwargs):
         """Génère automatiquement le numéro de commande."""
         if not self.order_number:
-            from datetime import datetime
-            date_str = datetime.now().strftime('%Y%m%d')
-            # Compte les commandes du jour
-            today_orders = Order.objects.filter(
-                order_number__startswith=f'DZF-{date_str}'
-            ).count()
-            self.order_number = f'DZF-{date_str}-{today_orders + 1:04d}'
+            from .numbering import next_order_number
+            self.order_number = next_order_number()
         super().save(*args, **kwargs)
     
     def get_sub_orders_count(self):
@@ -102,13 +111,24 @@ class Order(models.Model):
         return self.sub_orders.count()
     
     def update_total(self):
-        """Recalcule le total depuis les sous-commandes."""
-        total = Decimal('0.00')
-        for sub_order in self.sub_orders.all():
-            total += sub_order.get_total()
-        self.total_amount = total
-        self.save()
-        return total
+        """
+        Recalcule le total depuis les subtotals stockés des sous-commandes.
+        Un seul UPDATE ... SET total_amount = (SELECT SUM(...)), sans
+        parcourir les sous-commandes en Python.
+        """
+        subtotals = Subquery(
+            SubOrder.objects.filter(parent_order=OuterRef('pk'))
+            .values('parent_order')
+            .annotate(total=Sum('subtotal'))
+            .values('total')[:1],
+            output_field=models.DecimalField(max_digits=10, decimal_places=2)
+        )
+        Order.objects.filter(pk=self.pk).update(
+            total_amount=Coalesce(subtotals, Decimal('0.00')),
+            updated_at=timezone.now()
+        )
+        self.refresh_from_db(fields=['total_amount', 'updated_at'])
+        return self.total_amount
     
     def update_global_status(self):
         """
@@ -217,25 +237,40 @@ class SubOrder(models.Model):
     
     def save(self, *args, **kwargs):
         """Génère automatiquement le numéro de sous-commande."""
-        if not self.sub_order_number:
-            # Compte les sous-commandes pour cette commande parent
+        if self.sub_order_number:
+            return super().save(*args, **kwargs)
+        
+        from .numbering import format_sub_order_number
+        
+        with transaction.atomic():
+            # Verrouille la commande parent : deux sous-commandes créées
+            # en parallèle ne peuvent pas obtenir le même numéro
+            Order.objects.select_for_update().get(pk=self.parent_order_id)
             sub_count = SubOrder.objects.filter(
                 parent_order=self.parent_order
             ).count()
-            self.sub_order_number = f'{self.parent_order.order_number}-P{sub_count + 1}'
-        super().save(*args, **kwargs)
+            self.sub_order_number = format_sub_order_number(
+                self.parent_order.order_number, sub_count + 1
+            )
+            super().save(*args, **kwargs)
     
     def get_total(self):
-        """Calcule le total de cette sous-commande."""
-        total = Decimal('0.00')
-        for item in self.items.all():
-            total += item.get_subtotal()
-        return total
+        """Calcule le total de cette sous-commande (SUM côté SQL)."""
+        total = self.items.aggregate(
+            total=Sum(F('unit_price') * Coalesce('quantity_actual', 'quantity_ordered'))
+        )['total']
+        return total if total is not None else Decimal('0.00')
     
     def update_subtotal(self):
-        """Recalcule et met à jour le subtotal."""
-        self.subtotal = self.get_total()
-        self.save()
+        """
+        Recalcule et met à jour le subtotal.
+        Un seul UPDATE ... SET subtotal = (SELECT SUM(...)) côté SQL.
+        """
+        SubOrder.objects.filter(pk=self.pk).update(
+            subtotal=Coalesce(_items_total_subquery(OuterRef('pk')), Decimal('0.00')),
+            updated_at=timezone.now()
+        )
+        self.refresh_from_db(fields=['subtotal', 'updated_at'])
         return self.subtotal
 
 
@@ -313,6 +348,31 @@ class OrderItem(models.Model):
         quantity = self.quantity_actual if self.quantity_actual else self.quantity_ordered
         return self.unit_price * quantity
     
+    def set_quantity_actual(self, quantity_actual):
+        """
+        Met à jour la quantité réelle et reporte l'écart sur les totaux stockés
+        de la sous-commande et de la commande (UPDATE ... SET x = x + delta).
+        Retourne l'écart appliqué.
+        """
+        with transaction.atomic():
+            # Relit l'item verrouillé : l'écart part de la valeur en base
+            current = OrderItem.objects.select_for_update().get(pk=self.pk)
+            delta = self.unit_price * quantity_actual - current.get_subtotal()
+            
+            self.quantity_actual = quantity_actual
+            self.save(update_fields=['quantity_actual'])
+            
+            if delta:
+                now = timezone.now()
+                SubOrder.objects.filter(pk=self.sub_order_id).update(
+                    subtotal=F('subtotal') + delta, updated_at=now
+                )
+                Order.objects.filter(sub_orders__id=self.sub_order_id).update(
+                    total_amount=F('total_amount') + delta, updated_at=now
+                )
+        
+        return delta
+    
     def get_price_adjustment(self):
         """
         Calcule l'ajustement de prix (si quantité réelle != quantité commandée).
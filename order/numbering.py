@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from django.db import connection
+
+
+def format_order_number(day, value):
+    """DZF-YYYYMMDD-NNNN"""
+    return f"DZF-{day.strftime('%Y%m%d')}-{value:04d}"
+
+
+def format_sub_order_number(order_number, index):
+    """DZF-YYYYMMDD-NNNN-P{index}"""
+    return f'{order_number}-P{index}'
+
+
+def next_order_number(day=None):
+    """
+    Alloue le prochain numéro de commande du jour.
+
+    Une seule requête, quel que soit le nombre de commandes du jour.
+    PostgreSQL: nextval() d'une séquence par jour (next_order_number_value,
+    migrations 0002/0003), sans verrou entre commandes concurrentes. Un
+    checkout annulé laisse un trou dans la numérotation, jamais un doublon.
+    Une séquence créée reprend après les commandes déjà numérotées ce jour.
+    """
+    day = day or datetime.now().date()
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT next_order_number_value(%s)", [day])
+        value = cursor.fetchone()[0]
+
+    return format_order_number(day, value)
+
+
+def drop_past_order_number_sequences(today=None):
+    """
+    Supprime les séquences de numérotation des jours passés.
+
+    Seule la séquence du jour sert encore; si un jour passé est renuméroté,
+    next_order_number_value recrée sa séquence après ses commandes.
+    Retourne le nombre de séquences supprimées.
+    """
+    today = today or datetime.now().date()
+    current = f"order_number_seq_{today.strftime('%Y%m%d')}"
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT sequence_name FROM information_schema.sequences
+            WHERE sequence_schema = current_schema()
+              AND sequence_name ~ '^order_number_seq_[0-9]{8}$'
+              AND sequence_name < %s
+        """, [current])
+        names = [name for (name,) in cursor.fetchall()]
+        for name in names:
+            cursor.execute(f'DROP SEQUENCE IF EXISTS "{name}"')
+
+    return len(names)
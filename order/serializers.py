@@ -3,6 +3,32 @@ from .models import Order, SubOrder, OrderItem
 from decimal import Decimal
 
 
+def details_context(orders=(), sub_orders=()):
+    """
+    Contexte de sérialisation avec les producteurs et clients d'une page.
+    
+    Collecte les producer_id / client_id des commandes et sous-commandes
+    (sous-commandes des commandes comprises) et les charge en deux requêtes
+    ANY(%s), au lieu d'une ou deux requêtes par (sous-)commande.
+    Les sous-commandes doivent avoir parent_order chargé (select_related).
+    """
+    from db import users_queries
+    
+    sub_orders = list(sub_orders)
+    for order in orders:
+        sub_orders.extend(order.sub_orders.all())
+    
+    client_ids = {order.client_id for order in orders}
+    client_ids.update(sub_order.parent_order.client_id for sub_order in sub_orders)
+    
+    return {
+        'producers': users_queries.get_producer_profiles_by_ids(
+            sub_order.producer_id for sub_order in sub_orders
+        ),
+        'clients': users_queries.get_users_by_ids(client_ids),
+    }
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     """Serializer pour les items de commande."""
     
@@ -73,13 +99,21 @@ class SubOrderSerializer(serializers.ModelSerializer):
         ]
     
     def get_total(self, obj):
-        """Total de cette sous-commande."""
-        return float(obj.get_total())
+        """Total de cette sous-commande (subtotal stocké, tenu à jour)."""
+        return float(obj.subtotal)
     
     def get_producer_details(self, obj):
-        """Détails du producteur."""
+        """
+        Détails du producteur.
+        Utilise context['producers'] (voir details_context) s'il est fourni.
+        """
         from db import users_queries
-        producer = users_queries.get_producer_profile_by_id(obj.producer_id)
+        
+        producers = self.context.get('producers')
+        if producers is not None:
+            producer = producers.get(obj.producer_id)
+        else:
+            producer = users_queries.get_producer_profile_by_id(obj.producer_id)
         
         if not producer:
             return None
@@ -100,7 +134,11 @@ class SubOrderSerializer(serializers.ModelSerializer):
             from db import users_queries
             
             # Get user data from parent order's client_id
-            user = users_queries.get_user_by_id(obj.parent_order.client_id)
+            clients = self.context.get('clients')
+            if clients is not None:
+                user = clients.get(obj.parent_order.client_id)
+            else:
+                user = users_queries.get_user_by_id(obj.parent_order.client_id)
             
             if not user:
                 return {
@@ -172,9 +210,17 @@ class OrderSerializer(serializers.ModelSerializer):
         return obj.get_sub_orders_count()
     
     def get_client_details(self, obj):
-        """Détails du client."""
+        """
+        Détails du client.
+        Utilise context['clients'] (voir details_context) s'il est fourni.
+        """
         from db import users_queries
-        user = users_queries.get_user_by_id(obj.client_id)
+        
+        clients = self.context.get('clients')
+        if clients is not None:
+            user = clients.get(obj.client_id)
+        else:
+            user = users_queries.get_user_by_id(obj.client_id)
         
         if not user:
             return None
@@ -207,7 +253,9 @@ class OrderListSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'order_number', 'created_at']
     
     def get_sub_orders_count(self, obj):
-        """Nombre de producteurs dans cette commande."""
+        """Nombre de producteurs dans cette commande (annoté par my_orders)."""
+        if hasattr(obj, 'sub_orders_count'):
+            return obj.sub_orders_count
         return obj.get_sub_orders_count()
 
 
@@ -3,9 +3,13 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.db import transaction
-from decimal import Decimal
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from datetime import date, datetime, time, timedelta
 
 from .models import Order, SubOrder, OrderItem
+from .checkout import materialize_order
 from cart.models import Cart
 from .serializers import (
     OrderSerializer,
@@ -13,12 +17,47 @@ from .serializers import (
     SubOrderSerializer,
     CreateOrderSerializer,
     UpdateSubOrderStatusSerializer,
-    AdjustOrderItemQuantitySerializer
+    AdjustOrderItemQuantitySerializer,
+    details_context
 )
+from db.pagination import InvalidCursor, paginate_queryset, parse_page_size
+from products.queries_stock import InsufficientStock, release_stock, reserve_stock
 from users.authentication import CustomJWTAuthentication
 from users.permissions import IsProducer, CanBuyProducts
 
 
+ORDER_STATUSES = {value for value, _ in Order.STATUS_CHOICES}
+
+
+def history_filters(query_params):
+    """
+    Filtres ?status=, ?from= et ?to= (dates YYYY-MM-DD incluses) des
+    historiques de commandes, en conditions sur created_at utilisables par
+    les index (..., -created_at). Lève ValueError si un filtre est invalide.
+    """
+    filters = {}
+    
+    order_status = query_params.get('status')
+    if order_status:
+        if order_status not in ORDER_STATUSES:
+            raise ValueError(f"Statut invalide : {order_status}")
+        filters['status'] = order_status
+    
+    for param, lookup, offset in (('from', 'created_at__gte', 0), ('to', 'created_at__lt', 1)):
+        value = query_params.get(param)
+        if not value:
+            continue
+        try:
+            day = date.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"Date invalide pour '{param}' (format attendu : YYYY-MM-DD)")
+        filters[lookup] = timezone.make_aware(
+            datetime.combine(day + timedelta(days=offset), time.min)
+        )
+    
+    return filters
+
+
 class OrderViewSet(viewsets.ViewSet):
     """
     ViewSet pour gérer les commandes (côté client).
@@ -48,98 +87,70 @@ class OrderViewSet(viewsets.ViewSet):
         try:
             # Récupérer le panier
             cart = Cart.objects.get(user_id=request.user.id)
+            cart_items = list(cart.items.all())
             
-            if not cart.items.exists():
+            if not cart_items:
                 return Response({
                     'error': 'Votre panier est vide'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             with transaction.atomic():
-                # 1. Créer la commande parent
-                order = Order.objects.create(
-                    client_id=request.user.id,
-                    status='pending',
-                    delivery_method=serializer.validated_data['delivery_method'],
-                    delivery_address=serializer.validated_data.get('delivery_address', ''),
-                    notes=serializer.validated_data.get('notes', '')
-                )
-                
-                # 2. Grouper les items par producteur
-                items_by_producer = {}
+                # 1. Charger tous les produits en une requête
                 from products import queries as product_queries
                 
-                for cart_item in cart.items.all():
-                    product = product_queries.get_product_detail(cart_item.product_id)
-                    
-                    if not product:
+                products = product_queries.get_product_details_bulk(
+                    [cart_item.product_id for cart_item in cart_items]
+                )
+                
+                for cart_item in cart_items:
+                    if cart_item.product_id not in products:
                         raise ValueError(f"Produit {cart_item.product_id} introuvable")
-                    
-                    # Vérifier le stock
-                    if cart_item.quantity > product['stock']:
-                        raise ValueError(
-                            f"Stock insuffisant pour {product['name']}. "
-                            f"Disponible : {product['stock']}"
-                        )
-                    
-                    producer_id = product['producer_id']
-                    
-                    if producer_id not in items_by_producer:
-                        items_by_producer[producer_id] = []
-                    
-                    items_by_producer[producer_id].append({
-                        'cart_item': cart_item,
-                        'product': product
-                    })
                 
-                # 3. Créer une sous-commande par producteur
-                for producer_id, items in items_by_producer.items():
-                    # Créer la sous-commande
-                    sub_order = SubOrder.objects.create(
-                        parent_order=order,
-                        producer_id=producer_id,
-                        status='pending'
+                # 2. Réserver le stock de toutes les lignes en une requête
+                # (tout ou rien, verrous pris dans l'ordre des ids)
+                # Les réservations du panier couvrent ses lignes : elles
+                # deviennent des décréments, puis disparaissent avec les items
+                try:
+                    reserve_stock(
+                        ((cart_item.product_id, cart_item.quantity) for cart_item in cart_items),
+                        cart_id=cart.id
                     )
-                    
-                    # Créer les items de commande
-                    subtotal = Decimal('0.00')
-                    
-                    for item_data in items:
-                        cart_item = item_data['cart_item']
-                        product = item_data['product']
-                        
-                        order_item = OrderItem.objects.create(
-                            sub_order=sub_order,
-                            product_id=product['id'],
-                            product_name=product['name'],
-                            quantity_ordered=cart_item.quantity,
-                            unit_price=cart_item.price_snapshot,
-                            sale_type=product['sale_type']
-                        )
-                        
-                        subtotal += order_item.get_subtotal()
-                        
-                        # Décrémenter le stock
-                        # Note: Dans un système réel, il faudrait utiliser une transaction SQL
-                        # ou un mécanisme de verrouillage pour éviter les race conditions
-                        new_stock = product['stock'] - cart_item.quantity
-                        product_queries.partial_update_product(
-                            product_id=product['id'],
-                            producer_id=producer_id,
-                            updates={'stock': new_stock}
-                        )
-                    
-                    # Mettre à jour le subtotal de la sous-commande
-                    sub_order.subtotal = subtotal
-                    sub_order.save()
+                except InsufficientStock as e:
+                    transaction.set_rollback(True)
+                    return Response({
+                        'error': 'Stock insuffisant',
+                        'failed_items': [
+                            {
+                                'product_id': failure['product_id'],
+                                'product_name': products[failure['product_id']]['name'],
+                                'quantity_requested': float(failure['requested']),
+                                'stock_available': (
+                                    float(failure['available'])
+                                    if failure['available'] is not None else 0.0
+                                ),
+                            }
+                            for failure in e.failures
+                        ]
+                    }, status=status.HTTP_400_BAD_REQUEST)
                 
-                # 4. Mettre à jour le total de la commande
-                order.update_total()
+                # 3. Créer la commande, les sous-commandes (une par producteur)
+                # et les items en insertions groupées, totaux calculés en mémoire
+                order = materialize_order(
+                    client_id=request.user.id,
+                    cart_items=cart_items,
+                    products=products,
+                    delivery_method=serializer.validated_data['delivery_method'],
+                    delivery_address=serializer.validated_data.get('delivery_address', ''),
+                    notes=serializer.validated_data.get('notes', '')
+                )
                 
-                # 5. Vider le panier
+                # 4. Vider le panier
                 cart.items.all().delete()
                 
-                # 6. Retourner la commande créée
-                order_serializer = OrderSerializer(order)
+                # 5. Retourner la commande créée
+                order_serializer = OrderSerializer(
+                    order, context=details_context(orders=[order])
+                )
                 
                 return Response({
                     'message': 'Commande créée avec succès',
@@ -164,14 +175,47 @@ class OrderViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def my_orders(self, request):
         """
-        GET /api/orders/my_orders/
-        Liste toutes les commandes du client.
+        GET /api/orders/my_orders/?status=pending&from=2025-01-01&to=2025-01-31&limit=20&cursor=...
+        Liste les commandes du client, plus récentes d'abord (paginée par curseur).
+        Index utilisé : (client_id, -created_at).
         """
-        orders = Order.objects.filter(client_id=request.user.id).order_by('-created_at')
+        try:
+            filters = history_filters(request.query_params)
+        except ValueError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        orders = Order.objects.filter(
+            client_id=request.user.id, **filters
+        ).annotate(
+            sub_orders_count=Coalesce(
+                Subquery(
+                    SubOrder.objects.filter(parent_order=OuterRef('pk'))
+                    .values('parent_order')
+                    .annotate(count=Count('id'))
+                    .values('count')[:1]
+                ),
+                0
+            )
+        )
+        
+        try:
+            orders, next_cursor = paginate_queryset(
+                orders,
+                request.query_params.get('cursor'),
+                parse_page_size(request.query_params.get('limit'))
+            )
+        except InvalidCursor:
+            return Response({
+                'error': 'Invalid cursor'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         serializer = OrderListSerializer(orders, many=True)
         
         return Response({
-            'count': orders.count(),
+            'count': len(serializer.data),
+            'next': next_cursor,
             'orders': serializer.data
         })
     
@@ -181,8 +225,10 @@ class OrderViewSet(viewsets.ViewSet):
         Détails d'une commande spécifique.
         """
         try:
-            order = Order.objects.get(id=pk, client_id=request.user.id)
-            serializer = OrderSerializer(order)
+            order = Order.objects.prefetch_related('sub_orders__items').get(
+                id=pk, client_id=request.user.id
+            )
+            serializer = OrderSerializer(order, context=details_context(orders=[order]))
             
             return Response({
                 'order': serializer.data
@@ -200,39 +246,36 @@ class OrderViewSet(viewsets.ViewSet):
         Annule une commande (seulement si status = pending ou confirmed).
         """
         try:
-            order = Order.objects.get(id=pk, client_id=request.user.id)
-            
-            if order.status not in ['pending', 'confirmed']:
-                return Response({
-                    'error': 'Cette commande ne peut plus être annulée'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
             with transaction.atomic():
-                # Annuler toutes les sous-commandes
-                for sub_order in order.sub_orders.all():
-                    sub_order.status = 'cancelled'
-                    sub_order.save()
-                    
-                    # Remettre les produits en stock
-                    from products import queries as product_queries
-                    
-                    for item in sub_order.items.all():
-                        product = product_queries.get_product_detail(item.product_id)
-                        if product:
-                            new_stock = product['stock'] + item.quantity_ordered
-                            product_queries.partial_update_product(
-                                product_id=item.product_id,
-                                producer_id=sub_order.producer_id,
-                                updates={'stock': new_stock}
-                            )
+                # Verrou sur la commande : deux annulations simultanées ne
+                # peuvent pas remettre le stock deux fois
+                order = Order.objects.select_for_update().get(
+                    id=pk, client_id=request.user.id
+                )
+                
+                if order.status not in ['pending', 'confirmed']:
+                    return Response({
+                        'error': 'Cette commande ne peut plus être annulée'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                
+                # Remettre les produits en stock (une seule requête)
+                release_stock(
+                    OrderItem.objects.filter(
+                        sub_order__parent_order=order
+                    ).values_list('product_id', 'quantity_ordered')
+                )
+                
+                # Annuler toutes les sous-commandes (une seule requête)
+                now = timezone.now()
+                order.sub_orders.update(status='cancelled', updated_at=now)
                 
                 # Mettre à jour le statut de la commande
                 order.status = 'cancelled'
-                order.save()
+                order.save(update_fields=['status', 'updated_at'])
             
             return Response({
                 'message': 'Commande annulée avec succès',
-                'order': OrderSerializer(order).data
+                'order': OrderSerializer(order, context=details_context(orders=[order])).data
             })
         
         except Order.DoesNotExist:
@@ -283,8 +326,9 @@ class ProducerOrderViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def my_orders(self, request):
         """
-        GET /api/producer-orders/my_orders/
-        Liste toutes les sous-commandes du producteur.
+        GET /api/producer-orders/my_orders/?status=pending&from=2025-01-01&to=2025-01-31&limit=20&cursor=...
+        Liste les sous-commandes du producteur, plus récentes d'abord (paginée par curseur).
+        Index utilisé : (producer_id, -created_at).
         """
 <<<<<<< HEAD
         # ✅ FIXED: Check producer_id safely
@@ -301,12 +345,31 @@ class ProducerOrderViewSet(viewsets.ViewSet):
         sub_orders = SubOrder.objects.filter(
             producer_id=request.user.producer_profile.id
 >>>>>>> 33f7a2d22d51c7734ecadb4759a1c8c2dc77ec6b
-        ).select_related('parent_order').order_by('-created_at')
+        ).select_related('parent_order').prefetch_related('items')
+        
+        try:
+            sub_orders, next_cursor = paginate_queryset(
+                sub_orders.filter(**history_filters(request.query_params)),
+                request.query_params.get('cursor'),
+                parse_page_size(request.query_params.get('limit'))
+            )
+        except InvalidCursor:
+            return Response({
+                'error': 'Invalid cursor'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = SubOrderSerializer(sub_orders, many=True)
+        # Producteurs et clients de la page : 2 requêtes au total
+        serializer = SubOrderSerializer(
+            sub_orders, many=True, context=details_context(sub_orders=sub_orders)
+        )
         
         return Response({
-            'count': sub_orders.count(),
+            'count': len(serializer.data),
+            'next': next_cursor,
             'sub_orders': serializer.data
         })
     
@@ -453,15 +516,10 @@ class ProducerOrderViewSet(viewsets.ViewSet):
             if not serializer.is_valid():
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
             
-            # Mettre à jour la quantité réelle
-            order_item.quantity_actual = serializer.validated_data['quantity_actual']
-            order_item.save()
-            
-            # Recalculer le subtotal de la sous-commande
-            sub_order.update_subtotal()
-            
-            # Recalculer le total de la commande parent
-            sub_order.parent_order.update_total()
+            # Mettre à jour la quantité réelle ; l'écart est reporté sur le
+            # subtotal de la sous-commande et le total de la commande parent
+            order_item.set_quantity_actual(serializer.validated_data['quantity_actual'])
+            sub_order.refresh_from_db(fields=['subtotal', 'updated_at'])
             
             return Response({
                 'message': 'Quantité ajustée',
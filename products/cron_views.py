@@ -3,7 +3,10 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from django.http import JsonResponse
+from order.numbering import drop_past_order_number_sequences
 from . import queries as product_queries
+from .product_cache import get_product_cache_stats
+from .queries_stock import expire_stock_holds, sync_sharded_stock
 
 
 @api_view(['POST'])
@@ -11,7 +14,9 @@ from . import queries as product_queries
 def trigger_anti_gaspi_cron(request):
     """
     Protected endpoint for Railway cron jobs.
-    Applies anti-gaspi discounts to eligible products.
+    Applies anti-gaspi discounts to eligible products, reshuffles
+    the homepage random sort keys and drops the order number
+    sequences of past days.
     """
     
     auth_header = request.headers.get('X-Cron-Secret')
@@ -25,11 +30,15 @@ def trigger_anti_gaspi_cron(request):
     try:
         
         count = product_queries.mark_products_as_anti_gaspi()
+        reshuffled = product_queries.reshuffle_product_random_keys()
+        sequences_dropped = drop_past_order_number_sequences()
         
         return JsonResponse({
             'success': True,
             'message': f'Anti-gaspi applied successfully',
-            'products_updated': count
+            'products_updated': count,
+            'products_reshuffled': reshuffled,
+            'order_number_sequences_dropped': sequences_dropped
         }, status=200)
     
     except Exception as e:
@@ -37,3 +46,59 @@ def trigger_anti_gaspi_cron(request):
             'success': False,
             'error': str(e) 
         }, status=500) 
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def product_cache_stats(request):
+    """
+    Protected endpoint exposing product detail cache hit/miss counters
+    of the process serving the request.
+    """
+    
+    auth_header = request.headers.get('X-Cron-Secret')
+    expected_secret = os.getenv('CRON_SECRET_TOKEN', 'dz-fellah-secret-2025-anti-gaspi')
+    
+    if auth_header != expected_secret:
+        return JsonResponse({
+            'error': 'Unauthorized - Invalid cron secret'
+        }, status=403)
+    
+    return JsonResponse({
+        'success': True,
+        'product_cache': get_product_cache_stats()
+    }, status=200)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def expire_stock_holds_cron(request):
+    """
+    Protected endpoint for Railway cron jobs.
+    Deletes expired cart stock holds in batches and refreshes the
+    products.stock copy of sharded products.
+    """
+    
+    auth_header = request.headers.get('X-Cron-Secret')
+    expected_secret = os.getenv('CRON_SECRET_TOKEN', 'dz-fellah-secret-2025-anti-gaspi')
+    
+    if auth_header != expected_secret:
+        return JsonResponse({
+            'error': 'Unauthorized - Invalid cron secret'
+        }, status=403)
+    
+    try:
+        deleted = expire_stock_holds()
+        synced = sync_sharded_stock()
+        
+        return JsonResponse({
+            'success': True,
+            'holds_expired': deleted,
+            'sharded_stock_synced': synced
+        }, status=200)
+    
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
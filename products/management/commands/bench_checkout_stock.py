@@ -0,0 +1,229 @@
+"""
+Django management command to benchmark concurrent checkouts on one product
+Compares the old read-then-write stock update with reserve_stock, on a
+plain and on a sharded stock row, then with carts that hold the product:
+each checkout first adds it to its cart (hold_stock) like the cart API,
+so every worker's hold is live while the others check out.
+
+Usage:
+    python manage.py bench_checkout_stock
+    python manage.py bench_checkout_stock --workers 32 --checkouts 2000 --stock 500
+    python manage.py bench_checkout_stock --shards 16
+
+Worker threads need committed rows, so the benchmark product is created,
+then deleted at the end with its carts (even on failure). Bench carts
+belong to negative user ids, never a real user.
+"""
+
+import statistics
+import threading
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from cart.models import Cart, CartItem
+from products.queries_stock import (
+    DEFAULT_STOCK_SHARDS, InsufficientStock, disable_stock_sharding,
+    enable_stock_sharding, hold_stock, reserve_stock,
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent checkouts (read-then-write vs reserve_stock, plain and sharded, with holds)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16,
+                            help='Concurrent checkout threads')
+        parser.add_argument('--checkouts', type=int, default=1000,
+                            help='Checkout attempts per mode')
+        parser.add_argument('--stock', type=int, default=300,
+                            help='Initial stock of the anti-gaspi product')
+        parser.add_argument('--quantity', default='1',
+                            help='Quantity bought per checkout')
+        parser.add_argument('--shards', type=int, default=DEFAULT_STOCK_SHARDS,
+                            help='Stock shards of the sharded mode')
+
+    def handle(self, *args, **options):
+        quantity = Decimal(options['quantity'])
+
+        self.stdout.write('🏁 DZ-Fellah Concurrent Checkout Benchmark')
+        self.stdout.write('='*60)
+        self.stdout.write(
+            f"👥 {options['workers']} workers, {options['checkouts']} checkouts, "
+            f"stock {options['stock']}, quantity {quantity}"
+        )
+
+        user_id, product_id = self.create_bench_product()
+        results = []
+
+        try:
+            for name, checkout, shards in (
+                ('read-then-write', self.read_then_write, 0),
+                ('reserve_stock', self.reserve, 0),
+                (f"sharded x{options['shards']}", self.reserve, options['shards']),
+                ('held', self.held_checkout, 0),
+                (f"held sharded x{options['shards']}", self.held_checkout, options['shards']),
+            ):
+                self.set_stock(product_id, options['stock'])
+                if shards:
+                    enable_stock_sharding(product_id, shards)
+                self.stdout.write(f'🛒 {name}...')
+                stats = self.run_mode(
+                    lambda user_id: checkout(product_id, quantity, user_id),
+                    options['workers'], options['checkouts']
+                )
+                if shards:
+                    disable_stock_sharding(product_id)
+                stats['final_stock'] = self.get_stock(product_id)
+                results.append((name, stats))
+        finally:
+            self.delete_bench_product(user_id, product_id)
+
+        self.stdout.write('\n' + '='*60)
+        self.stdout.write(self.style.SUCCESS('📊 RESULTS'))
+        self.stdout.write('='*60)
+        self.stdout.write(
+            f'{"mode":>19} | {"ok":>6} | {"refused":>7} | {"oversold":>8} | '
+            f'{"checkouts/s":>11} | {"ms p50 / p95":>15}'
+        )
+        for name, stats in results:
+            sold = stats['ok'] * quantity
+            expected_stock = options['stock'] - sold
+            # Units sold that the stock column does not account for
+            oversold = max(Decimal('0'), stats['final_stock'] - expected_stock)
+            self.stdout.write(
+                f"{name:>19} | {stats['ok']:>6} | {stats['refused']:>7} | {oversold:>8} | "
+                f"{stats['throughput']:>11.1f} | {self.fmt(stats['timings']):>15}"
+            )
+        self.stdout.write('='*60)
+
+    def run_mode(self, checkout, workers, checkouts):
+        """
+        Run checkouts attempts spread over workers threads.
+        checkout(user_id) gets the bench user id of its worker.
+        """
+        remaining = [checkouts]
+        lock = threading.Lock()
+        stats = {'ok': 0, 'refused': 0, 'timings': []}
+
+        def worker(user_id):
+            try:
+                while True:
+                    with lock:
+                        if remaining[0] <= 0:
+                            return
+                        remaining[0] -= 1
+
+                    start = time.perf_counter()
+                    ok = checkout(user_id)
+                    elapsed = (time.perf_counter() - start) * 1000
+
+                    with lock:
+                        stats['ok' if ok else 'refused'] += 1
+                        stats['timings'].append(elapsed)
+            finally:
+                # Each thread has its own connection
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(-index - 1,)) for index in range(workers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats['throughput'] = checkouts / (time.perf_counter() - start)
+        return stats
+
+    def read_then_write(self, product_id, quantity, user_id):
+        """Old create_from_cart behaviour: read the stock, write stock - qty."""
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT stock FROM products WHERE id = %s", [product_id])
+                stock = cursor.fetchone()[0]
+                if stock < quantity:
+                    return False
+                cursor.execute(
+                    "UPDATE products SET stock = %s WHERE id = %s",
+                    [stock - quantity, product_id]
+                )
+        return True
+
+    def reserve(self, product_id, quantity, user_id):
+        with transaction.atomic():
+            try:
+                reserve_stock([(product_id, quantity)])
+            except InsufficientStock:
+                return False
+        return True
+
+    def held_checkout(self, product_id, quantity, user_id):
+        """Add to cart (hold), then check the cart out in a second transaction."""
+        with transaction.atomic():
+            cart, _ = Cart.objects.get_or_create(user_id=user_id)
+            item = CartItem.objects.create(
+                cart=cart, product_id=product_id,
+                quantity=quantity, price_snapshot=Decimal('100.00')
+            )
+            held, _ = hold_stock(cart.id, item.id, product_id, quantity)
+
+        try:
+            if not held:
+                return False
+            with transaction.atomic():
+                try:
+                    reserve_stock([(product_id, quantity)], cart_id=cart.id)
+                except InsufficientStock:
+                    return False
+            return True
+        finally:
+            # Its lines and holds go with it
+            cart.delete()
+
+    def create_bench_product(self):
+        """Create a throwaway user + producer + anti-gaspi product."""
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO users (email, password, user_type, first_name, last_name)
+                VALUES ('bench.checkout@example.com', '!', 'producer', 'Bench', 'Checkout')
+                RETURNING id
+            """)
+            user_id = cursor.fetchone()[0]
+
+            cursor.execute("""
+                INSERT INTO producers (user_id, shop_name)
+                VALUES (%s, 'Bench Farm')
+                RETURNING id
+            """, [user_id])
+            producer_id = cursor.fetchone()[0]
+
+            cursor.execute("""
+                INSERT INTO products (
+                    producer_id, name, sale_type, price, stock,
+                    product_type, is_anti_gaspi
+                )
+                VALUES (%s, 'Bench anti-gaspi', 'unit', 100, 0, 'fresh', TRUE)
+                RETURNING id
+            """, [producer_id])
+            return user_id, cursor.fetchone()[0]
+
+    def delete_bench_product(self, user_id, product_id):
+        """Producer and products go with the user (ON DELETE CASCADE)."""
+        Cart.objects.filter(items__product_id=product_id).delete()
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM users WHERE id = %s", [user_id])
+
+    def set_stock(self, product_id, stock):
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE products SET stock = %s WHERE id = %s", [stock, product_id])
+
+    def get_stock(self, product_id):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT stock FROM products WHERE id = %s", [product_id])
+            return cursor.fetchone()[0]
+
+    def fmt(self, timings):
+        p50 = statistics.median(timings)
+        p95 = sorted(timings)[max(0, int(len(timings) * 0.95) - 1)]
+        return f'{p50:.2f} / {p95:.2f}'
@@ -0,0 +1,137 @@
+"""
+Django management command to benchmark homepage random sampling
+Compares ORDER BY RANDOM() with the indexed random_key sampler.
+
+Usage:
+    python manage.py bench_home_products
+    python manage.py bench_home_products --sizes 10000,100000 --runs 20
+
+All rows are created inside a transaction that is rolled back at the end.
+"""
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from products import queries
+
+
+ORDER_BY_RANDOM_SQL = """
+    SELECT
+        p.id, p.name, p.photo_url, p.price, p.sale_type, p.stock,
+        p.product_type, p.is_anti_gaspi, p.harvest_date,
+        pr.id as producer_id,
+        pr.shop_name as producer_name
+    FROM products p
+    INNER JOIN producers pr ON p.producer_id = pr.id
+    WHERE 1=1
+    ORDER BY RANDOM() LIMIT %s
+"""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark homepage sampling (ORDER BY RANDOM() vs random_key index)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help='Comma-separated catalogue sizes')
+        parser.add_argument('--runs', type=int, default=30,
+                            help='Timed queries per mode and size')
+        parser.add_argument('--limit', type=int, default=20,
+                            help='Products per homepage request')
+        parser.add_argument('--product-type', default='fresh',
+                            help='product_type used for generated rows')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        runs = options['runs']
+        limit = options['limit']
+
+        self.stdout.write('🏁 DZ-Fellah Homepage Sampling Benchmark')
+        self.stdout.write('='*60)
+
+        results = []
+
+        with transaction.atomic():
+            producer_id = self.create_bench_producer()
+            current = 0
+
+            for size in sizes:
+                self.stdout.write(f'📦 Growing catalogue to {size} products...')
+                self.insert_products(producer_id, size - current, options['product_type'])
+                current = size
+
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE products")
+
+                baseline = self.time_runs(runs, lambda: self.order_by_random(limit))
+                sampler = self.time_runs(runs, lambda: queries.get_home_products(limit=limit))
+                results.append((size, baseline, sampler))
+
+            # Never keep benchmark rows
+            transaction.set_rollback(True)
+
+        self.stdout.write('\n' + '='*60)
+        self.stdout.write(self.style.SUCCESS('📊 RESULTS (ms, p50 / p95)'))
+        self.stdout.write('='*60)
+        self.stdout.write(f'{"products":>10} | {"ORDER BY RANDOM()":>20} | {"random_key index":>20}')
+        for size, baseline, sampler in results:
+            self.stdout.write(
+                f'{size:>10} | {self.fmt(baseline):>20} | {self.fmt(sampler):>20}'
+            )
+        self.stdout.write('='*60)
+
+    def create_bench_producer(self):
+        """Create a throwaway user + producer owning the generated products."""
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO users (email, password, user_type, first_name, last_name)
+                VALUES ('bench.home@example.com', '!', 'producer', 'Bench', 'Home')
+                RETURNING id
+            """)
+            user_id = cursor.fetchone()[0]
+
+            cursor.execute("""
+                INSERT INTO producers (user_id, shop_name)
+                VALUES (%s, 'Bench Farm')
+                RETURNING id
+            """, [user_id])
+            return cursor.fetchone()[0]
+
+    def insert_products(self, producer_id, count, product_type):
+        """Insert count products in one statement."""
+        if count <= 0:
+            return
+
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO products (
+                    producer_id, name, sale_type, price, stock,
+                    product_type, is_anti_gaspi
+                )
+                SELECT %s, 'Bench product ' || g, 'unit', 100, 10,
+                       %s, g %% 10 = 0
+                FROM generate_series(1, %s) AS g
+            """, [producer_id, product_type, count])
+
+    def order_by_random(self, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(ORDER_BY_RANDOM_SQL, [limit])
+            return cursor.fetchall()
+
+    def time_runs(self, runs, func):
+        """Run func once to warm up, then time it runs times (ms)."""
+        func()
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def fmt(self, timings):
+        p50 = statistics.median(timings)
+        p95 = sorted(timings)[max(0, int(len(timings) * 0.95) - 1)]
+        return f'{p50:.2f} / {p95:.2f}'
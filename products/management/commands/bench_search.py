@@ -0,0 +1,154 @@
+"""
+Django management command to benchmark product search
+Compares the former ILIKE '%term%' scan with full-text search.
+
+Usage:
+    python manage.py bench_search
+    python manage.py bench_search --sizes 10000,100000 --runs 20 --terms tomate,miel
+
+All rows are created inside a transaction that is rolled back at the end.
+Requires products/migrations/0006_full_text_search.sql.
+"""
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from products import queries
+
+
+ILIKE_SQL = """
+    SELECT
+        p.id, p.name, p.photo_url, p.price, p.sale_type, p.stock,
+        p.product_type, p.is_anti_gaspi, p.harvest_date,
+        pr.id as producer_id,
+        pr.shop_name as producer_name
+    FROM products p
+    INNER JOIN producers pr ON p.producer_id = pr.id
+    WHERE (p.name ILIKE %s OR p.description ILIKE %s)
+    ORDER BY p.created_at DESC
+    LIMIT %s
+"""
+
+# Vocabulary used to generate product names and descriptions
+WORDS = [
+    'tomates', 'pommes', 'oranges', 'dattes', 'miel', 'huile', 'olive',
+    'fromage', 'lait', 'carottes', 'oignons', 'figues', 'amandes', 'citrons',
+    'courgettes', 'poivrons', 'fraises', 'pasteque', 'melon', 'semoule',
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark product search (ILIKE vs full-text search)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help='Comma-separated catalogue sizes')
+        parser.add_argument('--runs', type=int, default=30,
+                            help='Timed queries per mode, size and term')
+        parser.add_argument('--limit', type=int, default=20,
+                            help='Results per search')
+        parser.add_argument('--terms', default='tomates,miel olive,figu',
+                            help='Comma-separated search terms')
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        terms = [term.strip() for term in options['terms'].split(',') if term.strip()]
+        runs = options['runs']
+        limit = options['limit']
+
+        self.stdout.write('🔎 DZ-Fellah Product Search Benchmark')
+        self.stdout.write('='*60)
+
+        results = []
+
+        with transaction.atomic():
+            producer_id = self.create_bench_producer()
+            current = 0
+
+            for size in sizes:
+                self.stdout.write(f'📦 Growing catalogue to {size} products...')
+                self.insert_products(producer_id, size - current)
+                current = size
+
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE products")
+
+                for term in terms:
+                    ilike = self.time_runs(runs, lambda: self.ilike_search(term, limit))
+                    fts = self.time_runs(runs, lambda: queries.search_products_advanced(
+                        search=term, limit=limit
+                    ))
+                    results.append((size, term, ilike, fts))
+
+            # Never keep benchmark rows
+            transaction.set_rollback(True)
+
+        self.stdout.write('\n' + '='*60)
+        self.stdout.write(self.style.SUCCESS('📊 RESULTS (ms, p50 / p95)'))
+        self.stdout.write('='*60)
+        self.stdout.write(f'{"products":>10} | {"term":>12} | {"ILIKE":>18} | {"full-text":>18}')
+        for size, term, ilike, fts in results:
+            self.stdout.write(
+                f'{size:>10} | {term:>12} | {self.fmt(ilike):>18} | {self.fmt(fts):>18}'
+            )
+        self.stdout.write('='*60)
+
+    def create_bench_producer(self):
+        """Create a throwaway user + producer owning the generated products."""
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO users (email, password, user_type, first_name, last_name)
+                VALUES ('bench.search@example.com', '!', 'producer', 'Bench', 'Search')
+                RETURNING id
+            """)
+            user_id = cursor.fetchone()[0]
+
+            cursor.execute("""
+                INSERT INTO producers (user_id, shop_name)
+                VALUES (%s, 'Bench Farm')
+                RETURNING id
+            """, [user_id])
+            return cursor.fetchone()[0]
+
+    def insert_products(self, producer_id, count):
+        """Insert count products with pseudo-random names in one statement."""
+        if count <= 0:
+            return
+
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO products (
+                    producer_id, name, description, sale_type, price, stock,
+                    product_type, is_anti_gaspi
+                )
+                SELECT %s,
+                       initcap(w.words[1 + g %% array_length(w.words, 1)]) || ' ' || g,
+                       'Produit local: ' || w.words[1 + (g / 7) %% array_length(w.words, 1)]
+                           || ' et ' || w.words[1 + (g / 13) %% array_length(w.words, 1)],
+                       'unit', 100, 10, 'fresh', g %% 10 = 0
+                FROM generate_series(1, %s) AS g
+                CROSS JOIN (SELECT %s::text[] AS words) AS w
+            """, [producer_id, count, WORDS])
+
+    def ilike_search(self, term, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(ILIKE_SQL, [f'%{term}%', f'%{term}%', limit])
+            return cursor.fetchall()
+
+    def time_runs(self, runs, func):
+        """Run func once to warm up, then time it runs times (ms)."""
+        func()
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def fmt(self, timings):
+        p50 = statistics.median(timings)
+        p95 = sorted(timings)[max(0, int(len(timings) * 0.95) - 1)]
+        return f'{p50:.2f} / {p95:.2f}'
@@ -8,6 +8,9 @@ from django.db import connection
 import csv
 import os
 
+from products import queries
+from products.seasonal_utils import invalidate_season_index
+
 
 class Command(BaseCommand):
     help = 'Import seasonal data from CSV - keeps original names for academic purposes'
@@ -79,6 +82,13 @@ class Command(BaseCommand):
         connection.commit()
         cursor.close()
         
+        # Running processes rebuild their season index on next lookup
+        if imported:
+            invalidate_season_index()
+            rows = queries.rebuild_product_season_months()
+            connection.commit()
+            self.stdout.write(f'🗓️  Season buckets rebuilt: {rows} rows')
+        
         self.stdout.write('\n' + '='*60)
         self.stdout.write(self.style.SUCCESS('📊 IMPORT SUMMARY'))
         self.stdout.write('='*60)
@@ -0,0 +1,23 @@
+"""
+Django management command to rebuild the product season month buckets
+Usage: python manage.py rebuild_season_months
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from products import queries
+
+
+class Command(BaseCommand):
+    help = 'Recompute product_season_months for every product from product_seasons'
+
+    def handle(self, *args, **options):
+        self.stdout.write('🌱 DZ-Fellah Season Buckets Rebuild')
+        self.stdout.write('='*60)
+        
+        with transaction.atomic():
+            rows = queries.rebuild_product_season_months()
+        
+        self.stdout.write(self.style.SUCCESS(f'✅ {rows} (month, product) rows written'))
+        self.stdout.write(self.style.SUCCESS('✨ Rebuild complete!'))
@@ -0,0 +1,42 @@
+"""
+Django management command to shard the stock of a hot product
+Usage:
+    python manage.py shard_stock 42
+    python manage.py shard_stock 42 --shards 16
+    python manage.py shard_stock 42 --off
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.queries_stock import (
+    DEFAULT_STOCK_SHARDS, disable_stock_sharding, enable_stock_sharding,
+)
+
+
+class Command(BaseCommand):
+    help = 'Spread the stock of a product over several rows (or fold it back with --off)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('product_id', type=int)
+        parser.add_argument('--shards', type=int, default=DEFAULT_STOCK_SHARDS,
+                            help='Number of stock rows')
+        parser.add_argument('--off', action='store_true',
+                            help='Fold the shards back into products.stock')
+
+    def handle(self, *args, **options):
+        product_id = options['product_id']
+
+        if options['off']:
+            if not disable_stock_sharding(product_id):
+                raise CommandError(f'Product {product_id} is not sharded')
+            self.stdout.write(self.style.SUCCESS(f'✅ Product {product_id} unsharded'))
+            return
+
+        if options['shards'] < 2:
+            raise CommandError('--shards must be at least 2')
+
+        if not enable_stock_sharding(product_id, options['shards']):
+            raise CommandError(f'Product {product_id} does not exist or is already sharded')
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Product {product_id} stock spread over {options['shards']} shards"
+        ))
@@ -0,0 +1,21 @@
+from .product_cache import begin_request_scope, end_request_scope
+
+
+class ProductIdentityMapMiddleware:
+    """
+    Share product rows loaded during one request.
+    
+    get_product_detail / get_product_details_bulk return the same row to
+    every serializer, model method and view of the request; the map is
+    dropped when the response is done (see product_cache.py).
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        token = begin_request_scope()
+        try:
+            return self.get_response(request)
+        finally:
+            end_request_scope(token)
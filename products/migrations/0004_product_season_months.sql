@@ -0,0 +1,26 @@
+-- ============================================
+-- PRODUCT SEASONS TABLE (reference data)
+-- Filled by: python manage.py import_seasons
+-- ============================================
+CREATE TABLE IF NOT EXISTS product_seasons (
+    id SERIAL PRIMARY KEY,
+    product_name VARCHAR(255) UNIQUE NOT NULL,
+    start_month SMALLINT NOT NULL CHECK (start_month BETWEEN 1 AND 12),
+    end_month SMALLINT NOT NULL CHECK (end_month BETWEEN 1 AND 12),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+-- ============================================
+-- PRODUCT SEASON MONTHS (12 month buckets)
+-- One row per (month, product) the product is in season.
+-- Cross-year seasons (e.g. 11-4) are expanded into their months.
+-- Maintained by products.queries on create/update/rename.
+-- Backfill: python manage.py rebuild_season_months
+-- ============================================
+CREATE TABLE IF NOT EXISTS product_season_months (
+    month SMALLINT NOT NULL CHECK (month BETWEEN 1 AND 12),
+    product_id INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    PRIMARY KEY (month, product_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_product_season_months_product_id ON product_season_months(product_id);
@@ -0,0 +1,12 @@
+-- ============================================
+-- HOMEPAGE RANDOM SAMPLING
+-- Each product gets a random sort key; get_home_products starts at a
+-- random point of the index instead of ORDER BY RANDOM() on the whole
+-- table. Keys are reshuffled daily by the cron endpoint.
+-- ============================================
+ALTER TABLE products
+    ADD COLUMN IF NOT EXISTS random_key DOUBLE PRECISION NOT NULL DEFAULT random();
+
+CREATE INDEX IF NOT EXISTS idx_products_random_key ON products(random_key);
+CREATE INDEX IF NOT EXISTS idx_products_type_random_key ON products(product_type, random_key);
+CREATE INDEX IF NOT EXISTS idx_products_anti_gaspi_random_key ON products(random_key) WHERE is_anti_gaspi = TRUE;
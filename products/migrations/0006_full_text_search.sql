@@ -0,0 +1,105 @@
+-- ============================================
+-- FULL-TEXT SEARCH
+-- Products, producers and seasonal baskets keep a weighted tsvector
+-- (French + English + Arabic) maintained by triggers. Searches use
+-- prefix tsqueries (see db/search.py), ranked with ts_rank and served by
+-- GIN indexes instead of ILIKE '%...%' scans.
+-- ============================================
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- Weighted document: title (A), body (B), location/extra (C)
+CREATE OR REPLACE FUNCTION search_document(title TEXT, body TEXT, extra TEXT)
+RETURNS tsvector AS $$
+    SELECT
+        setweight(to_tsvector('french',  unaccent(coalesce(title, ''))), 'A') ||
+        setweight(to_tsvector('english', unaccent(coalesce(title, ''))), 'A') ||
+        setweight(to_tsvector('arabic',  unaccent(coalesce(title, ''))), 'A') ||
+        setweight(to_tsvector('french',  unaccent(coalesce(body, ''))), 'B') ||
+        setweight(to_tsvector('english', unaccent(coalesce(body, ''))), 'B') ||
+        setweight(to_tsvector('arabic',  unaccent(coalesce(body, ''))), 'B') ||
+        setweight(to_tsvector('simple',  unaccent(coalesce(extra, ''))), 'C')
+$$ LANGUAGE SQL STABLE;
+
+-- ============================================
+-- PRODUCTS
+-- ============================================
+ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE OR REPLACE FUNCTION products_search_vector_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector := search_document(NEW.name, NEW.description, NULL);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS products_search_vector_trigger ON products;
+CREATE TRIGGER products_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description ON products
+    FOR EACH ROW
+    EXECUTE FUNCTION products_search_vector_update();
+
+-- Backfill without touching updated_at
+ALTER TABLE products DISABLE TRIGGER update_products_updated_at;
+UPDATE products
+SET search_vector = search_document(name, description, NULL)
+WHERE search_vector IS NULL;
+ALTER TABLE products ENABLE TRIGGER update_products_updated_at;
+
+CREATE INDEX IF NOT EXISTS idx_products_search_vector ON products USING GIN (search_vector);
+
+-- ============================================
+-- PRODUCERS
+-- ============================================
+ALTER TABLE producers ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE OR REPLACE FUNCTION producers_search_vector_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector := search_document(
+        NEW.shop_name,
+        NEW.description,
+        concat_ws(' ', NEW.city, NEW.wilaya)
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS producers_search_vector_trigger ON producers;
+CREATE TRIGGER producers_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF shop_name, description, city, wilaya ON producers
+    FOR EACH ROW
+    EXECUTE FUNCTION producers_search_vector_update();
+
+ALTER TABLE producers DISABLE TRIGGER update_producers_updated_at;
+UPDATE producers
+SET search_vector = search_document(shop_name, description, concat_ws(' ', city, wilaya))
+WHERE search_vector IS NULL;
+ALTER TABLE producers ENABLE TRIGGER update_producers_updated_at;
+
+CREATE INDEX IF NOT EXISTS idx_producers_search_vector ON producers USING GIN (search_vector);
+
+-- ============================================
+-- SEASONAL BASKETS
+-- ============================================
+ALTER TABLE seasonal_baskets ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE OR REPLACE FUNCTION seasonal_baskets_search_vector_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector := search_document(NEW.name, NEW.description, NULL);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS seasonal_baskets_search_vector_trigger ON seasonal_baskets;
+CREATE TRIGGER seasonal_baskets_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description ON seasonal_baskets
+    FOR EACH ROW
+    EXECUTE FUNCTION seasonal_baskets_search_vector_update();
+
+UPDATE seasonal_baskets
+SET search_vector = search_document(name, description, NULL)
+WHERE search_vector IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_seasonal_baskets_search_vector ON seasonal_baskets USING GIN (search_vector);
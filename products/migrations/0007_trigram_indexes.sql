@@ -0,0 +1,15 @@
+-- ============================================
+-- TRIGRAM INDEXES
+-- Substring filters (ILIKE '%...%') on producers/clients city, wilaya and
+-- shop name cannot use the btree indexes from 01_schema_users.sql.
+-- gin_trgm_ops indexes serve both ILIKE and the fuzzy word-similarity
+-- operator (<%) used by the ?fuzzy=true mode (see db/search.py).
+-- ============================================
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_producers_city_trgm ON producers USING GIN (city gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_producers_wilaya_trgm ON producers USING GIN (wilaya gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_producers_shop_name_trgm ON producers USING GIN (shop_name gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_clients_city_trgm ON clients USING GIN (city gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_clients_wilaya_trgm ON clients USING GIN (wilaya gin_trgm_ops);
@@ -0,0 +1,7 @@
+-- ============================================
+-- KEYSET PAGINATION INDEXES
+-- Product lists are paginated on (created_at DESC, id DESC) with
+-- "WHERE (created_at, id) < (cursor)" instead of returning every row.
+-- ============================================
+CREATE INDEX IF NOT EXISTS idx_products_created_id ON products(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_products_producer_created_id ON products(producer_id, created_at DESC, id DESC);
@@ -0,0 +1,24 @@
+-- ============================================
+-- STOCK HOLDS
+-- Adding or updating a cart line holds its quantity for a limited time.
+-- Available stock = stock - active holds of other carts, so a product
+-- rushed by many clients refuses them at add-to-cart instead of failing
+-- their checkout. Expired holds are ignored by every query and deleted in
+-- batches by the expire-stock-holds cron (see products/queries_stock.py).
+-- ============================================
+CREATE TABLE IF NOT EXISTS stock_holds (
+    id BIGSERIAL PRIMARY KEY,
+    product_id INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    cart_id BIGINT NOT NULL REFERENCES carts(id) ON DELETE CASCADE,
+    -- One hold per cart line, dropped with the line (removal, checkout)
+    cart_item_id BIGINT NOT NULL UNIQUE REFERENCES cart_items(id) ON DELETE CASCADE,
+    quantity NUMERIC(10, 2) NOT NULL CHECK (quantity > 0),
+    expires_at TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+-- Active holds of a product: SUM(quantity) WHERE product_id = ? AND expires_at > now()
+CREATE INDEX IF NOT EXISTS idx_stock_holds_product_expires ON stock_holds(product_id, expires_at);
+
+-- Sweeper: oldest expired holds first
+CREATE INDEX IF NOT EXISTS idx_stock_holds_expires ON stock_holds(expires_at);
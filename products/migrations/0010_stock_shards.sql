@@ -0,0 +1,19 @@
+-- ============================================
+-- SHARDED STOCK COUNTERS
+-- Hot products (e.g. a rushed anti-gaspi product) can spread their stock
+-- over N rows of product_stock_shards so concurrent checkouts decrement
+-- different rows instead of queueing on the products row lock.
+-- products.stock_shards = 0: stock lives in products.stock (default)
+-- products.stock_shards = N: stock is SUM(product_stock_shards.stock);
+--   products.stock is only a mirror refreshed by the stock cron for lists.
+-- See products/queries_stock.py and `manage.py shard_stock`.
+-- ============================================
+ALTER TABLE products ADD COLUMN IF NOT EXISTS stock_shards SMALLINT NOT NULL DEFAULT 0
+    CHECK (stock_shards >= 0);
+
+CREATE TABLE IF NOT EXISTS product_stock_shards (
+    product_id INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    shard SMALLINT NOT NULL,
+    stock NUMERIC(10, 2) NOT NULL CHECK (stock >= 0),
+    PRIMARY KEY (product_id, shard)
+);
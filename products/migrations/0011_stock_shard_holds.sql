@@ -0,0 +1,54 @@
+-- ============================================
+-- SHARD-LOCAL STOCK HOLDS
+-- A hold on a sharded product sits on one shard (stock_holds.shard) and
+-- is counted in that shard's held column, kept up to date by a trigger
+-- (holds also go away through ON DELETE CASCADE). A checkout decrements a
+-- shard while stock - held covers it: the check only reads the shard row
+-- it locks, so checkouts of a product held by other carts still spread
+-- over the shards. Holds on plain products keep shard = NULL.
+-- Expired holds stay counted until they are swept (see
+-- products/queries_stock.py).
+-- ============================================
+ALTER TABLE stock_holds ADD COLUMN IF NOT EXISTS shard SMALLINT;
+
+ALTER TABLE product_stock_shards ADD COLUMN IF NOT EXISTS held NUMERIC(10, 2) NOT NULL DEFAULT 0
+    CHECK (held >= 0);
+
+CREATE OR REPLACE FUNCTION stock_holds_count_on_shard()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.shard IS NOT NULL THEN
+        UPDATE product_stock_shards
+        SET held = held - OLD.quantity
+        WHERE product_id = OLD.product_id AND shard = OLD.shard;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.shard IS NOT NULL THEN
+        UPDATE product_stock_shards
+        SET held = held + NEW.quantity
+        WHERE product_id = NEW.product_id AND shard = NEW.shard;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS stock_holds_count_on_shard_trigger ON stock_holds;
+CREATE TRIGGER stock_holds_count_on_shard_trigger
+    AFTER INSERT OR UPDATE OF shard, quantity OR DELETE ON stock_holds
+    FOR EACH ROW
+    EXECUTE FUNCTION stock_holds_count_on_shard();
+
+-- Holds taken before this migration are not on any shard: fold sharded
+-- products back into products.stock, re-shard them with manage.py shard_stock
+WITH removed AS (
+    DELETE FROM product_stock_shards
+    RETURNING product_id, stock
+)
+UPDATE products p
+SET stock = r.total,
+    stock_shards = 0
+FROM (
+    SELECT product_id, SUM(stock) AS total
+    FROM removed
+    GROUP BY product_id
+) r
+WHERE p.id = r.product_id;
@@ -0,0 +1,274 @@
+"""
+Product detail cache.
+
+get_product_detail is read by the product page, the cart and checkout.
+Rows are cached in the shared Django cache under a per-product version and
+mirrored in a small in-process LRU. Product writes bump the version, which
+makes every copy (local or shared, in any process) unreachable at once.
+Every read checks the version, so the shared cache must be in memory
+(Redis): serving with any other backend is refused (users/apps.py).
+Local copies are also dropped after PRODUCT_CACHE_LOCAL_MAX_AGE seconds,
+which bounds staleness if a version bump is lost (cache flush, eviction).
+
+Producer/contact columns embedded in the detail (shop name, city, email...)
+are not versioned and may lag for up to PRODUCT_CACHE_TTL seconds.
+
+Inside an HTTP request (ProductIdentityMapMiddleware), rows are also kept
+in a request-scoped identity map: serializers, model methods and views
+reading the same product share one row, without touching the cache again.
+The map is dropped at the end of the request and product writes evict
+their rows from it.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+
+# Shared cache lifetime of one product detail (seconds)
+PRODUCT_CACHE_TTL = 300
+
+# Products kept in the in-process LRU
+PRODUCT_CACHE_LOCAL_SIZE = 1024
+
+# Longest time a product is served from the in-process LRU (seconds)
+PRODUCT_CACHE_LOCAL_MAX_AGE = 30
+
+_local = OrderedDict()  # product_id -> (version, product, cached_at)
+_lock = threading.Lock()
+_request_products = ContextVar('request_products', default=None)
+_stats = {
+    'request_hits': 0,
+    'local_hits': 0,
+    'shared_hits': 0,
+    'misses': 0,
+    'invalidations': 0,
+}
+
+
+def _version_key(product_id):
+    return f'product_detail:version:{product_id}'
+
+
+def _data_key(product_id, version):
+    return f'product_detail:{product_id}:v{version}'
+
+
+def _new_version():
+    # Never reuse a version, even if the version key was evicted
+    return time.time_ns()
+
+
+def _current_version(product_id):
+    """Read the product version, creating one if the key is missing."""
+    key = _version_key(product_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def _fresh(entry, version, now):
+    return entry is not None and entry[0] == version and now - entry[2] < PRODUCT_CACHE_LOCAL_MAX_AGE
+
+
+def begin_request_scope():
+    """Start a request-scoped product identity map. Returns a reset token."""
+    return _request_products.set({})
+
+
+def end_request_scope(token):
+    """Drop the identity map started by begin_request_scope."""
+    _request_products.reset(token)
+
+
+def _count(stat):
+    with _lock:
+        _stats[stat] += 1
+
+
+def get_cached_product_detail(product_id, loader):
+    """
+    Return loader(product_id) through the local LRU and the shared cache.
+
+    The returned dict is a copy: callers may pop/set keys freely.
+    Missing products (None) are not cached.
+    """
+    try:
+        product_id = int(product_id)
+    except (TypeError, ValueError):
+        return loader(product_id)
+
+    scope = _request_products.get()
+    if scope is not None and product_id in scope:
+        _count('request_hits')
+        return dict(scope[product_id])
+
+    version = _current_version(product_id)
+
+    with _lock:
+        entry = _local.get(product_id)
+        if _fresh(entry, version, time.monotonic()):
+            _local.move_to_end(product_id)
+            _stats['local_hits'] += 1
+            if scope is not None:
+                scope[product_id] = entry[1]
+            return dict(entry[1])
+
+    product = cache.get(_data_key(product_id, version))
+    if product is not None:
+        _count('shared_hits')
+    else:
+        _count('misses')
+        product = loader(product_id)
+        if product is None:
+            return None
+        cache.set(_data_key(product_id, version), product, PRODUCT_CACHE_TTL)
+
+    with _lock:
+        _local[product_id] = (version, product, time.monotonic())
+        _local.move_to_end(product_id)
+        while len(_local) > PRODUCT_CACHE_LOCAL_SIZE:
+            _local.popitem(last=False)
+
+    if scope is not None:
+        scope[product_id] = product
+
+    return dict(product)
+
+
+def get_cached_product_details(product_ids, bulk_loader):
+    """
+    Bulk version of get_cached_product_detail.
+
+    bulk_loader(ids) must return {id: product} for the ids it found and is
+    called at most once, with the ids missing from both cache levels.
+    Returns {id: product copy}; unknown ids are absent.
+    """
+    product_ids = list(dict.fromkeys(int(product_id) for product_id in product_ids))
+    if not product_ids:
+        return {}
+
+    scope = _request_products.get()
+    in_scope = {}
+    if scope is not None:
+        in_scope = {product_id: scope[product_id] for product_id in product_ids if product_id in scope}
+        with _lock:
+            _stats['request_hits'] += len(in_scope)
+        product_ids = [product_id for product_id in product_ids if product_id not in in_scope]
+        if not product_ids:
+            return {product_id: dict(product) for product_id, product in in_scope.items()}
+
+    version_keys = {product_id: _version_key(product_id) for product_id in product_ids}
+    versions = cache.get_many(version_keys.values())
+    for product_id, key in version_keys.items():
+        if key not in versions:
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key)
+    versions = {product_id: versions[key] for product_id, key in version_keys.items()}
+
+    found = {}
+    now = time.monotonic()
+    with _lock:
+        for product_id in product_ids:
+            entry = _local.get(product_id)
+            if _fresh(entry, versions[product_id], now):
+                _local.move_to_end(product_id)
+                found[product_id] = entry[1]
+        _stats['local_hits'] += len(found)
+
+    pending = [product_id for product_id in product_ids if product_id not in found]
+    if pending:
+        data_keys = {_data_key(product_id, versions[product_id]): product_id for product_id in pending}
+        shared = cache.get_many(data_keys.keys())
+        loaded = {data_keys[key]: product for key, product in shared.items()}
+
+        missing = [product_id for product_id in pending if product_id not in loaded]
+        with _lock:
+            _stats['shared_hits'] += len(loaded)
+            _stats['misses'] += len(missing)
+
+        if missing:
+            from_db = bulk_loader(missing)
+            cache.set_many({
+                _data_key(product_id, versions[product_id]): product
+                for product_id, product in from_db.items()
+            }, PRODUCT_CACHE_TTL)
+            loaded.update(from_db)
+
+        now = time.monotonic()
+        with _lock:
+            for product_id, product in loaded.items():
+                _local[product_id] = (versions[product_id], product, now)
+                _local.move_to_end(product_id)
+            while len(_local) > PRODUCT_CACHE_LOCAL_SIZE:
+                _local.popitem(last=False)
+
+        found.update(loaded)
+
+    if scope is not None:
+        scope.update(found)
+    found.update(in_scope)
+
+    return {product_id: dict(product) for product_id, product in found.items()}
+
+
+def _bump_versions(product_ids):
+    # A new value rather than incr: concurrent bumps cannot collapse into
+    # one value that a reader has already cached a row under
+    cache.set_many({_version_key(product_id): _new_version() for product_id in product_ids}, None)
+
+    with _lock:
+        for product_id in product_ids:
+            _local.pop(product_id, None)
+        _stats['invalidations'] += len(product_ids)
+
+    scope = _request_products.get()
+    if scope is not None:
+        for product_id in product_ids:
+            scope.pop(product_id, None)
+
+
+def invalidate_product_details(product_ids):
+    """
+    Invalidate cached details of the given products.
+
+    Runs immediately, and again after commit when called inside a
+    transaction, so a concurrent reader cannot re-cache the old row.
+    """
+    product_ids = [int(product_id) for product_id in product_ids]
+    if not product_ids:
+        return
+
+    _bump_versions(product_ids)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump_versions(product_ids))
+
+
+def invalidate_product_detail(product_id):
+    """Invalidate the cached detail of one product."""
+    invalidate_product_details([product_id])
+
+
+def get_product_cache_stats():
+    """Hit/miss counters of this process."""
+    with _lock:
+        stats = dict(_stats)
+        stats['local_size'] = len(_local)
+
+    lookups = stats['request_hits'] + stats['local_hits'] + stats['shared_hits'] + stats['misses']
+    stats['hit_rate'] = round((lookups - stats['misses']) / lookups, 4) if lookups else None
+    return stats
+
+
+def clear_local_product_cache():
+    """Empty the in-process LRU and reset counters (tests)."""
+    with _lock:
+        _local.clear()
+        for stat in _stats:
+            _stats[stat] = 0
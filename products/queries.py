@@ -1,5 +1,19 @@
+from django.core.cache import cache
 from django.db import connection
 from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+import hashlib
+import random
+
+from db.pagination import DEFAULT_PAGE_SIZE, decode_cursor, keyset_condition, paginate
+from db.search import headline_sql, similarity_rank_sql, substring_match_sql, tsquery_sql
+
+from .product_cache import (
+    get_cached_product_detail, get_cached_product_details,
+    invalidate_product_detail, invalidate_product_details,
+)
+from .queries_stock import VISIBLE_STOCK_SQL, set_sharded_stock
+from .seasonal_utils import get_product_season_months, get_season_index, months_from_mask
 
 
 def dict_fetchall(cursor):
@@ -15,6 +29,35 @@ def dict_fetchone(cursor):
     return dict(zip(columns, row)) if row else None
 
 
+# Homepage sampler reads this many candidates per product shown
+HOME_SAMPLE_OVERFETCH = 3
+
+# Products given a new random_key per reshuffle run
+RESHUFFLE_BATCH_SIZE = 500
+
+# Sort key of paginated product lists (all DESC)
+PRODUCT_PAGE_KEY = ('created_at', 'id')
+
+# Sort key of ranked searches (all DESC)
+SEARCH_PAGE_KEY = ('search_rank', 'created_at', 'id')
+
+# Sort key of fuzzy (similarity-ordered) filters (all DESC)
+FUZZY_PAGE_KEY = ('similarity', 'created_at', 'id')
+
+# Facets returned by get_product_facets, in GROUPING() column order
+PRODUCT_FACETS = ('product_type', 'sale_type', 'is_anti_gaspi', 'wilaya', 'price_bucket')
+
+# Price buckets in DZD: (low, high), high excluded, None = no upper bound
+PRICE_BUCKETS = ((0, 100), (100, 500), (500, 1000), (1000, 5000), (5000, None))
+
+PRODUCT_FACETS_CACHE_TTL = 60
+
+# float8: the cursor must hold the exact rank the keyset condition compares
+# (ts_rank is a real, whose shortest decimal is not the same float8)
+SEARCH_RANK_SQL = """(COALESCE(ts_rank(p.search_vector, q.query), 0)
+                    + COALESCE(ts_rank(pr.search_vector, q.producer_query), 0))::float8"""
+
+
 # ============================================
 # PUBLIC QUERIES (No authentication required)
 # ============================================
@@ -22,52 +65,149 @@ def dict_fetchone(cursor):
 def get_home_products(product_type=None, is_anti_gaspi=None, limit=20):
     """
     Get products for homepage with filters and random order.
-    PostgreSQL: Uses RANDOM() for random ordering.
+    PostgreSQL: Reads the indexed random_key column from a random
+    starting point and wraps around to the start of the index, instead
+    of sorting the whole table with ORDER BY RANDOM(). Cost stays
+    roughly constant as the catalogue grows.
     """
-    sql = """
-        SELECT 
+    filters = ""
+    filter_params = []
+    
+    if product_type:
+        filters += " AND p.product_type = %s"
+        filter_params.append(product_type)
+    
+    if is_anti_gaspi is not None:
+        filters += " AND p.is_anti_gaspi = %s"
+        filter_params.append(is_anti_gaspi)
+    
+    # Over-fetch a little so neighbours in key order are not always
+    # shown together, then sample the page in Python
+    pool_size = limit * HOME_SAMPLE_OVERFETCH
+    pivot = random.random()
+    
+    branch = """
+        (SELECT 
             p.id, p.name, p.photo_url, p.price, p.sale_type, p.stock,
             p.product_type, p.is_anti_gaspi, p.harvest_date,
             pr.id as producer_id,
             pr.shop_name as producer_name
         FROM products p
         INNER JOIN producers pr ON p.producer_id = pr.id
-        WHERE 1=1
-    """
-    params = []
+        WHERE p.random_key {op} %s{filters}
+        ORDER BY p.random_key
+        LIMIT %s)
+    """
+    sql = (
+        branch.format(op='>=', filters=filters)
+        + " UNION ALL "
+        + branch.format(op='<', filters=filters)
+        + " LIMIT %s"
+    )
+    params = (
+        [pivot] + filter_params + [pool_size]
+        + [pivot] + filter_params + [pool_size]
+        + [pool_size]
+    )
     
-    if product_type:
-        sql += " AND p.product_type = %s"
-        params.append(product_type)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        products = dict_fetchall(cursor)
     
-    if is_anti_gaspi is not None:
-        sql += " AND p.is_anti_gaspi = %s"
-        params.append(is_anti_gaspi)
+    if len(products) > limit:
+        return random.sample(products, limit)
     
-    sql += " ORDER BY RANDOM() LIMIT %s"
-    params.append(limit)
+    random.shuffle(products)
+    return products
+
+
+def reshuffle_product_random_keys(batch_size=RESHUFFLE_BATCH_SIZE):
+    """
+    Give a batch of products a new random sort key.
+    Run periodically so homepage samples do not keep the same neighbours.
+    PostgreSQL: The batch is a run of the random_key index from a random
+    starting point, so each run rewrites at most batch_size rows and every
+    product is eventually reshuffled. Rows locked by a checkout are skipped
+    instead of waited for.
+    Returns the number of products reshuffled.
+    """
+    sql = """
+        WITH batch AS (
+            SELECT id FROM products
+            WHERE random_key >= %s
+            ORDER BY random_key
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE products p SET random_key = random()
+        FROM batch
+        WHERE p.id = batch.id
+    """
     
     with connection.cursor() as cursor:
-        cursor.execute(sql, params)
-        return dict_fetchall(cursor)
+        cursor.execute(sql, [random.random(), batch_size])
+        return cursor.rowcount
 
 
-def search_products(query, product_type=None, is_anti_gaspi=None):
+def search_products(query, product_type=None, is_anti_gaspi=None,
+                    cursor=None, page_size=DEFAULT_PAGE_SIZE):
     """
-    Search products by name or description.
-    PostgreSQL: Uses ILIKE for case-insensitive search.
+    Full-text search on product name and description, one page at a time.
+    PostgreSQL: Uses the search_vector GIN index, ranked with ts_rank.
+    Keyset pagination on (search_rank, created_at, id).
+    
+    Returns (products, next_cursor). Raises InvalidCursor for a bad cursor.
     """
-    sql = """
-        SELECT 
-            p.id, p.name, p.photo_url, p.price, p.sale_type, p.stock,
-            p.product_type, p.is_anti_gaspi, p.harvest_date,
-            pr.id as producer_id,
-            pr.shop_name as producer_name
-        FROM products p
-        INNER JOIN producers pr ON p.producer_id = pr.id
-        WHERE (p.name ILIKE %s OR p.description ILIKE %s)
+    after = decode_cursor(cursor, SEARCH_PAGE_KEY)
+    products = _search_products_ranked(
+        search=query,
+        product_type=product_type,
+        is_anti_gaspi=is_anti_gaspi,
+        limit=page_size + 1,
+        after=after
+    )
+    return paginate(products, page_size, SEARCH_PAGE_KEY)
+
+
+def _search_products_ranked(search=None, producer_search=None, product_type=None,
+                            is_anti_gaspi=None, limit=None, after=None):
+    """
+    Ranked product search shared by search_products and search_products_advanced.
+    PostgreSQL: Matches products.search_vector and/or producers.search_vector,
+    orders by ts_rank, then computes ts_headline snippets for the returned
+    page only. after is the decoded sort key of the previous page's last row.
+    """
+    product_query, product_params = tsquery_sql(search)
+    producer_query, producer_params = tsquery_sql(producer_search)
+    
+    # Terms without any searchable word cannot match anything
+    if (search and product_query is None) or (producer_search and producer_query is None):
+        return []
+    
+    sql = f"""
+        WITH q AS (
+            SELECT {product_query or 'NULL::tsquery'} AS query,
+                   {producer_query or 'NULL::tsquery'} AS producer_query
+        ),
+        hits AS (
+            SELECT 
+                p.id, p.name, p.description, p.photo_url, p.price, p.sale_type, p.stock,
+                p.product_type, p.is_anti_gaspi, p.harvest_date, p.created_at,
+                pr.id as producer_id,
+                pr.shop_name as producer_name,
+                {SEARCH_RANK_SQL} as search_rank
+            FROM products p
+            INNER JOIN producers pr ON p.producer_id = pr.id
+            CROSS JOIN q
+            WHERE 1=1
     """
-    params = [f'%{query}%', f'%{query}%']
+    params = product_params + producer_params
+    
+    if product_query:
+        sql += " AND p.search_vector @@ q.query"
+    
+    if producer_query:
+        sql += " AND pr.search_vector @@ q.producer_query"
     
     if product_type:
         sql += " AND p.product_type = %s"
@@ -77,21 +217,47 @@ def search_products(query, product_type=None, is_anti_gaspi=None):
         sql += " AND p.is_anti_gaspi = %s"
         params.append(is_anti_gaspi)
     
-    sql += " ORDER BY p.created_at DESC"
+    if after:
+        sql += " AND " + keyset_condition([SEARCH_RANK_SQL, 'p.created_at', 'p.id'])
+        params.extend(after)
+    
+    sql += f"""
+            ORDER BY search_rank DESC, p.created_at DESC, p.id DESC
+            LIMIT %s
+        )
+        SELECT 
+            h.id, h.name, h.photo_url, h.price, h.sale_type, h.stock,
+            h.product_type, h.is_anti_gaspi, h.harvest_date, h.created_at,
+            h.producer_id, h.producer_name, h.search_rank,
+            {headline_sql('h.name', 'q.query')} as name_highlight,
+            {headline_sql("COALESCE(h.description, '')", 'q.query')} as description_highlight,
+            {headline_sql('h.producer_name', 'q.producer_query')} as producer_name_highlight
+        FROM hits h
+        CROSS JOIN q
+        ORDER BY h.search_rank DESC, h.created_at DESC, h.id DESC
+    """
+    params.append(limit)
     
     with connection.cursor() as cursor:
         cursor.execute(sql, params)
         return dict_fetchall(cursor)
 
 
-def get_producer_products(producer_id, product_type=None, is_anti_gaspi=None):
+def get_producer_products(producer_id, product_type=None, is_anti_gaspi=None,
+                          cursor=None, page_size=DEFAULT_PAGE_SIZE):
     """
-    Get all products from a specific producer (public view).
+    Get products from a specific producer (public view), one page at a time.
+    PostgreSQL: Keyset pagination on (created_at, id), served by
+    idx_products_producer_created_id.
+    
+    Returns (products, next_cursor). Raises InvalidCursor for a bad cursor.
     """
+    after = decode_cursor(cursor, PRODUCT_PAGE_KEY)
+    
     sql = """
         SELECT 
             p.id, p.name, p.photo_url, p.price, p.sale_type, p.stock,
-            p.product_type, p.is_anti_gaspi, p.harvest_date,
+            p.product_type, p.is_anti_gaspi, p.harvest_date, p.created_at,
             pr.id as producer_id,
             pr.shop_name as producer_name
         FROM products p
@@ -108,22 +274,24 @@ def get_producer_products(producer_id, product_type=None, is_anti_gaspi=None):
         sql += " AND p.is_anti_gaspi = %s"
         params.append(is_anti_gaspi)
     
-    sql += " ORDER BY p.created_at DESC"
+    if after:
+        sql += " AND " + keyset_condition(['p.created_at', 'p.id'])
+        params.extend(after)
+    
+    sql += " ORDER BY p.created_at DESC, p.id DESC LIMIT %s"
+    params.append(page_size + 1)
     
     with connection.cursor() as cursor:
         cursor.execute(sql, params)
-        return dict_fetchall(cursor)
+        return paginate(dict_fetchall(cursor), page_size, PRODUCT_PAGE_KEY)
 
 
-def get_product_detail(product_id):
-    """
-    Get single product with full details including producer info.
-    PostgreSQL: Fixed table names and column references.
-    """
-    sql = """
+# Full product row shared by the single and bulk detail loaders
+# (stock of sharded products is the sum of their shards)
+PRODUCT_DETAIL_SELECT = f"""
         SELECT 
             p.id, p.name, p.description, p.photo_url, p.sale_type,
-            p.price, p.stock, p.product_type, p.harvest_date, 
+            p.price, {VISIBLE_STOCK_SQL} AS stock, p.product_type, p.harvest_date, 
             p.is_anti_gaspi, p.created_at, p.updated_at,
             pr.id as producer_id,
             pr.shop_name,
@@ -138,6 +306,25 @@ def get_product_detail(product_id):
         FROM products p
         INNER JOIN producers pr ON p.producer_id = pr.id
         INNER JOIN users u ON pr.user_id = u.id
+"""
+
+
+def get_product_detail(product_id):
+    """
+    Get single product with full details including producer info.
+    Served from the product detail cache (see product_cache.py); the
+    returned dict is a copy the caller may modify.
+    """
+    return get_cached_product_detail(product_id, _load_product_detail)
+
+
+def _load_product_detail(product_id):
+    """
+    Load single product with full details from the database.
+    PostgreSQL: Fixed table names and column references.
+    """
+    sql = f"""
+        {PRODUCT_DETAIL_SELECT}
         WHERE p.id = %s
     """
     
@@ -146,22 +333,48 @@ def get_product_detail(product_id):
         return dict_fetchone(cursor)
 
 
-def filter_products(sale_type=None, product_type=None, is_anti_gaspi=None, 
-                   min_price=None, max_price=None, wilaya=None, limit=None):
+def get_product_details_bulk(product_ids):
     """
-    Filter products by multiple criteria.
-    PostgreSQL: Uses ILIKE for case-insensitive search on wilaya.
+    Get several products with full details, keyed by product id.
+    Same rows as get_product_detail; unknown ids are absent from the result.
+    Served from the product detail cache, then one query for the misses.
     """
-    sql = """
-        SELECT 
-            p.id, p.name, p.photo_url, p.price, p.sale_type, p.stock,
-            p.product_type, p.is_anti_gaspi, p.harvest_date,
-            pr.id as producer_id,
-            pr.shop_name as producer_name
-        FROM products p
-        INNER JOIN producers pr ON p.producer_id = pr.id
-        WHERE 1=1
+    return get_cached_product_details(product_ids, _load_product_details_bulk)
+
+
+def _load_product_details_bulk(product_ids):
+    """
+    Load several products with full details from the database.
+    PostgreSQL: One query with id = ANY(array).
+    """
+    sql = f"""
+        {PRODUCT_DETAIL_SELECT}
+        WHERE p.id = ANY(%s)
+    """
+    
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [list(product_ids)])
+        return {row['id']: row for row in dict_fetchall(cursor)}
+
+
+def normalize_wilaya(wilaya):
+    """
+    Canonical wilaya filter: trimmed, single-spaced, lowercase (None if empty).
+    Applied before both the SQL and the facets cache key, so equal keys
+    always mean equal filters (ILIKE and pg_trgm ignore case).
+    """
+    if not wilaya:
+        return None
+    return ' '.join(str(wilaya).lower().split()) or None
+
+
+def _product_filter_sql(sale_type=None, product_type=None, is_anti_gaspi=None,
+                        min_price=None, max_price=None, wilaya=None, fuzzy=False):
+    """
+    Build the WHERE conditions shared by filter_products and get_product_facets.
+    Expects products as p and producers as pr. Returns (sql, params).
     """
+    sql = ""
     params = []
     
     if sale_type:
@@ -185,28 +398,194 @@ def filter_products(sale_type=None, product_type=None, is_anti_gaspi=None,
         params.append(max_price)
     
     if wilaya:
-        sql += " AND pr.wilaya ILIKE %s"
-        params.append(f'%{wilaya}%')
+        match_sql, match_params = substring_match_sql('pr.wilaya', wilaya, fuzzy)
+        sql += f" AND {match_sql}"
+        params.extend(match_params)
+    
+    return sql, params
+
+
+def filter_products(sale_type=None, product_type=None, is_anti_gaspi=None, 
+                   min_price=None, max_price=None, wilaya=None,
+                   fuzzy=False, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Filter products by multiple criteria, one page at a time.
+    PostgreSQL: Uses ILIKE for case-insensitive search on wilaya (trigram
+    index). With fuzzy=True, misspelled wilayas also match and results are
+    ordered by similarity. Keyset pagination on (created_at, id), preceded
+    by the similarity in fuzzy mode.
+    
+    Returns (products, next_cursor). Raises InvalidCursor for a bad cursor.
+    """
+    wilaya = normalize_wilaya(wilaya)
+    ranked = bool(fuzzy and wilaya)
+    page_key = FUZZY_PAGE_KEY if ranked else PRODUCT_PAGE_KEY
+    after = decode_cursor(cursor, page_key)
+    
+    rank_sql, rank_params = similarity_rank_sql([('pr.wilaya', wilaya)]) if ranked else (None, [])
+    
+    sql = f"""
+        SELECT 
+            p.id, p.name, p.photo_url, p.price, p.sale_type, p.stock,
+            p.product_type, p.is_anti_gaspi, p.harvest_date, p.created_at,
+            pr.id as producer_id,
+            pr.shop_name as producer_name
+            {f', {rank_sql} as similarity' if ranked else ''}
+        FROM products p
+        INNER JOIN producers pr ON p.producer_id = pr.id
+        WHERE 1=1
+    """
+    filter_sql, filter_params = _product_filter_sql(
+        sale_type, product_type, is_anti_gaspi, min_price, max_price, wilaya, fuzzy
+    )
+    sql += filter_sql
+    params = rank_params + filter_params
     
-    sql += " ORDER BY p.created_at DESC"
+    if after and ranked:
+        sql += " AND " + keyset_condition([rank_sql, 'p.created_at', 'p.id'])
+        params.extend(rank_params + after)
+    elif after:
+        sql += " AND " + keyset_condition(['p.created_at', 'p.id'])
+        params.extend(after)
     
-    if limit:
-        sql += " LIMIT %s"
-        params.append(limit)
+    if ranked:
+        sql += " ORDER BY similarity DESC, p.created_at DESC, p.id DESC"
+    else:
+        sql += " ORDER BY p.created_at DESC, p.id DESC"
+    
+    sql += " LIMIT %s"
+    params.append(page_size + 1)
     
     with connection.cursor() as cursor:
         cursor.execute(sql, params)
-        return dict_fetchall(cursor)
+        return paginate(dict_fetchall(cursor), page_size, page_key)
+
+
+def _price_bucket_sql():
+    """CASE expression mapping p.price to a PRICE_BUCKETS label."""
+    whens = []
+    for low, high in PRICE_BUCKETS:
+        label = price_bucket_label(low, high)
+        if high is None:
+            whens.append(f"WHEN p.price >= {low} THEN '{label}'")
+        else:
+            whens.append(f"WHEN p.price >= {low} AND p.price < {high} THEN '{label}'")
+    return "CASE " + " ".join(whens) + " END"
+
+
+def price_bucket_label(low, high):
+    """Label of a price bucket, e.g. '100-500' or '1000+'."""
+    return f'{low}+' if high is None else f'{low}-{high}'
+
+
+def get_product_facets(sale_type=None, product_type=None, is_anti_gaspi=None,
+                       min_price=None, max_price=None, wilaya=None, fuzzy=False):
+    """
+    Count products per facet value for the current filter set.
+    PostgreSQL: One GROUPING SETS query over the filter_products conditions.
+    Results are cached per normalized filter key for PRODUCT_FACETS_CACHE_TTL.
+    
+    Returns {'total': n, 'product_type': [{'value': ..., 'count': ...}], ...}.
+    """
+    wilaya = normalize_wilaya(wilaya)
+    filters = {
+        'sale_type': sale_type,
+        'product_type': product_type,
+        'is_anti_gaspi': is_anti_gaspi,
+        'min_price': min_price,
+        'max_price': max_price,
+        'wilaya': wilaya,
+        'fuzzy': bool(fuzzy and wilaya),
+    }
+    cache_key = product_facets_cache_key(filters)
+    
+    facets = cache.get(cache_key)
+    if facets is not None:
+        return facets
+    
+    filter_sql, params = _product_filter_sql(**filters)
+    sql = f"""
+        WITH filtered AS (
+            SELECT 
+                p.product_type, p.sale_type, p.is_anti_gaspi, pr.wilaya,
+                {_price_bucket_sql()} as price_bucket
+            FROM products p
+            INNER JOIN producers pr ON p.producer_id = pr.id
+            WHERE 1=1 {filter_sql}
+        )
+        SELECT 
+            product_type, sale_type, is_anti_gaspi, wilaya, price_bucket,
+            GROUPING(product_type, sale_type, is_anti_gaspi, wilaya, price_bucket) as grouping_id,
+            COUNT(*) as count
+        FROM filtered
+        GROUP BY GROUPING SETS (
+            (product_type), (sale_type), (is_anti_gaspi), (wilaya), (price_bucket), ()
+        )
+    """
+    
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = dict_fetchall(cursor)
+    
+    facets = {'total': 0}
+    facets.update({facet: [] for facet in PRODUCT_FACETS})
+    
+    for row in rows:
+        # GROUPING() sets one bit per rolled-up column, first column = highest bit
+        grouped = [
+            facet for position, facet in enumerate(PRODUCT_FACETS)
+            if not row['grouping_id'] & (1 << (len(PRODUCT_FACETS) - 1 - position))
+        ]
+        if not grouped:
+            facets['total'] = row['count']
+        else:
+            facet = grouped[0]
+            facets[facet].append({'value': row[facet], 'count': row['count']})
+    
+    for facet in PRODUCT_FACETS:
+        facets[facet].sort(key=lambda item: (-item['count'], str(item['value'])))
+    
+    cache.set(cache_key, facets, PRODUCT_FACETS_CACHE_TTL)
+    return facets
+
+
+def product_facets_cache_key(filters):
+    """
+    Cache key for a filter set, identical for equivalent filters
+    ('100' vs '100.00' prices, unset values). wilaya must already be
+    normalized (normalize_wilaya), as it is in the SQL.
+    """
+    normalized = []
+    for name in sorted(filters):
+        value = filters[name]
+        if value is None or value == '' or (name == 'fuzzy' and not value):
+            continue
+        if name in ('min_price', 'max_price'):
+            try:
+                value = str(Decimal(str(value)).normalize())
+            except InvalidOperation:
+                value = str(value)
+        normalized.append(f'{name}={value}')
+    
+    digest = hashlib.sha1('&'.join(normalized).encode()).hexdigest()
+    return f'product_facets:{digest}'
 
 
 # ============================================
 # PRODUCER QUERIES (Authenticated producer only)
 # ============================================
 
-def get_my_products(producer_id, product_type=None, is_anti_gaspi=None):
+def get_my_products(producer_id, product_type=None, is_anti_gaspi=None,
+                    cursor=None, page_size=DEFAULT_PAGE_SIZE):
     """
-    Get all products belonging to authenticated producer.
+    Get products belonging to authenticated producer, one page at a time.
+    PostgreSQL: Keyset pagination on (created_at, id), served by
+    idx_products_producer_created_id.
+    
+    Returns (products, next_cursor). Raises InvalidCursor for a bad cursor.
     """
+    after = decode_cursor(cursor, PRODUCT_PAGE_KEY)
+    
     sql = """
         SELECT 
             p.id, p.name, p.photo_url, p.price, p.sale_type, p.stock,
@@ -227,11 +606,16 @@ def get_my_products(producer_id, product_type=None, is_anti_gaspi=None):
         sql += " AND p.is_anti_gaspi = %s"
         params.append(is_anti_gaspi)
     
-    sql += " ORDER BY p.created_at DESC"
+    if after:
+        sql += " AND " + keyset_condition(['p.created_at', 'p.id'])
+        params.extend(after)
+    
+    sql += " ORDER BY p.created_at DESC, p.id DESC LIMIT %s"
+    params.append(page_size + 1)
     
     with connection.cursor() as cursor:
         cursor.execute(sql, params)
-        return dict_fetchall(cursor)
+        return paginate(dict_fetchall(cursor), page_size, PRODUCT_PAGE_KEY)
 
 
 def get_my_product_detail(product_id, producer_id):
@@ -276,7 +660,12 @@ def create_product(producer_id, name, description, photo_url, sale_type,
             producer_id, name, description, photo_url, sale_type,
             price, stock, product_type, harvest_date, is_anti_gaspi
         ])
-        return dict_fetchone(cursor)
+        product = dict_fetchone(cursor)
+    
+    if product:
+        set_product_season_months(product['id'], product['name'])
+    
+    return product
 
 
 def update_product(product_id, producer_id, name, description, photo_url, 
@@ -307,7 +696,14 @@ def update_product(product_id, producer_id, name, description, photo_url,
             name, description, photo_url, sale_type, price, stock,
             product_type, harvest_date, is_anti_gaspi, product_id, producer_id
         ])
-        return dict_fetchone(cursor)
+        product = dict_fetchone(cursor)
+    
+    if product:
+        set_product_season_months(product['id'], product['name'])
+        set_sharded_stock(product['id'], stock)
+        invalidate_product_detail(product['id'])
+    
+    return product
 
 
 def partial_update_product(product_id, producer_id, updates):
@@ -338,7 +734,19 @@ def partial_update_product(product_id, producer_id, updates):
     
     with connection.cursor() as cursor:
         cursor.execute(sql, params)
-        return dict_fetchone(cursor)
+        product = dict_fetchone(cursor)
+    
+    # Season buckets only depend on the name
+    if product and 'name' in updates:
+        set_product_season_months(product['id'], product['name'])
+    
+    if product and 'stock' in updates:
+        set_sharded_stock(product['id'], updates['stock'])
+    
+    if product:
+        invalidate_product_detail(product['id'])
+    
+    return product
 
 
 def delete_product(product_id, producer_id):
@@ -355,7 +763,11 @@ def delete_product(product_id, producer_id):
     with connection.cursor() as cursor:
         cursor.execute(sql, [product_id, producer_id])
         result = cursor.fetchone()
-        return result[0] if result else None
+    
+    if result:
+        invalidate_product_detail(product_id)
+    
+    return result[0] if result else None
 
 
 def toggle_anti_gaspi(product_id, producer_id):
@@ -372,7 +784,12 @@ def toggle_anti_gaspi(product_id, producer_id):
     
     with connection.cursor() as cursor:
         cursor.execute(sql, [product_id, producer_id])
-        return dict_fetchone(cursor)
+        product = dict_fetchone(cursor)
+    
+    if product:
+        invalidate_product_detail(product['id'])
+    
+    return product
 
 
 def get_producer_info(producer_id):
@@ -391,6 +808,95 @@ def get_producer_info(producer_id):
         return dict_fetchone(cursor)
 
 
+# ============================================
+# SEASONAL PRODUCT QUERIES
+# ============================================
+
+def set_product_season_months(product_id, product_name):
+    """
+    Refresh the month buckets of one product from its name.
+    PostgreSQL: Uses unnest() to insert all months in one statement.
+    """
+    months = get_product_season_months(product_name)
+    
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM product_season_months WHERE product_id = %s",
+            [product_id]
+        )
+        
+        if months:
+            cursor.execute("""
+                INSERT INTO product_season_months (month, product_id)
+                SELECT m, %s FROM unnest(%s::smallint[]) AS m
+            """, [product_id, months])
+    
+    return months
+
+
+def rebuild_product_season_months():
+    """
+    Recompute the month buckets of every product.
+    Run after product_seasons changes (import_seasons).
+    Returns the number of (month, product) rows written.
+    """
+    index = get_season_index()
+    
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT id, name FROM products")
+        
+        product_ids = []
+        months = []
+        for product_id, name in cursor.fetchall():
+            for month in months_from_mask(index.months_mask(name)):
+                product_ids.append(product_id)
+                months.append(month)
+        
+        cursor.execute("DELETE FROM product_season_months")
+        cursor.execute("""
+            INSERT INTO product_season_months (product_id, month)
+            SELECT * FROM unnest(%s::integer[], %s::smallint[])
+        """, [product_ids, months])
+        
+        return cursor.rowcount
+
+
+def get_seasonal_products(month, limit=20, offset=0):
+    """
+    Get products in season for a month, newest first.
+    PostgreSQL: Served by the (month, product_id) primary key;
+    COUNT(*) OVER () returns the total before LIMIT/OFFSET.
+    
+    Returns:
+        tuple: (list of products, total number of seasonal products)
+    """
+    sql = """
+        SELECT 
+            p.id, p.name, p.photo_url, p.price, p.sale_type, p.stock,
+            p.product_type, p.is_anti_gaspi, p.harvest_date,
+            pr.id as producer_id,
+            pr.shop_name as producer_name,
+            TRUE as is_seasonal,
+            COUNT(*) OVER () as total_count
+        FROM product_season_months psm
+        INNER JOIN products p ON p.id = psm.product_id
+        INNER JOIN producers pr ON p.producer_id = pr.id
+        WHERE psm.month = %s
+        ORDER BY psm.product_id DESC
+        LIMIT %s OFFSET %s
+    """
+    
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [month, limit, offset])
+        products = dict_fetchall(cursor)
+    
+    total = products[0]['total_count'] if products else 0
+    for product in products:
+        del product['total_count']
+    
+    return products, total
+
+
 # ============================================
 # ANTI-GASPI AUTOMATION QUERIES
 # ============================================
@@ -449,7 +955,7 @@ def mark_products_as_anti_gaspi():
 =======
 >>>>>>> 33f7a2d22d51c7734ecadb4759a1c8c2dc77ec6b
     Returns the number of products marked.
-    PostgreSQL: Uses rowcount to get affected rows.
+    PostgreSQL: Uses RETURNING id to invalidate the cached details.
     """
     sql = """
         UPDATE products
@@ -466,11 +972,15 @@ def mark_products_as_anti_gaspi():
             AND stock > 3
             AND CURRENT_DATE - harvest_date >= 2
             AND is_anti_gaspi = FALSE
+        RETURNING id
     """
     
     with connection.cursor() as cursor:
         cursor.execute(sql)
-        return cursor.rowcount
+        product_ids = [row[0] for row in cursor.fetchall()]
+    
+    invalidate_product_details(product_ids)
+    return len(product_ids)
 
 
 def get_anti_gaspi_price(product_id):
@@ -526,48 +1036,15 @@ def search_products_advanced(search=None, producer_search=None, product_type=Non
     """
     Advanced search for products by name AND/OR producer name.
     Supports filtering by product type and anti-gaspi status.
+    PostgreSQL: Full-text search on products and producers, ranked with ts_rank.
     """
-    from django.db import connection
-    
-    sql = """
-        SELECT 
-            p.id, p.name, p.photo_url, p.price, p.sale_type, p.stock,
-            p.product_type, p.is_anti_gaspi, p.harvest_date,
-            pr.id as producer_id,
-            pr.shop_name as producer_name
-        FROM products p
-        INNER JOIN producers pr ON p.producer_id = pr.id
-        WHERE 1=1
-    """
-    params = []
-    
-    # Search product name or description
-    if search:
-        sql += " AND (p.name ILIKE %s OR p.description ILIKE %s)"
-        params.extend([f'%{search}%', f'%{search}%'])
-    
-    # Search producer/shop name
-    if producer_search:
-        sql += " AND pr.shop_name ILIKE %s"
-        params.append(f'%{producer_search}%')
-    
-    # Product type filter
-    if product_type:
-        sql += " AND p.product_type = %s"
-        params.append(product_type)
-    
-    # Anti-gaspi filter
-    if is_anti_gaspi is not None:
-        sql += " AND p.is_anti_gaspi = %s"
-        params.append(is_anti_gaspi)
-    
-    sql += " ORDER BY p.created_at DESC LIMIT %s"
-    params.append(limit)
-    
-    with connection.cursor() as cursor:
-        cursor.execute(sql, params)
-        columns = [col[0] for col in cursor.description]
-        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    return _search_products_ranked(
+        search=search,
+        producer_search=producer_search,
+        product_type=product_type,
+        is_anti_gaspi=is_anti_gaspi,
+        limit=limit
+    )
 
 
 # ============================================
@@ -688,32 +1165,44 @@ def get_producer_baskets(producer_id, is_active=None):
         return dict_fetchall(cursor)
 
 def get_all_active_baskets(search=None, producer_id=None, limit=20):
-    """Get all active seasonal baskets (for clients to browse)."""
-    sql = """
+    """
+    Get all active seasonal baskets (for clients to browse).
+    PostgreSQL: search uses seasonal_baskets.search_vector, ranked with ts_rank.
+    """
+    basket_query, params = tsquery_sql(search)
+    if search and basket_query is None:
+        return []
+    
+    sql = f"""
+        WITH q AS (SELECT {basket_query or 'NULL::tsquery'} AS query)
         SELECT 
             sb.id, sb.name, sb.description,
             sb.discount_percentage, sb.original_price, sb.discounted_price,
             sb.delivery_frequency, sb.created_at,
             p.id as producer_id, p.shop_name, p.city, p.wilaya, p.is_bio_certified,
             COUNT(DISTINCT cs.id) as subscriber_count,
-            COUNT(DISTINCT bp.product_id) as product_count
+            COUNT(DISTINCT bp.product_id) as product_count,
+            COALESCE(ts_rank(sb.search_vector, q.query), 0) as search_rank
         FROM seasonal_baskets sb
         INNER JOIN producers p ON sb.producer_id = p.id
+        CROSS JOIN q
         LEFT JOIN client_subscriptions cs ON sb.id = cs.basket_id AND cs.status = 'active'
         LEFT JOIN basket_products bp ON sb.id = bp.basket_id
         WHERE sb.is_active = TRUE
     """
-    params = []
     
-    if search:
-        sql += " AND (sb.name ILIKE %s OR sb.description ILIKE %s)"
-        params.extend([f'%{search}%', f'%{search}%'])
+    if basket_query:
+        sql += " AND sb.search_vector @@ q.query"
     
     if producer_id:
         sql += " AND sb.producer_id = %s"
         params.append(producer_id)
     
-    sql += " GROUP BY sb.id, p.id ORDER BY sb.created_at DESC LIMIT %s"
+    sql += """
+        GROUP BY sb.id, p.id, q.query
+        ORDER BY search_rank DESC, sb.created_at DESC
+        LIMIT %s
+    """
     params.append(limit)
     
     with connection.cursor() as cursor:
@@ -0,0 +1,690 @@
+"""
+Checkout stock engine.
+
+All lines of a checkout are decremented by a single set-based UPDATE that
+only touches rows still holding enough stock; cancellations put stock back
+the same way. Rows are locked in product id order first, so checkouts and
+cancellations sharing products always wait on each other in the same order
+and cannot deadlock.
+
+Cart lines also hold their quantity for STOCK_HOLD_TTL seconds
+(stock_holds table, migration 0009). The stock available to a cart is
+stock minus the active holds of the other carts: a rushed anti-gaspi
+product refuses clients at add-to-cart, and a checkout whose lines are all
+held is served by its own holds.
+
+Hot products can be sharded (product_stock_shards table, migration 0010):
+their stock is spread over N rows and a checkout decrements one random
+shard that has capacity, skipping shards locked by other checkouts, so
+concurrent buyers no longer queue on a single row lock. Their visible
+stock is the sum of the shards (VISIBLE_STOCK_SQL). Each hold of a sharded
+product sits on one shard and is counted in its held column (migration
+0011), so holds and checkouts only lock the shard they use. When no single
+shard fits, every shard is locked ORDER BY shard and the stock is taken
+from (or moved between) several of them.
+"""
+
+import random
+from decimal import ROUND_DOWN, Decimal
+
+from django.db import connection, transaction
+
+from .product_cache import invalidate_product_details
+
+
+# Lifetime of a cart line hold, refreshed by add_item / update_item (seconds)
+STOCK_HOLD_TTL = 15 * 60
+
+# Expired holds deleted per sweeper statement
+STOCK_HOLD_SWEEP_BATCH = 1000
+
+# Default number of rows of a sharded product
+DEFAULT_STOCK_SHARDS = 8
+
+# Stock of product p: the sum of its shards when it is sharded
+VISIBLE_STOCK_SQL = """
+    (CASE WHEN p.stock_shards > 0 THEN (
+        SELECT COALESCE(SUM(s.stock), 0)
+        FROM product_stock_shards s
+        WHERE s.product_id = p.id
+    ) ELSE p.stock END)
+"""
+
+# Quantity held on product p by carts other than %s
+OTHER_HOLDS_SQL = """
+    COALESCE((
+        SELECT SUM(h.quantity)
+        FROM stock_holds h
+        WHERE h.product_id = p.id
+        AND h.expires_at > now()
+        AND h.cart_id IS DISTINCT FROM %s
+    ), 0)
+"""
+
+
+class InsufficientStock(Exception):
+    """
+    Raised when some lines of a reservation cannot be served.
+
+    failures: [{'product_id', 'requested', 'available'}] for every failed
+    line; available is None when the product does not exist anymore.
+    Nothing has been decremented when this is raised.
+    """
+
+    def __init__(self, failures):
+        self.failures = failures
+        super().__init__(
+            'Stock insuffisant pour les produits '
+            + ', '.join(str(failure['product_id']) for failure in failures)
+        )
+
+
+def _merge_lines(lines):
+    """Sum quantities per product, sorted by product id (lock order)."""
+    wanted = {}
+    for product_id, quantity in lines:
+        product_id = int(product_id)
+        wanted[product_id] = wanted.get(product_id, Decimal('0')) + Decimal(quantity)
+    return sorted(wanted.items())
+
+
+def _spread_stock(stock, helds):
+    """
+    Shard stocks for a total stock, given the quantity held on each shard.
+
+    Every shard first covers its own holds, the rest is split evenly
+    (remainder on shard 0). When the holds exceed the stock, shards are
+    filled in order up to their holds and none has free units.
+    """
+    stock = Decimal(stock)
+    free = stock - sum(helds)
+
+    if free < 0:
+        stocks = []
+        for held in helds:
+            stocks.append(min(held, stock))
+            stock -= stocks[-1]
+        return stocks
+
+    share = (free / len(helds)).quantize(Decimal('0.01'), rounding=ROUND_DOWN)
+    stocks = [held + share for held in helds]
+    stocks[0] += free - share * len(helds)
+    return stocks
+
+
+def _lock_free_shard(cursor, product_id, quantity, wait):
+    """
+    Lock one random shard with quantity not held. Returns the shard number,
+    or None.
+
+    Shards locked by other transactions are skipped; if every shard that
+    fits is locked and wait is true, waits for one of them instead (the
+    caller must not hold another shard of the product). The condition only
+    reads the locked row: a shard changed by a transaction that committed
+    meanwhile is re-checked on its new version.
+    """
+    for lock in ('FOR UPDATE SKIP LOCKED', 'FOR UPDATE')[:2 if wait else 1]:
+        cursor.execute(f"""
+            SELECT shard
+            FROM product_stock_shards
+            WHERE product_id = %s
+            AND stock - held >= %s
+            ORDER BY random()
+            LIMIT 1
+            {lock}
+        """, [product_id, quantity])
+        row = cursor.fetchone()
+        if row:
+            return row[0]
+    return None
+
+
+def _lock_all_shards(cursor, product_id):
+    """
+    Lock every shard of a product ORDER BY shard and sweep its expired holds.
+    Returns the number of holds swept.
+    """
+    cursor.execute("""
+        SELECT shard
+        FROM product_stock_shards
+        WHERE product_id = %s
+        ORDER BY shard
+        FOR UPDATE
+    """, [product_id])
+    cursor.execute("""
+        DELETE FROM stock_holds
+        WHERE product_id = %s
+        AND shard IS NOT NULL
+        AND expires_at <= now()
+    """, [product_id])
+    return cursor.rowcount
+
+
+def _read_shards(cursor, product_id):
+    """[(shard, stock, held)] of a product, ORDER BY shard."""
+    cursor.execute("""
+        SELECT shard, stock, held
+        FROM product_stock_shards
+        WHERE product_id = %s
+        ORDER BY shard
+    """, [product_id])
+    return cursor.fetchall()
+
+
+def _write_shards(cursor, product_id, stocks):
+    """Set the stock of the shards in stocks ({shard: stock})."""
+    values = ', '.join(['(%s::smallint, %s::numeric)'] * len(stocks))
+    cursor.execute(f"""
+        UPDATE product_stock_shards s
+        SET stock = v.stock
+        FROM (VALUES {values}) AS v (shard, stock)
+        WHERE s.product_id = %s AND s.shard = v.shard
+    """, [value for item in stocks.items() for value in item] + [product_id])
+
+
+def _take_from_shards(cursor, product_id, quantity, cart_id):
+    """
+    Decrement quantity from the shards of a sharded product.
+
+    The holds of cart_id on the product are dropped first: their units
+    become the decrement. Fast path: one random shard whose units not held
+    cover quantity, preferably one no other checkout has locked. Slow
+    path: lock every shard ORDER BY shard and drain their free units in
+    order. Must run in a transaction. Returns the remaining visible stock, or None when
+    the stock available to cart_id is too low.
+    """
+    # Rolled back with its row locks if no single shard fits
+    savepoint = transaction.savepoint()
+
+    # Deleting holds locks their shards (trigger of migration 0011)
+    released = 0
+    if cart_id is not None:
+        cursor.execute("DELETE FROM stock_holds WHERE product_id = %s AND cart_id = %s",
+                       [product_id, cart_id])
+        released = cursor.rowcount
+
+    shard = _lock_free_shard(cursor, product_id, quantity, wait=not released)
+    if shard is not None:
+        transaction.savepoint_commit(savepoint)
+        cursor.execute("""
+            UPDATE product_stock_shards s
+            SET stock = s.stock - %s
+            WHERE s.product_id = %s AND s.shard = %s
+            RETURNING (
+                SELECT SUM(a.stock) FROM product_stock_shards a WHERE a.product_id = s.product_id
+            ) - %s
+        """, [quantity, product_id, shard, quantity])
+        return cursor.fetchone()[0]
+
+    # Never wait for the other shards while holding one out of order
+    transaction.savepoint_rollback(savepoint)
+    _lock_all_shards(cursor, product_id)
+
+    if cart_id is not None:
+        cursor.execute("DELETE FROM stock_holds WHERE product_id = %s AND cart_id = %s",
+                       [product_id, cart_id])
+
+    shards = _read_shards(cursor, product_id)
+    total = sum((stock for _, stock, _ in shards), Decimal('0'))
+
+    stocks = {}
+    left = quantity
+    for shard, stock, held in shards:
+        take = min(max(stock - held, Decimal('0')), left)
+        if take > 0:
+            stocks[shard] = stock - take
+            left -= take
+        if not left:
+            break
+
+    if left:
+        return None
+
+    _write_shards(cursor, product_id, stocks)
+    return total - quantity
+
+
+def _hold_on_shards(cursor, cart_id, cart_item_id, product_id, quantity):
+    """
+    hold_stock for a sharded product: the line's hold is put on one shard.
+
+    Fast path: a random shard whose units not held cover quantity,
+    preferably an unlocked one. Slow path: lock every shard ORDER BY shard and, when the
+    free units of all shards cover quantity, move stock between shards so
+    the one receiving the hold covers it.
+    """
+    # Rolled back with its row locks if no single shard fits
+    savepoint = transaction.savepoint()
+
+    # The line's previous hold no longer counts against it
+    cursor.execute("DELETE FROM stock_holds WHERE cart_item_id = %s", [cart_item_id])
+
+    # Deleting the hold locked its shard (trigger of migration 0011)
+    shard = _lock_free_shard(cursor, product_id, quantity, wait=not cursor.rowcount)
+    if shard is not None:
+        transaction.savepoint_commit(savepoint)
+        cursor.execute(f"SELECT {VISIBLE_STOCK_SQL} - {OTHER_HOLDS_SQL} FROM products p WHERE p.id = %s",
+                       [cart_id, product_id])
+        available = cursor.fetchone()[0]
+    else:
+        transaction.savepoint_rollback(savepoint)
+        savepoint = transaction.savepoint()
+        _lock_all_shards(cursor, product_id)
+        cursor.execute("DELETE FROM stock_holds WHERE cart_item_id = %s", [cart_item_id])
+
+        shards = _read_shards(cursor, product_id)
+        cursor.execute(f"SELECT {VISIBLE_STOCK_SQL} - {OTHER_HOLDS_SQL} FROM products p WHERE p.id = %s",
+                       [cart_id, product_id])
+        available = cursor.fetchone()[0]
+
+        free = sum((stock - held for _, stock, held in shards), Decimal('0'))
+        if not shards or free < quantity:
+            # Leave the previous hold unchanged
+            transaction.savepoint_rollback(savepoint)
+            return False, available
+
+        transaction.savepoint_commit(savepoint)
+
+        # The shard with the most free units gets the hold
+        shard = max(shards, key=lambda row: row[1] - row[2])[0]
+        helds = [held + (quantity if number == shard else 0) for number, _, held in shards]
+        total = sum((stock for _, stock, _ in shards), Decimal('0'))
+        _write_shards(cursor, product_id, dict(zip(
+            [number for number, _, _ in shards], _spread_stock(total, helds)
+        )))
+
+    cursor.execute("""
+        INSERT INTO stock_holds (product_id, cart_id, cart_item_id, quantity, expires_at, shard)
+        VALUES (%s, %s, %s, %s, now() + make_interval(secs => %s), %s)
+    """, [product_id, cart_id, cart_item_id, quantity, STOCK_HOLD_TTL, shard])
+
+    return True, available
+
+
+def reserve_stock(lines, cart_id=None):
+    """
+    Decrement the stock of every (product_id, quantity) line, all or nothing.
+
+    Quantities held by other carts are not available; the holds of cart_id
+    (the cart being checked out) are. Returns {product_id: remaining_stock}.
+    Raises InsufficientStock listing the failed lines; the lines that did
+    fit are rolled back.
+
+    PostgreSQL: the rows are locked ORDER BY id first, then one UPDATE ...
+    FROM (VALUES ...) WHERE stock - holds >= qty RETURNING. Run as its own
+    statement, the UPDATE reads the holds after the lock wait: holds that
+    other carts committed meanwhile are not sold. Sharded products are left
+    out of that UPDATE and taken from their shards afterwards, still in
+    product id order.
+    """
+    wanted = _merge_lines(lines)
+    if not wanted:
+        return {}
+
+    values = ', '.join(['(%s::integer, %s::numeric)'] * len(wanted))
+    params = [value for line in wanted for value in line]
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT id
+                FROM products
+                WHERE id = ANY(%s)
+                AND stock_shards = 0
+                ORDER BY id
+                FOR UPDATE
+            """, [[product_id for product_id, _ in wanted]])
+            locked = [row[0] for row in cursor.fetchall()]
+
+            # New statement, new snapshot: sees the holds committed while waiting
+            cursor.execute(f"""
+                WITH wanted (product_id, quantity) AS (
+                    VALUES {values}
+                ),
+                updated AS (
+                    UPDATE products p
+                    SET stock = p.stock - w.quantity
+                    FROM wanted w
+                    WHERE p.id = w.product_id
+                    AND p.id = ANY(%s)
+                    AND p.stock - {OTHER_HOLDS_SQL} >= w.quantity
+                    RETURNING p.id, p.stock
+                )
+                SELECT w.product_id, u.stock, COALESCE(p.stock_shards, 0) > 0
+                FROM wanted w
+                LEFT JOIN updated u ON u.id = w.product_id
+                LEFT JOIN products p ON p.id = w.product_id
+            """, params + [locked, cart_id])
+            rows = cursor.fetchall()
+
+            remaining = {product_id: stock for product_id, stock, _ in rows if stock is not None}
+            sharded = {product_id for product_id, _, is_sharded in rows if is_sharded}
+
+            for product_id, quantity in wanted:
+                if product_id in sharded:
+                    stock = _take_from_shards(cursor, product_id, quantity, cart_id)
+                    if stock is not None:
+                        remaining[product_id] = stock
+
+            if len(remaining) < len(wanted):
+                failed = [(product_id, quantity) for product_id, quantity in wanted
+                          if product_id not in remaining]
+
+                # Rows are still locked: these are the values the UPDATE saw
+                cursor.execute(f"""
+                    SELECT p.id, {VISIBLE_STOCK_SQL} - {OTHER_HOLDS_SQL} AS available
+                    FROM products p
+                    WHERE p.id = ANY(%s)
+                """, [cart_id, [product_id for product_id, _ in failed]])
+                available = dict(cursor.fetchall())
+
+                raise InsufficientStock([
+                    {
+                        'product_id': product_id,
+                        'requested': quantity,
+                        'available': available.get(product_id),
+                    }
+                    for product_id, quantity in failed
+                ])
+
+        invalidate_product_details(remaining.keys())
+
+    return remaining
+
+
+def release_stock(lines):
+    """
+    Put back the stock of every (product_id, quantity) line.
+
+    Returns the ids of the restocked products; products deleted since the
+    order are skipped.
+
+    PostgreSQL: one UPDATE products SET stock = stock + v.qty FROM (VALUES ...),
+    rows locked ORDER BY id like reserve_stock. The increment is computed
+    on the row version being updated, never from a value read earlier.
+    Sharded products get their quantity back on one random shard.
+    """
+    wanted = _merge_lines(lines)
+    if not wanted:
+        return []
+
+    values = ', '.join(['(%s::integer, %s::numeric)'] * len(wanted))
+    params = [value for line in wanted for value in line]
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH released (product_id, quantity) AS (
+                VALUES {values}
+            ),
+            locked AS (
+                SELECT p.id
+                FROM products p
+                WHERE p.id IN (SELECT product_id FROM released)
+                AND p.stock_shards = 0
+                ORDER BY p.id
+                FOR UPDATE
+            ),
+            updated AS (
+                UPDATE products p
+                SET stock = p.stock + r.quantity
+                FROM released r
+                WHERE p.id = r.product_id
+                AND p.id IN (SELECT id FROM locked)
+                RETURNING p.id
+            )
+            SELECT r.product_id, u.id IS NOT NULL, COALESCE(p.stock_shards, 0)
+            FROM released r
+            LEFT JOIN updated u ON u.id = r.product_id
+            LEFT JOIN products p ON p.id = r.product_id
+        """, params)
+        rows = cursor.fetchall()
+
+        restocked = [product_id for product_id, updated, _ in rows if updated]
+        quantities = dict(wanted)
+
+        for product_id, _, shards in rows:
+            if shards:
+                cursor.execute("""
+                    UPDATE product_stock_shards
+                    SET stock = stock + %s
+                    WHERE product_id = %s AND shard = %s
+                """, [quantities[product_id], product_id, random.randrange(shards)])
+                restocked.append(product_id)
+
+    invalidate_product_details(restocked)
+    return restocked
+
+
+def get_available_stock(product_ids, cart_id=None):
+    """
+    Stock available to cart_id: stock minus the active holds of other carts.
+
+    Returns {product_id: available}; unknown products are absent.
+    """
+    product_ids = list(set(int(product_id) for product_id in product_ids))
+    if not product_ids:
+        return {}
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT p.id, {VISIBLE_STOCK_SQL} - {OTHER_HOLDS_SQL} AS available
+            FROM products p
+            WHERE p.id = ANY(%s)
+        """, [cart_id, product_ids])
+        return dict(cursor.fetchall())
+
+
+def hold_stock(cart_id, cart_item_id, product_id, quantity):
+    """
+    Hold quantity of a product for a cart line for STOCK_HOLD_TTL seconds.
+
+    Creates the line's hold or replaces its quantity and expiry. Returns
+    (held, available): held is False when the stock available to the cart
+    is below quantity, in which case a previous hold is left unchanged.
+    available is None when the product does not exist.
+
+    PostgreSQL: the product row is locked first, so the available quantity
+    is computed from a snapshot taken after every concurrent hold on the
+    same product has committed; two carts cannot hold the same units.
+    Sharded products are not locked: the hold is put on one of their
+    shards (see _hold_on_shards).
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT stock_shards FROM products WHERE id = %s", [product_id])
+            row = cursor.fetchone()
+            if row is not None and not row[0]:
+                # Re-read under the lock: the product may have been sharded meanwhile
+                cursor.execute("SELECT stock_shards FROM products WHERE id = %s FOR UPDATE", [product_id])
+                row = cursor.fetchone()
+            if row is None:
+                return False, None
+            if row[0]:
+                return _hold_on_shards(cursor, cart_id, cart_item_id, product_id, quantity)
+
+            cursor.execute(f"""
+                WITH available AS (
+                    SELECT {VISIBLE_STOCK_SQL} - {OTHER_HOLDS_SQL} AS quantity
+                    FROM products p
+                    WHERE p.id = %s
+                ),
+                held AS (
+                    INSERT INTO stock_holds (product_id, cart_id, cart_item_id, quantity, expires_at)
+                    SELECT %s, %s, %s, %s, now() + make_interval(secs => %s)
+                    FROM available a
+                    WHERE a.quantity >= %s
+                    ON CONFLICT (cart_item_id) DO UPDATE SET
+                        quantity = EXCLUDED.quantity,
+                        expires_at = EXCLUDED.expires_at
+                    RETURNING id
+                )
+                SELECT a.quantity, EXISTS(SELECT 1 FROM held)
+                FROM available a
+            """, [
+                cart_id, product_id,
+                product_id, cart_id, cart_item_id, quantity, STOCK_HOLD_TTL,
+                quantity,
+            ])
+            available, held = cursor.fetchone()
+
+    return held, available
+
+
+def expire_stock_holds(batch_size=STOCK_HOLD_SWEEP_BATCH):
+    """
+    Delete expired holds in batches of batch_size. Returns the number deleted.
+
+    Expired holds are already ignored by every query: sweeping only keeps
+    the table small. Each batch is its own short statement (oldest first,
+    SKIP LOCKED) so the sweeper never blocks carts or checkouts. Holds on
+    shards are still counted in their held column: they are swept product
+    by product, with the shards locked like a checkout spanning them.
+    """
+    deleted = 0
+
+    with connection.cursor() as cursor:
+        while True:
+            cursor.execute("""
+                DELETE FROM stock_holds
+                WHERE id IN (
+                    SELECT id
+                    FROM stock_holds
+                    WHERE expires_at <= now()
+                    AND shard IS NULL
+                    ORDER BY expires_at
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+            """, [batch_size])
+            deleted += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                break
+
+        cursor.execute("""
+            SELECT DISTINCT product_id
+            FROM stock_holds
+            WHERE expires_at <= now()
+            AND shard IS NOT NULL
+        """)
+        product_ids = [row[0] for row in cursor.fetchall()]
+
+    for product_id in product_ids:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                deleted += _lock_all_shards(cursor, product_id)
+
+    return deleted
+
+
+def enable_stock_sharding(product_id, shards=DEFAULT_STOCK_SHARDS):
+    """
+    Spread the stock of a product over shards rows (remainder on shard 0).
+    Its active holds move to shard 0, which covers them first.
+    Returns False if the product does not exist or is already sharded.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                UPDATE products
+                SET stock_shards = %s
+                WHERE id = %s AND stock_shards = 0
+                RETURNING stock
+            """, [shards, product_id])
+            row = cursor.fetchone()
+            enabled = row is not None
+
+            if enabled:
+                cursor.execute("""
+                    SELECT COALESCE(SUM(quantity), 0)
+                    FROM stock_holds
+                    WHERE product_id = %s AND expires_at > now()
+                """, [product_id])
+                held = cursor.fetchone()[0]
+
+                stocks = _spread_stock(row[0], [held] + [Decimal('0')] * (shards - 1))
+                values = ', '.join(['(%s, %s, %s)'] * shards)
+                cursor.execute(
+                    f"INSERT INTO product_stock_shards (product_id, shard, stock) VALUES {values}",
+                    [value for shard, stock in enumerate(stocks) for value in (product_id, shard, stock)],
+                )
+
+                # Counted in shard 0's held column by the trigger (migration 0011)
+                cursor.execute("""
+                    UPDATE stock_holds
+                    SET shard = 0
+                    WHERE product_id = %s AND expires_at > now()
+                """, [product_id])
+
+        if enabled:
+            invalidate_product_details([product_id])
+
+    return enabled
+
+
+def disable_stock_sharding(product_id):
+    """
+    Fold the shards of a product back into products.stock.
+    Returns False if the product was not sharded.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            _lock_all_shards(cursor, product_id)
+            cursor.execute("""
+                UPDATE stock_holds
+                SET shard = NULL
+                WHERE product_id = %s AND shard IS NOT NULL
+            """, [product_id])
+            cursor.execute("""
+                WITH removed AS (
+                    DELETE FROM product_stock_shards
+                    WHERE product_id = %s
+                    RETURNING stock
+                )
+                UPDATE products
+                SET stock = (SELECT COALESCE(SUM(stock), 0) FROM removed),
+                    stock_shards = 0
+                WHERE id = %s AND stock_shards > 0
+            """, [product_id, product_id])
+            disabled = cursor.rowcount > 0
+
+        if disabled:
+            invalidate_product_details([product_id])
+
+    return disabled
+
+
+def set_sharded_stock(product_id, stock):
+    """
+    Spread a stock set by the producer over the shards of a product, each
+    shard covering its holds first. No-op when the product is not sharded.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            _lock_all_shards(cursor, product_id)
+            shards = _read_shards(cursor, product_id)
+            if shards:
+                _write_shards(cursor, product_id, dict(zip(
+                    [shard for shard, _, _ in shards],
+                    _spread_stock(stock, [held for _, _, held in shards]),
+                )))
+
+
+def sync_sharded_stock():
+    """
+    Copy the shard sums into products.stock, read by product lists.
+    Returns the number of products whose copy changed.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            UPDATE products p
+            SET stock = s.total
+            FROM (
+                SELECT product_id, SUM(stock) AS total
+                FROM product_stock_shards
+                GROUP BY product_id
+            ) s
+            WHERE p.id = s.product_id
+            AND p.stock_shards > 0
+            AND p.stock <> s.total
+        """)
+        return cursor.rowcount
@@ -2,10 +2,23 @@
 Seasonal product utilities for DZ-Fellah
 Checks if products are currently in season based on their names
 """
+import threading
+import time
+from collections import deque
 from datetime import datetime
+from django.core.cache import cache
 from django.db import connection
 
 
+# Shared cache key bumped whenever product_seasons changes.
+# Every process compares it with the version its index was built from.
+SEASON_INDEX_VERSION_KEY = 'product_seasons:version'
+
+# Safety net for processes that do not share the cache backend:
+# the index is rebuilt at least this often (seconds).
+SEASON_INDEX_MAX_AGE = 300
+
+
 def normalize_text(text):
     """
     Normalize text for fuzzy matching.
@@ -33,6 +46,249 @@ def normalize_text(text):
     return normalized
 
 
+def season_months_mask(start_month, end_month):
+    """
+    Build a 12-bit mask of the months covered by a season.
+    Bit 0 is January, bit 11 is December.
+    
+    Examples:
+        - (5, 9)  → May to September
+        - (11, 4) → November to April (cross-year season)
+    """
+    if start_month <= end_month:
+        months = range(start_month, end_month + 1)
+    else:
+        months = list(range(start_month, 13)) + list(range(1, end_month + 1))
+    
+    mask = 0
+    for month in months:
+        mask |= 1 << (month - 1)
+    return mask
+
+
+def months_from_mask(mask):
+    """Expand a 12-bit month mask back into month numbers (1-12)."""
+    return [month for month in range(1, 13) if mask & (1 << (month - 1))]
+
+
+class SeasonIndex:
+    """
+    Compiled, read-only view of the product_seasons table.
+    
+    Seasonal names are normalized once and compiled into:
+        - an Aho-Corasick automaton, to find every seasonal name contained
+          in a product name in a single pass over the product name
+        - a substring table, to find every seasonal name that contains
+          the product name (e.g. "tomat" → "tomato")
+    
+    Each match yields a month mask, so "in season for month M?" is a
+    bit test once the product name has been scanned.
+    """
+    
+    def __init__(self, rows, version=None):
+        self.version = version
+        self.built_at = time.monotonic()
+        
+        # Automaton: goto[state] = {char: next_state}
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [0]
+        
+        # Reverse match: every substring of a seasonal name → month mask
+        self._substrings = {}
+        
+        for seasonal_name, start_month, end_month in rows:
+            pattern = normalize_text(seasonal_name)
+            if not pattern:
+                continue
+            
+            mask = season_months_mask(start_month, end_month)
+            self._add_pattern(pattern, mask)
+            
+            length = len(pattern)
+            for i in range(length):
+                for j in range(i + 1, length + 1):
+                    key = pattern[i:j]
+                    self._substrings[key] = self._substrings.get(key, 0) | mask
+        
+        self._build_failure_links()
+    
+    def _add_pattern(self, pattern, mask):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(0)
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state] |= mask
+    
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                
+                self._fail[next_state] = target if target != next_state else 0
+                # Inherit matches that end at the fallback state
+                self._output[next_state] |= self._output[self._fail[next_state]]
+    
+    def months_mask(self, product_name):
+        """
+        Return the month mask of every season matching a product name.
+        0 means the product has no known season.
+        """
+        text = normalize_text(product_name)
+        if not text:
+            return 0
+        
+        mask = self._substrings.get(text, 0)
+        
+        state = 0
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            mask |= output[state]
+        
+        return mask
+    
+    def in_season(self, product_names, current_month):
+        """
+        Check a batch of product names against one month.
+        
+        Returns:
+            list: booleans, in the same order as product_names
+        """
+        month_bit = 1 << (current_month - 1)
+        masks = {}
+        results = []
+        
+        for name in product_names:
+            if name not in masks:
+                masks[name] = self.months_mask(name) if name else 0
+            results.append(bool(masks[name] & month_bit))
+        
+        return results
+
+
+_season_index = None
+_season_index_lock = threading.Lock()
+
+
+def _load_season_rows():
+    """Read the whole product_seasons table (single query)."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT product_name, start_month, end_month 
+            FROM product_seasons
+        """)
+        return cursor.fetchall()
+
+
+def get_season_index():
+    """
+    Get the process-wide season index, building it on first use.
+    
+    The index is rebuilt when another process (or import_seasons)
+    bumped the shared version, or when it is older than
+    SEASON_INDEX_MAX_AGE.
+    """
+    global _season_index
+    
+    version = cache.get(SEASON_INDEX_VERSION_KEY, 0)
+    index = _season_index
+    
+    if (index is not None and index.version == version
+            and time.monotonic() - index.built_at < SEASON_INDEX_MAX_AGE):
+        return index
+    
+    with _season_index_lock:
+        index = _season_index
+        if (index is None or index.version != version
+                or time.monotonic() - index.built_at >= SEASON_INDEX_MAX_AGE):
+            index = SeasonIndex(_load_season_rows(), version=version)
+            _season_index = index
+    
+    return index
+
+
+def invalidate_season_index():
+    """
+    Drop the compiled season index in every process.
+    Call this after writing to product_seasons.
+    """
+    global _season_index
+    
+    try:
+        cache.incr(SEASON_INDEX_VERSION_KEY)
+    except ValueError:
+        # Key missing (first import or cache flushed)
+        cache.set(SEASON_INDEX_VERSION_KEY, 1, None)
+    
+    with _season_index_lock:
+        _season_index = None
+
+
+def products_in_season(product_names, current_month=None):
+    """
+    Check many product names at once.
+    
+    Args:
+        product_names: Iterable of product names
+        current_month: Month number (1-12), defaults to current month
+    
+    Returns:
+        list: booleans, in the same order as product_names
+    """
+    if current_month is None:
+        current_month = datetime.now().month
+    
+    return get_season_index().in_season(list(product_names), current_month)
+
+
+def annotate_seasonal(products, current_month=None):
+    """
+    Set 'is_seasonal' on a list of product dicts in one batch.
+    
+    Returns:
+        list: the same product dicts
+    """
+    flags = products_in_season((p['name'] for p in products), current_month)
+    
+    for product, is_seasonal in zip(products, flags):
+        product['is_seasonal'] = is_seasonal
+    
+    return products
+
+
+def get_product_season_months(product_name):
+    """
+    Get every month (1-12) a product is in season.
+    Used to fill the product_season_months buckets.
+    
+    Returns:
+        list: month numbers, empty if the product has no known season
+    """
+    if not product_name:
+        return []
+    
+    return months_from_mask(get_season_index().months_mask(product_name))
+
+
 def is_product_in_season(product_name, current_month=None):
     """
     Check if a product is currently in season using fuzzy name matching.
@@ -52,42 +308,4 @@ def is_product_in_season(product_name, current_month=None):
     if not product_name:
         return False
     
-    if current_month is None:
-        current_month = datetime.now().month
-    
-    # Normalize product name for matching
-    product_normalized = normalize_text(product_name)
-    
-    cursor = connection.cursor()
-    
-    # Get all seasonal products from database
-    cursor.execute("""
-        SELECT product_name, start_month, end_month 
-        FROM product_seasons
-    """)
-    
-    rows = cursor.fetchall()
-    cursor.close()
-    
-    # Check fuzzy matches
-    for seasonal_name, start_month, end_month in rows:
-        seasonal_normalized = normalize_text(seasonal_name)
-        
-        # Fuzzy match: check if seasonal name is contained in product name
-        # Examples: 
-        #   - "tomato" in "cherry tomatoes" → MATCH
-        #   - "strawberry" in "fresh strawberries" → MATCH
-        #   - "onion" in "red onion" → MATCH
-        if seasonal_normalized in product_normalized or product_normalized in seasonal_normalized:
-            # Check if current month is in season range
-            if start_month <= end_month:
-                # Normal season (e.g., May-September: 5-9)
-                if start_month <= current_month <= end_month:
-                    return True
-            else:
-                # Cross-year season (e.g., November-April: 11-4)
-                # Handles seasons that span year boundary
-                if current_month >= start_month or current_month <= end_month:
-                    return True
-    
-    return False
\ No newline at end of file
+    return products_in_season([product_name], current_month)[0]
@@ -29,6 +29,12 @@ class ProductListSerializer(serializers.Serializer):
     producer_name = serializers.CharField(read_only=True)
 <<<<<<< HEAD
     is_seasonal = serializers.BooleanField(required=False)
+    
+    # Full-text search results only
+    search_rank = serializers.FloatField(read_only=True, required=False)
+    name_highlight = serializers.CharField(read_only=True, required=False, allow_null=True)
+    description_highlight = serializers.CharField(read_only=True, required=False, allow_null=True)
+    producer_name_highlight = serializers.CharField(read_only=True, required=False, allow_null=True)
 =======
 >>>>>>> 33f7a2d22d51c7734ecadb4759a1c8c2dc77ec6b
 
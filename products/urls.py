@@ -9,7 +9,7 @@ from .views import (
         MySubscriptionViewSet
     )
 from . import views_ratings
-from .cron_views import trigger_anti_gaspi_cron
+from .cron_views import trigger_anti_gaspi_cron, product_cache_stats, expire_stock_holds_cron
 
     
 router = DefaultRouter()
@@ -30,6 +30,8 @@ urlpatterns = [
         path('products/producer/<int:producer_id>/rating/', views_ratings.get_producer_rating_view, name='get_producer_rating'),
         path('products/<int:product_id>/debug-purchase/', views_ratings.debug_purchase_check, name='debug_purchase'),
         path('cron/anti-gaspi/', trigger_anti_gaspi_cron, name='cron_anti_gaspi'),
+        path('cron/product-cache-stats/', product_cache_stats, name='cron_product_cache_stats'),
+        path('cron/expire-stock-holds/', expire_stock_holds_cron, name='cron_expire_stock_holds'),
         
         
         
@@ -7,6 +7,7 @@ from rest_framework.decorators import action, permission_classes, authentication
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 
+from db.pagination import InvalidCursor, parse_page_size
 from . import queries
 from .serializers import (
     ProductListSerializer,
@@ -20,7 +21,7 @@ from .serializers import (
 )
 from users.authentication import CustomJWTAuthentication
 from users.permissions import IsProducer
-from .seasonal_utils import is_product_in_season
+from .seasonal_utils import is_product_in_season, annotate_seasonal
 =======
     ProducerInfoSerializer
 )
@@ -29,6 +30,16 @@ from users.permissions import IsProducer
 >>>>>>> 33f7a2d22d51c7734ecadb4759a1c8c2dc77ec6b
 
 
+def client_profile_id(request):
+    """Client profile id of the authenticated user, from the principal (no query)."""
+    return request.user.client_id
+
+
+def producer_profile_id(request):
+    """Producer profile id of the authenticated user, from the principal (no query)."""
+    return request.user.producer_id
+
+
 class ProductViewSet(viewsets.ViewSet):
     """
     ViewSet for public product operations.
@@ -80,8 +91,7 @@ class ProductViewSet(viewsets.ViewSet):
                 limit=limit
             )
         
-        for product in products:
-            product['is_seasonal'] = is_product_in_season(product['name'])
+        annotate_seasonal(products)
         
         serializer = ProductListSerializer(products, many=True)
         
@@ -151,8 +161,8 @@ class ProductViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def search(self, request):
         """
-        GET /api/products/search/?q=tomate
-        Search products by name or description.
+        GET /api/products/search/?q=tomate&limit=20&cursor=...
+        Search products by name or description (cursor-paginated).
         """
         query = request.query_params.get('q', '')
         
@@ -165,17 +175,27 @@ class ProductViewSet(viewsets.ViewSet):
         is_anti_gaspi = request.query_params.get('is_anti_gaspi')
         is_anti_gaspi_bool = is_anti_gaspi.lower() == 'true' if is_anti_gaspi else None
         
-        products = queries.search_products(
-            query=query,
-            product_type=product_type,
-            is_anti_gaspi=is_anti_gaspi_bool
-        )
+        page_size = parse_page_size(request.query_params.get('limit'))
+        
+        try:
+            products, next_cursor = queries.search_products(
+                query=query,
+                product_type=product_type,
+                is_anti_gaspi=is_anti_gaspi_bool,
+                cursor=request.query_params.get('cursor'),
+                page_size=page_size
+            )
+        except InvalidCursor:
+            return Response({
+                'error': 'Invalid cursor'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         serializer = ProductListSerializer(products, many=True)
         
         return Response({
             'query': query,
             'count': len(serializer.data),
+            'next': next_cursor,
             'filters': {
                 'product_type': product_type,
                 'is_anti_gaspi': is_anti_gaspi
@@ -186,8 +206,8 @@ class ProductViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def filter(self, request):
         """
-        GET /api/products/filter/?product_type=fresh&min_price=100
-        Filter products by multiple criteria.
+        GET /api/products/filter/?product_type=fresh&min_price=100&cursor=...
+        Filter products by multiple criteria (cursor-paginated).
         """
         sale_type = request.query_params.get('sale_type')
         product_type = request.query_params.get('product_type')
@@ -197,28 +217,30 @@ class ProductViewSet(viewsets.ViewSet):
         max_price = request.query_params.get('max_price')
         wilaya = request.query_params.get('wilaya')
         limit = request.query_params.get('limit')
+        fuzzy = request.query_params.get('fuzzy', '').lower() == 'true'
         
-        limit_int = None
-        if limit:
-            try:
-                limit_int = int(limit)
-            except:
-                pass
-        
-        products = queries.filter_products(
-            sale_type=sale_type,
-            product_type=product_type,
-            is_anti_gaspi=is_anti_gaspi_bool,
-            min_price=min_price,
-            max_price=max_price,
-            wilaya=wilaya,
-            limit=limit_int
-        )
+        try:
+            products, next_cursor = queries.filter_products(
+                sale_type=sale_type,
+                product_type=product_type,
+                is_anti_gaspi=is_anti_gaspi_bool,
+                min_price=min_price,
+                max_price=max_price,
+                wilaya=wilaya,
+                fuzzy=fuzzy,
+                cursor=request.query_params.get('cursor'),
+                page_size=parse_page_size(limit)
+            )
+        except InvalidCursor:
+            return Response({
+                'error': 'Invalid cursor'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         serializer = ProductListSerializer(products, many=True)
         
         return Response({
             'count': len(serializer.data),
+            'next': next_cursor,
             'filters_applied': {
                 'sale_type': sale_type,
                 'product_type': product_type,
@@ -226,16 +248,47 @@ class ProductViewSet(viewsets.ViewSet):
                 'min_price': min_price,
                 'max_price': max_price,
                 'wilaya': wilaya,
-                'limit': limit
+                'limit': limit,
+                'fuzzy': fuzzy
             },
             'products': serializer.data
         })
     
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        GET /api/products/facets/?product_type=fresh&wilaya=alger
+        Product counts per product_type, sale_type, is_anti_gaspi, wilaya
+        and price bucket for the same filters as /api/products/filter/.
+        """
+        is_anti_gaspi = request.query_params.get('is_anti_gaspi')
+        is_anti_gaspi_bool = is_anti_gaspi.lower() == 'true' if is_anti_gaspi else None
+        
+        filters = {
+            'sale_type': request.query_params.get('sale_type'),
+            'product_type': request.query_params.get('product_type'),
+            'is_anti_gaspi': is_anti_gaspi_bool,
+            'min_price': request.query_params.get('min_price'),
+            'max_price': request.query_params.get('max_price'),
+            'wilaya': request.query_params.get('wilaya'),
+            'fuzzy': request.query_params.get('fuzzy', '').lower() == 'true',
+        }
+        
+        facets = queries.get_product_facets(**filters)
+        
+        return Response({
+            'filters_applied': {**filters, 'is_anti_gaspi': is_anti_gaspi},
+            'total': facets['total'],
+            'facets': {
+                facet: facets[facet] for facet in queries.PRODUCT_FACETS
+            }
+        })
+    
     @action(detail=False, methods=['get'], url_path='producer/(?P<producer_id>[^/.]+)')
     def producer_shop(self, request, producer_id=None):
         """
-        GET /api/products/producer/{producer_id}/
-        Get all products from a specific producer.
+        GET /api/products/producer/{producer_id}/?limit=20&cursor=...
+        Get products from a specific producer (cursor-paginated).
         """
         # Get producer info
         producer = queries.get_producer_info(producer_id)
@@ -249,11 +302,18 @@ class ProductViewSet(viewsets.ViewSet):
         is_anti_gaspi = request.query_params.get('is_anti_gaspi')
         is_anti_gaspi_bool = is_anti_gaspi.lower() == 'true' if is_anti_gaspi else None
         
-        products = queries.get_producer_products(
-            producer_id=producer_id,
-            product_type=product_type,
-            is_anti_gaspi=is_anti_gaspi_bool
-        )
+        try:
+            products, next_cursor = queries.get_producer_products(
+                producer_id=producer_id,
+                product_type=product_type,
+                is_anti_gaspi=is_anti_gaspi_bool,
+                cursor=request.query_params.get('cursor'),
+                page_size=parse_page_size(request.query_params.get('limit'))
+            )
+        except InvalidCursor:
+            return Response({
+                'error': 'Invalid cursor'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         serializer = ProductListSerializer(products, many=True)
         
@@ -268,6 +328,7 @@ class ProductViewSet(viewsets.ViewSet):
                 'is_bio_certified': producer.get('is_bio_certified', False)
             },
             'products_count': len(serializer.data),
+            'next': next_cursor,
             'filters': {
                 'product_type': product_type,
                 'is_anti_gaspi': is_anti_gaspi
@@ -277,34 +338,41 @@ class ProductViewSet(viewsets.ViewSet):
 <<<<<<< HEAD
     @action(detail=False, methods=['get'], url_path='seasonal')
     def seasonal_prodyccts(self, request):
-
-
-
+        """
+        GET /api/products/seasonal/?page=1&limit=20
+        Products in season this month (all of them, paginated).
+        """
         from datetime import datetime
-
-        limit = int(request.query_params.get('limit', 20))
-
-        all_products = queries.get_home_products(limit=100)
-
-
-        seasonal = []
-        for product  in all_products:
-            if is_product_in_season(product['name']):
-                product['is_seasonal'] = True
-                seasonal.append(product)
         
-
-        seasonal = seasonal[:limit]
-
-        serializer = ProductListSerializer(seasonal,many=True)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), 100))
+        except ValueError:
+            limit = 20
+        
+        try:
+            page = max(1, int(request.query_params.get('page', 1)))
+        except ValueError:
+            page = 1
+        
+        now = datetime.now()
+        
+        seasonal, total = queries.get_seasonal_products(
+            month=now.month,
+            limit=limit,
+            offset=(page - 1) * limit
+        )
+        
+        serializer = ProductListSerializer(seasonal, many=True)
         return Response({
-            'count':len(serializer.data),
-            'season' : datetime.now().strftime('%B'),
-            'products' : serializer.data
+            'count': len(serializer.data),
+            'total': total,
+            'page': page,
+            'next_page': page + 1 if page * limit < total else None,
+            'season': now.strftime('%B'),
+            'products': serializer.data
         })
 
 
-   
 =======
 >>>>>>> 33f7a2d22d51c7734ecadb4759a1c8c2dc77ec6b
 
@@ -320,23 +388,31 @@ class MyProductViewSet(viewsets.ViewSet):
     
     def list(self, request):
         """
-        GET /api/my-products/
-        Get all products belonging to authenticated producer.
+        GET /api/my-products/?limit=20&cursor=...
+        Get products belonging to authenticated producer (cursor-paginated).
         """
         product_type = request.query_params.get('product_type')
         is_anti_gaspi = request.query_params.get('is_anti_gaspi')
         is_anti_gaspi_bool = is_anti_gaspi.lower() == 'true' if is_anti_gaspi else None
         
-        products = queries.get_my_products(
-            producer_id=request.user.producer_profile.id,
-            product_type=product_type,
-            is_anti_gaspi=is_anti_gaspi_bool
-        )
+        try:
+            products, next_cursor = queries.get_my_products(
+                producer_id=producer_profile_id(request),
+                product_type=product_type,
+                is_anti_gaspi=is_anti_gaspi_bool,
+                cursor=request.query_params.get('cursor'),
+                page_size=parse_page_size(request.query_params.get('limit'))
+            )
+        except InvalidCursor:
+            return Response({
+                'error': 'Invalid cursor'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         serializer = ProductListSerializer(products, many=True)
         
         return Response({
             'count': len(serializer.data),
+            'next': next_cursor,
             'filters': {
                 'product_type': product_type,
                 'is_anti_gaspi': is_anti_gaspi
@@ -359,7 +435,7 @@ class MyProductViewSet(viewsets.ViewSet):
 =======
 >>>>>>> 33f7a2d22d51c7734ecadb4759a1c8c2dc77ec6b
             product = queries.create_product(
-                producer_id=request.user.producer_profile.id,
+                producer_id=producer_profile_id(request),
                 name=serializer.validated_data['name'],
                 description=serializer.validated_data.get('description'),
 <<<<<<< HEAD
@@ -377,7 +453,7 @@ class MyProductViewSet(viewsets.ViewSet):
             
             product_detail = queries.get_my_product_detail(
                 product['id'],
-                request.user.producer_profile.id
+                producer_profile_id(request)
             )
             
             detail_serializer = ProductListSerializer(product_detail)
@@ -396,7 +472,7 @@ class MyProductViewSet(viewsets.ViewSet):
         """
         product = queries.get_my_product_detail(
             pk,
-            request.user.producer_profile.id
+            producer_profile_id(request)
         )
         
         if not product:
@@ -412,7 +488,7 @@ class MyProductViewSet(viewsets.ViewSet):
         PUT /api/my-products/{id}/
         Fully update a product.
         """
-        product = queries.get_my_product_detail(pk, request.user.producer_profile.id)
+        product = queries.get_my_product_detail(pk, producer_profile_id(request))
         
         if not product:
             return Response({
@@ -430,7 +506,7 @@ class MyProductViewSet(viewsets.ViewSet):
 >>>>>>> 33f7a2d22d51c7734ecadb4759a1c8c2dc77ec6b
             updated = queries.update_product(
                 product_id=pk,
-                producer_id=request.user.producer_profile.id,
+                producer_id=producer_profile_id(request),
                 name=serializer.validated_data['name'],
                 description=serializer.validated_data.get('description'),
 <<<<<<< HEAD
@@ -460,7 +536,7 @@ class MyProductViewSet(viewsets.ViewSet):
         PATCH /api/my-products/{id}/
         Partially update a product.
         """
-        product = queries.get_my_product_detail(pk, request.user.producer_profile.id)
+        product = queries.get_my_product_detail(pk, producer_profile_id(request))
         
         if not product:
             return Response({
@@ -478,7 +554,7 @@ class MyProductViewSet(viewsets.ViewSet):
 >>>>>>> 33f7a2d22d51c7734ecadb4759a1c8c2dc77ec6b
             updated = queries.partial_update_product(
                 product_id=pk,
-                producer_id=request.user.producer_profile.id,
+                producer_id=producer_profile_id(request),
                 updates=serializer.validated_data
             )
             
@@ -502,7 +578,7 @@ class MyProductViewSet(viewsets.ViewSet):
 >>>>>>> 33f7a2d22d51c7734ecadb4759a1c8c2dc77ec6b
         product_name = queries.delete_product(
             pk,
-            request.user.producer_profile.id
+            producer_profile_id(request)
         )
         
         if product_name:
@@ -522,7 +598,7 @@ class MyProductViewSet(viewsets.ViewSet):
         """
         result = queries.toggle_anti_gaspi(
             pk,
-            request.user.producer_profile.id
+            producer_profile_id(request)
         )
         
         if not result:
@@ -541,380 +617,6 @@ class MyProductViewSet(viewsets.ViewSet):
         })
 
 
-# Keep all your basket/subscription viewsets below unchanged...
-class SeasonalBasketViewSet(viewsets.ViewSet):
-    """
-    ViewSet for seasonal basket operations.
-    """
-    
-    # Public endpoints (browsing baskets)
-    permission_classes = [AllowAny]
-    
-    def list(self, request):
-        """
-        GET /api/seasonal-baskets/
-        List all active seasonal baskets.
-        """
-        search = request.query_params.get('search')
-        producer_id = request.query_params.get('producer_id')
-        limit = int(request.query_params.get('limit', 20))
-        
-        baskets = queries.get_all_active_baskets(
-            search=search,
-            producer_id=producer_id,
-            limit=limit
-        )
-        
-        serializer = SeasonalBasketSerializer(baskets, many=True)
-        
-        return Response({
-            'count': len(serializer.data),
-            'baskets': serializer.data
-        })
-    
-    def retrieve(self, request, pk=None):
-        """
-        GET /api/seasonal-baskets/{id}/
-        Get basket details with products.
-        """
-        basket = queries.get_basket_with_products(pk)
-        
-        if not basket:
-            return Response({
-                'error': 'Basket not found'
-            }, status=status.HTTP_404_NOT_FOUND)
-        
-        serializer = SeasonalBasketSerializer(basket)
-        return Response(serializer.data)
-
-class MySeasonalBasketViewSet(viewsets.ViewSet):
-    """
-    ViewSet for producer basket management.
-    Requires authentication and IsProducer permission.
-    """
-    
-    authentication_classes = [CustomJWTAuthentication]
-    permission_classes = [IsAuthenticated, IsProducer]
-    
-    def list(self, request):
-        """
-        GET /api/my-seasonal-baskets/
-        Get all baskets for authenticated producer.
-        """
-        baskets = queries.get_producer_baskets(
-            request.user.producer_profile.id
-        )
-        
-        serializer = SeasonalBasketSerializer(baskets, many=True)
-        
-        return Response({
-            'count': len(serializer.data),
-            'baskets': serializer.data
-        })
-    
-    def create(self, request):
-        """
-        POST /api/my-seasonal-baskets/
-        Create a new seasonal basket.
-        """
-        serializer = SeasonalBasketSerializer(data=request.data)
-        
-        if serializer.is_valid():
-            basket = queries.create_seasonal_basket(
-                producer_id=request.user.producer_profile.id,
-                name=serializer.validated_data['name'],
-                description=serializer.validated_data.get('description'),
-                discount_percentage=serializer.validated_data['discount_percentage'],
-                original_price=serializer.validated_data['original_price'],
-                delivery_frequency=serializer.validated_data.get('delivery_frequency', 'weekly')
-            )
-            
-            result_serializer = SeasonalBasketSerializer(basket)
-            
-            return Response({
-                'message': 'Basket created successfully',
-                'basket': result_serializer.data
-            }, status=status.HTTP_201_CREATED)
-        
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def retrieve(self, request, pk=None):
-        """
-        GET /api/my-seasonal-baskets/{id}/
-        Get basket details with products.
-        """
-        basket = queries.get_basket_with_products(pk)
-        
-        if not basket or basket['producer_id'] != request.user.producer_profile.id:
-            return Response({
-                'error': 'Basket not found'
-            }, status=status.HTTP_404_NOT_FOUND)
-        
-        serializer = SeasonalBasketSerializer(basket)
-        return Response(serializer.data)
-    
-    def update(self, request, pk=None):
-        """
-        PUT/PATCH /api/my-seasonal-baskets/{id}/
-        Update basket.
-        """
-        serializer = SeasonalBasketSerializer(data=request.data, partial=True)
-        
-        if serializer.is_valid():
-            updates = dict(serializer.validated_data)
-            
-            basket = queries.update_basket(
-                pk,
-                request.user.producer_profile.id,
-                **updates
-            )
-            
-            if not basket:
-                return Response({
-                    'error': 'Basket not found'
-                }, status=status.HTTP_404_NOT_FOUND)
-            
-            result_serializer = SeasonalBasketSerializer(basket)
-            
-            return Response({
-                'message': 'Basket updated successfully',
-                'basket': result_serializer.data
-            })
-        
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    def destroy(self, request, pk=None):
-        """
-        DELETE /api/my-seasonal-baskets/{id}/
-        Delete basket.
-        """
-        basket_name = queries.delete_basket(pk, request.user.producer_profile.id)
-        
-        if basket_name:
-            return Response({
-                'message': f'Basket "{basket_name}" deleted successfully'
-            }, status=status.HTTP_204_NO_CONTENT)
-        
-        return Response({
-            'error': 'Basket not found'
-        }, status=status.HTTP_404_NOT_FOUND)
-    
-    @action(detail=True, methods=['post'], url_path='add-product')
-    def add_product(self, request, pk=None):
-        """
-        POST /api/my-seasonal-baskets/{id}/add-product/
-        Add product to basket.
-        """
-        serializer = BasketProductSerializer(data=request.data)
-        
-        if serializer.is_valid():
-            # Verify basket ownership
-            basket = queries.get_basket_with_products(pk)
-            if not basket or basket['producer_id'] != request.user.producer_profile.id:
-                return Response({
-                    'error': 'Basket not found'
-                }, status=status.HTTP_404_NOT_FOUND)
-            
-            result = queries.add_product_to_basket(
-                pk,
-                serializer.validated_data['product_id'],
-                serializer.validated_data['quantity']
-            )
-            
-            return Response({
-                'message': 'Product added to basket',
-                'basket_product': result
-            })
-        
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    @action(detail=True, methods=['delete'], url_path='remove-product/(?P<product_id>[^/.]+)')
-    def remove_product(self, request, pk=None, product_id=None):
-        """
-        DELETE /api/my-seasonal-baskets/{id}/remove-product/{product_id}/
-        Remove product from basket.
-        """
-        # Verify basket ownership
-        basket = queries.get_basket_with_products(pk)
-        if not basket or basket['producer_id'] != request.user.producer_profile.id:
-            return Response({
-                'error': 'Basket not found'
-            }, status=status.HTTP_404_NOT_FOUND)
-        
-        success = queries.remove_product_from_basket(pk, product_id)
-        
-        if success:
-            return Response({
-                'message': 'Product removed from basket'
-            })
-        
-        return Response({
-            'error': 'Product not found in basket'
-        }, status=status.HTTP_404_NOT_FOUND)
-    
-    @action(detail=True, methods=['get'], url_path='subscribers')
-    def subscribers(self, request, pk=None):
-        """
-        GET /api/my-seasonal-baskets/{id}/subscribers/
-        Get list of subscribers.
-        """
-        subscribers = queries.get_basket_subscribers(
-            pk,
-            request.user.producer_profile.id
-        )
-        
-        return Response({
-            'count': len(subscribers),
-            'subscribers': subscribers
-        })
-
-
-class MySubscriptionViewSet(viewsets.ViewSet):
-    """
-    ViewSet for client subscription management.
-    Requires authentication.
-    """
-    
-    authentication_classes = [CustomJWTAuthentication]
-    permission_classes = [IsAuthenticated]
-    
-    def list(self, request):
-        """
-        GET /api/my-subscriptions/
-        Get all subscriptions for authenticated client.
-        """
-        # Get client profile
-        from users import queries as user_queries
-        user_data = user_queries.get_user_by_id(request.user.id)
-        
-        if user_data['user_type'] != 'client':
-            return Response({
-                'error': 'Only clients can have subscriptions'
-            }, status=status.HTTP_403_FORBIDDEN)
-        
-        status_filter = request.query_params.get('status')
-        
-        subscriptions = queries.get_client_subscriptions(
-            user_data['client_profile']['id'],
-            status=status_filter
-        )
-        
-        serializer = ClientSubscriptionSerializer(subscriptions, many=True)
-        
-        return Response({
-            'count': len(serializer.data),
-            'subscriptions': serializer.data
-        })
-    
-    def create(self, request):
-        """
-        POST /api/my-subscriptions/
-        Create a new subscription.
-        """
-        from users import queries as user_queries
-        user_data = user_queries.get_user_by_id(request.user.id)
-        
-        if user_data['user_type'] != 'client':
-            return Response({
-                'error': 'Only clients can subscribe'
-            }, status=status.HTTP_403_FORBIDDEN)
-        
-        serializer = ClientSubscriptionSerializer(data=request.data)
-        
-        if serializer.is_valid():
-            subscription = queries.create_subscription(
-                client_id=user_data['client_profile']['id'],
-                basket_id=serializer.validated_data['basket_id'],
-                delivery_method=serializer.validated_data['delivery_method'],
-                delivery_address=serializer.validated_data.get('delivery_address'),
-                pickup_point_id=serializer.validated_data.get('pickup_point_id')
-            )
-            
-            result_serializer = ClientSubscriptionSerializer(subscription)
-            
-            return Response({
-                'message': 'Subscription created successfully',
-                'subscription': result_serializer.data
-            }, status=status.HTTP_201_CREATED)
-        
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    @action(detail=True, methods=['post'], url_path='pause')
-    def pause(self, request, pk=None):
-        """
-        POST /api/my-subscriptions/{id}/pause/
-        Pause subscription.
-        """
-        from users import queries as user_queries
-        user_data = user_queries.get_user_by_id(request.user.id)
-        
-        result = queries.update_subscription_status(
-            pk,
-            user_data['client_profile']['id'],
-            'paused'
-        )
-        
-        if result:
-            return Response({
-                'message': 'Subscription paused',
-                'subscription': result
-            })
-        
-        return Response({
-            'error': 'Subscription not found'
-        }, status=status.HTTP_404_NOT_FOUND)
-    
-    @action(detail=True, methods=['post'], url_path='cancel')
-    def cancel(self, request, pk=None):
-        """
-        POST /api/my-subscriptions/{id}/cancel/
-        Cancel subscription.
-        """
-        from users import queries as user_queries
-        user_data = user_queries.get_user_by_id(request.user.id)
-        
-        result = queries.update_subscription_status(
-            pk,
-            user_data['client_profile']['id'],
-            'cancelled'
-        )
-        
-        if result:
-            return Response({
-                'message': 'Subscription cancelled',
-                'subscription': result
-            })
-        
-        return Response({
-            'error': 'Subscription not found'
-        }, status=status.HTTP_404_NOT_FOUND)
-    
-    @action(detail=True, methods=['post'], url_path='reactivate')
-    def reactivate(self, request, pk=None):
-        """
-        POST /api/my-subscriptions/{id}/reactivate/
-        Reactivate paused subscription.
-        """
-        from users import queries as user_queries
-        user_data = user_queries.get_user_by_id(request.user.id)
-        
-        result = queries.update_subscription_status(
-            pk,
-            user_data['client_profile']['id'],
-            'active'
-        )
-        
-        if result:
-            return Response({
-                'message': 'Subscription reactivated',
-                'subscription': result
-            })
-        
-        return Response({
-            'error': 'Subscription not found'
-        }, status=status.HTTP_404_NOT_FOUND)
-
-
 class SeasonalBasketViewSet(viewsets.ViewSet):
     """
     ViewSet for seasonal basket operations.
@@ -976,7 +678,7 @@ class MySeasonalBasketViewSet(viewsets.ViewSet):
         Get all baskets for authenticated producer.
         """
         baskets = queries.get_producer_baskets(
-            request.user.producer_profile.id
+            producer_profile_id(request)
         )
         
         serializer = SeasonalBasketSerializer(baskets, many=True)
@@ -995,7 +697,7 @@ class MySeasonalBasketViewSet(viewsets.ViewSet):
         
         if serializer.is_valid():
             basket = queries.create_seasonal_basket(
-                producer_id=request.user.producer_profile.id,
+                producer_id=producer_profile_id(request),
                 name=serializer.validated_data['name'],
                 description=serializer.validated_data.get('description'),
                 discount_percentage=serializer.validated_data['discount_percentage'],
@@ -1019,7 +721,7 @@ class MySeasonalBasketViewSet(viewsets.ViewSet):
         """
         basket = queries.get_basket_with_products(pk)
         
-        if not basket or basket['producer_id'] != request.user.producer_profile.id:
+        if not basket or basket['producer_id'] != producer_profile_id(request):
             return Response({
                 'error': 'Basket not found'
             }, status=status.HTTP_404_NOT_FOUND)
@@ -1039,7 +741,7 @@ class MySeasonalBasketViewSet(viewsets.ViewSet):
             
             basket = queries.update_basket(
                 pk,
-                request.user.producer_profile.id,
+                producer_profile_id(request),
                 **updates
             )
             
@@ -1062,7 +764,7 @@ class MySeasonalBasketViewSet(viewsets.ViewSet):
         DELETE /api/my-seasonal-baskets/{id}/
         Delete basket.
         """
-        basket_name = queries.delete_basket(pk, request.user.producer_profile.id)
+        basket_name = queries.delete_basket(pk, producer_profile_id(request))
         
         if basket_name:
             return Response({
@@ -1084,7 +786,7 @@ class MySeasonalBasketViewSet(viewsets.ViewSet):
         if serializer.is_valid():
             # Verify basket ownership
             basket = queries.get_basket_with_products(pk)
-            if not basket or basket['producer_id'] != request.user.producer_profile.id:
+            if not basket or basket['producer_id'] != producer_profile_id(request):
                 return Response({
                     'error': 'Basket not found'
                 }, status=status.HTTP_404_NOT_FOUND)
@@ -1110,7 +812,7 @@ class MySeasonalBasketViewSet(viewsets.ViewSet):
         """
         # Verify basket ownership
         basket = queries.get_basket_with_products(pk)
-        if not basket or basket['producer_id'] != request.user.producer_profile.id:
+        if not basket or basket['producer_id'] != producer_profile_id(request):
             return Response({
                 'error': 'Basket not found'
             }, status=status.HTTP_404_NOT_FOUND)
@@ -1134,7 +836,7 @@ class MySeasonalBasketViewSet(viewsets.ViewSet):
         """
         subscribers = queries.get_basket_subscribers(
             pk,
-            request.user.producer_profile.id
+            producer_profile_id(request)
         )
         
         return Response({
@@ -1158,18 +860,14 @@ class MySubscriptionViewSet(viewsets.ViewSet):
         Get all subscriptions for authenticated client.
         """
         # Get client profile
-        from users import queries as user_queries
-        user_row = user_queries.get_user_by_id(request.user.id)
-        user_data = user_queries.structure_user_data(user_row)  # ✅ ADDED
-        
-        if user_data['user_type'] != 'client':
+        if request.user.user_type != 'client':
             return Response({
                 'error': 'Only clients can have subscriptions'
             }, status=status.HTTP_403_FORBIDDEN)
         
         # Check if client_profile exists
-        client_profile = user_data.get('client_profile')
-        if not client_profile or not client_profile.get('id'):
+        client_id = client_profile_id(request)
+        if not client_id:
             return Response({
                 'error': 'Client profile not found. Please complete your profile.'
             }, status=status.HTTP_400_BAD_REQUEST)
@@ -1177,7 +875,7 @@ class MySubscriptionViewSet(viewsets.ViewSet):
         status_filter = request.query_params.get('status')
         
         subscriptions = queries.get_client_subscriptions(
-            client_profile['id'],
+            client_id,
             status=status_filter
         )
         
@@ -1193,18 +891,14 @@ class MySubscriptionViewSet(viewsets.ViewSet):
         POST /api/my-subscriptions/
         Create a new subscription.
         """
-        from users import queries as user_queries
-        user_row = user_queries.get_user_by_id(request.user.id)
-        user_data = user_queries.structure_user_data(user_row)  # ✅ ADDED
-        
-        if user_data['user_type'] != 'client':
+        if request.user.user_type != 'client':
             return Response({
                 'error': 'Only clients can subscribe'
             }, status=status.HTTP_403_FORBIDDEN)
         
         # Check if client_profile exists
-        client_profile = user_data.get('client_profile')
-        if not client_profile or not client_profile.get('id'):
+        client_id = client_profile_id(request)
+        if not client_id:
             return Response({
                 'error': 'Client profile not found. Please complete your profile.'
             }, status=status.HTTP_400_BAD_REQUEST)
@@ -1213,7 +907,7 @@ class MySubscriptionViewSet(viewsets.ViewSet):
         
         if serializer.is_valid():
             subscription = queries.create_subscription(
-                client_id=client_profile['id'],
+                client_id=client_id,
                 basket_id=serializer.validated_data['basket_id'],
                 delivery_method=serializer.validated_data['delivery_method'],
                 delivery_address=serializer.validated_data.get('delivery_address'),
@@ -1235,20 +929,16 @@ class MySubscriptionViewSet(viewsets.ViewSet):
         POST /api/my-subscriptions/{id}/pause/
         Pause subscription.
         """
-        from users import queries as user_queries
-        user_row = user_queries.get_user_by_id(request.user.id)
-        user_data = user_queries.structure_user_data(user_row)  # ✅ ADDED
-        
         # Check if client_profile exists
-        client_profile = user_data.get('client_profile')
-        if not client_profile or not client_profile.get('id'):
+        client_id = client_profile_id(request)
+        if not client_id:
             return Response({
                 'error': 'Client profile not found'
             }, status=status.HTTP_400_BAD_REQUEST)
         
         result = queries.update_subscription_status(
             pk,
-            client_profile['id'],
+            client_id,
             'paused'
         )
         
@@ -1268,20 +958,16 @@ class MySubscriptionViewSet(viewsets.ViewSet):
         POST /api/my-subscriptions/{id}/cancel/
         Cancel subscription.
         """
-        from users import queries as user_queries
-        user_row = user_queries.get_user_by_id(request.user.id)
-        user_data = user_queries.structure_user_data(user_row)  # ✅ ADDED
-        
         # Check if client_profile exists
-        client_profile = user_data.get('client_profile')
-        if not client_profile or not client_profile.get('id'):
+        client_id = client_profile_id(request)
+        if not client_id:
             return Response({
                 'error': 'Client profile not found'
             }, status=status.HTTP_400_BAD_REQUEST)
         
         result = queries.update_subscription_status(
             pk,
-            client_profile['id'],
+            client_id,
             'cancelled'
         )
         
@@ -1301,20 +987,16 @@ class MySubscriptionViewSet(viewsets.ViewSet):
         POST /api/my-subscriptions/{id}/reactivate/
         Reactivate paused subscription.
         """
-        from users import queries as user_queries
-        user_row = user_queries.get_user_by_id(request.user.id)
-        user_data = user_queries.structure_user_data(user_row)  # ✅ ADDED
-        
         # Check if client_profile exists
-        client_profile = user_data.get('client_profile')
-        if not client_profile or not client_profile.get('id'):
+        client_id = client_profile_id(request)
+        if not client_id:
             return Response({
                 'error': 'Client profile not found'
             }, status=status.HTTP_400_BAD_REQUEST)
         
         result = queries.update_subscription_status(
             pk,
-            client_profile['id'],
+            client_id,
             'active'
         )
         
@@ -17,6 +17,8 @@ import django
 django.setup()
 
 from django.db import connection
+from products.queries import rebuild_product_season_months
+from products.seasonal_utils import invalidate_season_index
 
 
 def normalize_for_matching(text):
@@ -462,6 +464,13 @@ def import_seasonal_data():
     connection.commit()
     cursor.close()
     
+    # Running processes rebuild their season index on next lookup
+    if imported:
+        invalidate_season_index()
+        rows = rebuild_product_season_months()
+        connection.commit()
+        print(f"🗓️  Season buckets rebuilt: {rows} rows")
+    
     # Summary
     print("\n" + "="*60)
     print("📊 IMPORT SUMMARY")
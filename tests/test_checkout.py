@@ -0,0 +1,108 @@
+import pytest
+from decimal import Decimal
+from django.db import connection
+
+from cart.models import Cart, CartItem
+from order.checkout import materialize_order
+from order.models import Order, OrderItem
+from order.serializers import OrderSerializer
+from products import queries as product_queries
+
+
+@pytest.fixture
+def large_cart(producer_products):
+    """A cart of 30 lines spread over 8 producers."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO users (email, password, user_type, first_name, last_name)
+            SELECT 'checkout.producer' || g || '@example.com', '!', 'producer', 'Checkout', 'Producer'
+            FROM generate_series(1, 7) AS g
+            RETURNING id
+        """)
+        user_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute("""
+            INSERT INTO producers (user_id, shop_name)
+            SELECT user_id, 'Checkout Farm ' || user_id
+            FROM unnest(%s::integer[]) AS user_id
+            RETURNING id
+        """, [user_ids])
+        producer_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute("""
+            INSERT INTO products (producer_id, name, sale_type, price, stock, product_type)
+            SELECT producer_id, 'Checkout product ' || g, 'weight', 250, 50, 'fresh'
+            FROM unnest(%s::integer[]) AS producer_id, generate_series(1, 3) AS g
+            RETURNING id
+        """, [producer_ids])
+        product_ids = producer_products[:9] + [row[0] for row in cursor.fetchall()]
+
+    cart = Cart.objects.create(user_id=900010)
+    CartItem.objects.bulk_create([
+        CartItem(cart=cart, product_id=product_id,
+                 quantity=Decimal('2.00'), price_snapshot=Decimal('100.00'))
+        for product_id in product_ids
+    ])
+    return cart
+
+
+# ============================================
+# ORDER MATERIALIZATION TESTS
+# ============================================
+
+@pytest.mark.django_db
+class TestMaterializeOrder:
+    """Test the batched order creation used by create_from_cart."""
+
+    def test_fixed_number_of_queries(self, large_cart, django_assert_num_queries):
+        """Test 30 lines / 8 producers are written in a fixed number of queries."""
+        cart_items = list(large_cart.items.all())
+        products = product_queries.get_product_details_bulk(
+            [cart_item.product_id for cart_item in cart_items]
+        )
+        assert len(cart_items) == 30
+
+        # Order number + order + sub-orders + items
+        with django_assert_num_queries(4):
+            order = materialize_order(900010, cart_items, products,
+                                      delivery_method='pickup_producer')
+
+        assert order.sub_orders.count() == 8
+        assert OrderItem.objects.filter(sub_order__parent_order=order).count() == 30
+
+    def test_totals_are_written_once_and_match(self, large_cart):
+        """Test stored subtotals and total equal the recomputed ones."""
+        cart_items = list(large_cart.items.all())
+        products = product_queries.get_product_details_bulk(
+            [cart_item.product_id for cart_item in cart_items]
+        )
+
+        order = materialize_order(900010, cart_items, products,
+                                  delivery_method='pickup_producer')
+
+        stored = Order.objects.get(id=order.id)
+        assert stored.total_amount == Decimal('6000.00')
+        for sub_order in stored.sub_orders.all():
+            assert sub_order.subtotal == sub_order.get_total()
+            assert sub_order.sub_order_number.startswith(f'{stored.order_number}-P')
+
+    def test_response_does_not_reload_sub_orders(self, large_cart):
+        """Test sub-orders and items are served from the in-memory cache."""
+        cart_items = list(large_cart.items.all())
+        products = product_queries.get_product_details_bulk(
+            [cart_item.product_id for cart_item in cart_items]
+        )
+        order = materialize_order(900010, cart_items, products,
+                                  delivery_method='pickup_producer')
+
+        data = OrderSerializer(order).data
+
+        assert data['sub_orders_count'] == 8
+        assert sum(len(sub_order['items']) for sub_order in data['sub_orders']) == 30
+
+    def test_unknown_product_is_rejected(self, large_cart):
+        """Test a cart line without product aborts before any write."""
+        cart_items = list(large_cart.items.all())
+
+        with pytest.raises(ValueError):
+            materialize_order(900010, cart_items, {}, delivery_method='pickup_producer')
+
+        assert not Order.objects.filter(client_id=900010).exists()
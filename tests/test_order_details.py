@@ -0,0 +1,81 @@
+import pytest
+from decimal import Decimal
+from django.db import connection
+
+from order.models import Order, SubOrder, OrderItem
+from order.serializers import OrderSerializer, SubOrderSerializer, details_context
+
+
+@pytest.fixture
+def producer_sub_orders():
+    """One producer with 20 sub-orders from 5 clients, one item each."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO users (email, password, user_type, first_name, last_name)
+            VALUES ('details.producer@example.com', '!', 'producer', 'Details', 'Producer')
+            RETURNING id
+        """)
+        cursor.execute("""
+            INSERT INTO producers (user_id, shop_name, city, wilaya)
+            VALUES (%s, 'Details Farm', 'Blida', 'Blida')
+            RETURNING id
+        """, [cursor.fetchone()[0]])
+        producer_id = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO users (email, password, user_type, first_name, last_name)
+            SELECT 'details.client' || g || '@example.com', '!', 'client', 'Client', 'N' || g
+            FROM generate_series(1, 5) AS g
+            RETURNING id
+        """)
+        client_ids = [row[0] for row in cursor.fetchall()]
+
+    for index in range(20):
+        order = Order.objects.create(client_id=client_ids[index % 5])
+        sub_order = SubOrder.objects.create(parent_order=order, producer_id=producer_id)
+        OrderItem.objects.create(
+            sub_order=sub_order, product_id=1, product_name='Tomates',
+            quantity_ordered=Decimal('1.00'), unit_price=Decimal('100.00'), sale_type='weight'
+        )
+    return producer_id, client_ids
+
+
+# ============================================
+# BATCHED PRODUCER / CLIENT DETAILS TESTS
+# ============================================
+
+@pytest.mark.django_db
+class TestDetailsContext:
+    """Test producer and client details are resolved per page, not per row."""
+
+    def test_producer_page_costs_two_detail_queries(self, producer_sub_orders, django_assert_num_queries):
+        """Test 20 sub-orders need 2 queries for all their details."""
+        producer_id, _ = producer_sub_orders
+        sub_orders = list(
+            SubOrder.objects.filter(producer_id=producer_id)
+            .select_related('parent_order').prefetch_related('items')
+        )
+
+        with django_assert_num_queries(2):
+            context = details_context(sub_orders=sub_orders)
+            data = SubOrderSerializer(sub_orders, many=True, context=context).data
+
+        assert len(data) == 20
+        assert {row['producer_details']['shop_name'] for row in data} == {'Details Farm'}
+        assert all(row['client_details']['first_name'] == 'Client' for row in data)
+
+    def test_order_details_match_the_per_row_lookup(self, producer_sub_orders):
+        """Test the batched output is identical to the unbatched one."""
+        _, client_ids = producer_sub_orders
+        order = Order.objects.prefetch_related('sub_orders__items').filter(
+            client_id=client_ids[0]
+        ).first()
+
+        batched = OrderSerializer(order, context=details_context(orders=[order])).data
+        unbatched = OrderSerializer(order).data
+
+        assert batched == unbatched
+
+    def test_empty_page_runs_no_query(self, django_assert_num_queries):
+        """Test an empty page does not query users or producers."""
+        with django_assert_num_queries(0):
+            assert details_context() == {'producers': {}, 'clients': {}}
@@ -0,0 +1,82 @@
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+
+from db.pagination import InvalidCursor, paginate_queryset
+from order.models import Order, SubOrder
+from order.serializers import OrderListSerializer
+from order.views import history_filters
+
+
+@pytest.fixture
+def client_orders():
+    """25 orders of one client, one per day, each with 2 sub-orders."""
+    orders = []
+    now = timezone.now()
+    for day in range(25):
+        order = Order.objects.create(client_id=900040)
+        SubOrder.objects.create(parent_order=order, producer_id=1)
+        SubOrder.objects.create(parent_order=order, producer_id=2)
+        Order.objects.filter(pk=order.pk).update(created_at=now - timedelta(days=day))
+        orders.append(order.pk)
+    return orders
+
+
+# ============================================
+# ORDER HISTORY TESTS
+# ============================================
+
+@pytest.mark.django_db
+class TestOrderHistory:
+    """Test the cursor-paginated, annotated order listings."""
+
+    def test_pages_cover_every_order_once(self, client_orders):
+        """Test walking the cursors returns each order exactly once."""
+        queryset = Order.objects.filter(client_id=900040)
+
+        first, cursor = paginate_queryset(queryset, None, 20)
+        second, last_cursor = paginate_queryset(queryset, cursor, 20)
+
+        assert len(first) == 20
+        assert len(second) == 5
+        assert last_cursor is None
+        assert [order.pk for order in first + second] == client_orders
+
+    def test_sub_orders_count_is_annotated(self, client_orders, django_assert_num_queries):
+        """Test a page is listed with its counts in a single query."""
+        from django.db.models import Count, OuterRef, Subquery
+
+        queryset = Order.objects.filter(client_id=900040).annotate(
+            sub_orders_count=Subquery(
+                SubOrder.objects.filter(parent_order=OuterRef('pk'))
+                .values('parent_order').annotate(count=Count('id')).values('count')[:1]
+            )
+        )
+
+        with django_assert_num_queries(1):
+            orders, _ = paginate_queryset(queryset, None, 20)
+            data = OrderListSerializer(orders, many=True).data
+
+        assert {order['sub_orders_count'] for order in data} == {2}
+
+    def test_date_range_filter(self, client_orders):
+        """Test ?from= / ?to= keep whole days."""
+        today = timezone.localdate()
+        filters = history_filters({
+            'from': (today - timedelta(days=2)).isoformat(),
+            'to': today.isoformat(),
+        })
+
+        assert Order.objects.filter(client_id=900040, **filters).count() == 3
+
+    def test_invalid_filters_are_rejected(self):
+        """Test unknown statuses and malformed dates raise ValueError."""
+        with pytest.raises(ValueError):
+            history_filters({'status': 'shipped'})
+        with pytest.raises(ValueError):
+            history_filters({'from': '15/12/2025'})
+
+    def test_invalid_cursor(self):
+        """Test a tampered cursor is rejected."""
+        with pytest.raises(InvalidCursor):
+            paginate_queryset(Order.objects.all(), 'not-a-cursor', 20)
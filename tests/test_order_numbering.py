@@ -0,0 +1,91 @@
+import pytest
+from datetime import date
+from django.db import connection
+
+from order.models import Order, SubOrder
+from order.numbering import (
+    drop_past_order_number_sequences, format_order_number, format_sub_order_number,
+    next_order_number,
+)
+
+
+# ============================================
+# ORDER NUMBER ALLOCATION TESTS
+# ============================================
+
+class TestOrderNumberFormat:
+    """Test the human-readable order number format."""
+
+    def test_order_number(self):
+        """Test DZF-YYYYMMDD-NNNN."""
+        assert format_order_number(date(2025, 12, 15), 7) == 'DZF-20251215-0007'
+
+    def test_sub_order_number(self):
+        """Test the producer index suffix."""
+        assert format_sub_order_number('DZF-20251215-0007', 2) == 'DZF-20251215-0007-P2'
+
+
+@pytest.mark.django_db
+class TestNextOrderNumber:
+    """Test the per-day sequence allocation."""
+
+    def test_numbers_increase_within_a_day(self):
+        """Test two allocations of the same day never collide."""
+        day = date(2001, 1, 1)
+        first = next_order_number(day)
+        second = next_order_number(day)
+
+        assert first.startswith('DZF-20010101-')
+        assert int(second.rsplit('-', 1)[1]) == int(first.rsplit('-', 1)[1]) + 1
+
+    def test_each_day_has_its_own_counter(self):
+        """Test a new day starts its own numbering."""
+        next_order_number(date(2001, 1, 2))
+        assert next_order_number(date(2001, 1, 3)).startswith('DZF-20010103-')
+
+    def test_one_query_whatever_the_orders_of_the_day(self, django_assert_num_queries):
+        """Test allocation does not count existing orders."""
+        for _ in range(3):
+            Order.objects.create(client_id=900020)
+
+        with django_assert_num_queries(1):
+            next_order_number()
+
+    def test_new_sequence_continues_after_existing_orders(self):
+        """Test a day already holding orders (numbered before the sequence) never collides."""
+        Order.objects.create(client_id=900022, order_number='DZF-20010105-0007')
+        Order.objects.create(client_id=900022, order_number='DZF-20010105-0012')
+
+        assert next_order_number(date(2001, 1, 5)) == 'DZF-20010105-0013'
+        assert next_order_number(date(2001, 1, 5)) == 'DZF-20010105-0014'
+
+    def test_past_sequences_are_dropped(self):
+        """Test the cleanup keeps only today's sequence."""
+        next_order_number(date(2001, 1, 6))
+        next_order_number(date(2001, 1, 7))
+
+        assert drop_past_order_number_sequences(today=date(2001, 1, 7)) >= 1
+
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT sequence_name FROM information_schema.sequences
+                WHERE sequence_name IN ('order_number_seq_20010106', 'order_number_seq_20010107')
+            """)
+            assert [row[0] for row in cursor.fetchall()] == ['order_number_seq_20010107']
+
+    def test_dropped_day_resumes_after_its_orders(self):
+        """Test a dropped sequence is recreated after the orders of its day."""
+        order = Order.objects.create(client_id=900023, order_number=next_order_number(date(2001, 1, 8)))
+        drop_past_order_number_sequences(today=date(2001, 1, 9))
+
+        following = next_order_number(date(2001, 1, 8))
+        assert int(following.rsplit('-', 1)[1]) == int(order.order_number.rsplit('-', 1)[1]) + 1
+
+    def test_sub_order_numbers_follow_the_parent(self):
+        """Test SubOrder.save numbers sub-orders P1, P2..."""
+        order = Order.objects.create(client_id=900021)
+        first = SubOrder.objects.create(parent_order=order, producer_id=1)
+        second = SubOrder.objects.create(parent_order=order, producer_id=2)
+
+        assert first.sub_order_number == f'{order.order_number}-P1'
+        assert second.sub_order_number == f'{order.order_number}-P2'
@@ -0,0 +1,91 @@
+import pytest
+from decimal import Decimal
+
+from cart.models import Cart, CartItem
+from order.models import Order, SubOrder, OrderItem
+from order.serializers import SubOrderSerializer
+
+
+@pytest.fixture
+def order_with_items():
+    """An order with one sub-order of two items (2 × 100 + 1.5 × 300)."""
+    order = Order.objects.create(client_id=900030, total_amount=Decimal('650.00'))
+    sub_order = SubOrder.objects.create(
+        parent_order=order, producer_id=1, subtotal=Decimal('650.00')
+    )
+    unit_item = OrderItem.objects.create(
+        sub_order=sub_order, product_id=1, product_name='Oeufs',
+        quantity_ordered=Decimal('2.00'), unit_price=Decimal('100.00'), sale_type='unit'
+    )
+    weight_item = OrderItem.objects.create(
+        sub_order=sub_order, product_id=2, product_name='Tomates',
+        quantity_ordered=Decimal('1.50'), unit_price=Decimal('300.00'), sale_type='weight'
+    )
+    return order, sub_order, unit_item, weight_item
+
+
+# ============================================
+# STORED TOTALS TESTS
+# ============================================
+
+@pytest.mark.django_db
+class TestStoredTotals:
+    """Test order totals are maintained in SQL, not re-walked in Python."""
+
+    def test_quantity_adjustment_applies_a_delta(self, order_with_items):
+        """Test the item delta is added to the stored subtotal and total."""
+        order, sub_order, _, weight_item = order_with_items
+
+        delta = weight_item.set_quantity_actual(Decimal('1.20'))
+
+        assert delta == Decimal('-90.00')
+        sub_order.refresh_from_db()
+        order.refresh_from_db()
+        assert sub_order.subtotal == Decimal('560.00')
+        assert order.total_amount == Decimal('560.00')
+        assert sub_order.subtotal == sub_order.get_total()
+
+    def test_adjusting_twice_uses_the_stored_quantity(self, order_with_items):
+        """Test the second delta starts from the first adjustment."""
+        order, sub_order, _, weight_item = order_with_items
+
+        weight_item.set_quantity_actual(Decimal('1.20'))
+        weight_item.set_quantity_actual(Decimal('1.80'))
+
+        order.refresh_from_db()
+        assert order.total_amount == Decimal('740.00')
+
+    def test_update_subtotal_is_one_update(self, order_with_items, django_assert_num_queries):
+        """Test the aggregate UPDATE repairs a wrong stored subtotal."""
+        order, sub_order, _, _ = order_with_items
+        SubOrder.objects.filter(pk=sub_order.pk).update(subtotal=Decimal('0.00'))
+
+        # UPDATE ... SET subtotal = (SELECT SUM(...)) + reload of the value
+        with django_assert_num_queries(2):
+            assert sub_order.update_subtotal() == Decimal('650.00')
+
+    def test_update_total_sums_stored_subtotals(self, order_with_items, django_assert_num_queries):
+        """Test the order total is rebuilt from the sub-order subtotals."""
+        order, _, _, _ = order_with_items
+        SubOrder.objects.create(parent_order=order, producer_id=2, subtotal=Decimal('50.00'))
+
+        with django_assert_num_queries(2):
+            assert order.update_total() == Decimal('700.00')
+
+    def test_serializer_reads_the_stored_total(self, order_with_items, django_assert_num_queries):
+        """Test SubOrderSerializer.total does not aggregate the items."""
+        _, sub_order, _, _ = order_with_items
+
+        with django_assert_num_queries(0):
+            assert SubOrderSerializer().get_total(sub_order) == 650.0
+
+    def test_cart_total_is_summed_in_sql(self, django_assert_num_queries):
+        """Test Cart.get_total is a single aggregate query."""
+        cart = Cart.objects.create(user_id=900031)
+        CartItem.objects.create(cart=cart, product_id=1, quantity=Decimal('2.00'),
+                                price_snapshot=Decimal('100.00'))
+        CartItem.objects.create(cart=cart, product_id=2, quantity=Decimal('0.50'),
+                                price_snapshot=Decimal('300.00'))
+
+        with django_assert_num_queries(1):
+            assert cart.get_total() == Decimal('350.00')
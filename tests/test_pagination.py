@@ -0,0 +1,169 @@
+import pytest
+from datetime import date, datetime
+from django.db import connection
+from rest_framework.test import APIRequestFactory
+
+from db.pagination import (
+    MAX_PAGE_SIZE, InvalidCursor, decode_cursor, encode_cursor,
+    keyset_condition, paginate, parse_page_size,
+)
+from products.queries import filter_products, search_products
+from products.views import ProductViewSet
+
+PRODUCT_KEY = ('created_at', 'id')
+SEARCH_KEY = ('search_rank', 'created_at', 'id')
+
+
+# ============================================
+# KEYSET PAGINATION TESTS
+# ============================================
+
+class TestCursor:
+    """Test opaque cursor encoding (no database access)."""
+
+    def test_round_trip(self):
+        """Test ranks, datetimes and ids survive a round trip."""
+        values = [0.0607927, datetime(2025, 3, 1, 12, 30, 5, 123456), 42]
+        assert decode_cursor(encode_cursor(values), SEARCH_KEY) == values
+
+    def test_cursor_is_url_safe(self):
+        """Test cursors can be sent as a query param without escaping."""
+        cursor = encode_cursor([datetime(2025, 1, 1), 10**9])
+        assert all(c.isalnum() or c in '-_' for c in cursor)
+
+    def test_no_cursor(self):
+        """Test a missing cursor means the first page."""
+        assert decode_cursor(None, PRODUCT_KEY) is None
+        assert decode_cursor('', PRODUCT_KEY) is None
+
+    @pytest.mark.parametrize('cursor', ['not-a-cursor', '!!!', encode_cursor([1, 2, 3])])
+    def test_invalid_cursor(self, cursor):
+        """Test garbage and cursors from another listing are rejected."""
+        with pytest.raises(InvalidCursor):
+            decode_cursor(cursor, PRODUCT_KEY)
+
+    @pytest.mark.parametrize('key, values', [
+        (PRODUCT_KEY, ['2025-01-01T00:00:00', 1]),
+        (PRODUCT_KEY, [date(2025, 1, 1), 1]),
+        (PRODUCT_KEY, [datetime(2025, 1, 1), '1']),
+        (PRODUCT_KEY, [datetime(2025, 1, 1), 1.5]),
+        (PRODUCT_KEY, [datetime(2025, 1, 1), True]),
+        (PRODUCT_KEY, [datetime(2025, 1, 1), None]),
+        (SEARCH_KEY, ['0.5', datetime(2025, 1, 1), 1]),
+        (SEARCH_KEY, [{'x': 1}, datetime(2025, 1, 1), 1]),
+        (SEARCH_KEY, [0.5, 1, datetime(2025, 1, 1)]),
+    ])
+    def test_wrong_value_types(self, key, values):
+        """Test values that do not match their sort key column are rejected."""
+        with pytest.raises(InvalidCursor):
+            decode_cursor(encode_cursor(values), key)
+
+
+@pytest.mark.django_db
+class TestCursorRequests:
+    """Test listings answer 400 to cursors with mistyped values."""
+
+    @pytest.mark.parametrize('action, params', [
+        ('search', {'q': 'tomate', 'cursor': encode_cursor(['high', '2025-01-01', 1])}),
+        ('filter', {'cursor': encode_cursor(['2025-01-01', 1])}),
+        ('filter', {'wilaya': 'Blida', 'fuzzy': 'true',
+                    'cursor': encode_cursor([0.5, datetime(2025, 1, 1), 'x'])}),
+    ])
+    def test_mistyped_cursor_is_a_bad_request(self, action, params):
+        """Test the cursor is rejected before reaching the query."""
+        request = APIRequestFactory().get(f'/api/products/{action}/', params)
+        response = ProductViewSet.as_view({'get': action})(request)
+
+        assert response.status_code == 400
+        assert response.data == {'error': 'Invalid cursor'}
+
+
+@pytest.fixture
+def tied_products():
+    """Create 5 identical products of a producer in 'Tamanrasset', return their ids."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO users (email, password, user_type, first_name, last_name)
+            VALUES ('tied.producer@example.com', '!', 'producer', 'Tied', 'Producer')
+            RETURNING id
+        """)
+        user_id = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO producers (user_id, shop_name, city, wilaya)
+            VALUES (%s, 'Tied Farm', 'Tamanrasset', 'Tamanrasset')
+            RETURNING id
+        """, [user_id])
+        producer_id = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO products (producer_id, name, description, sale_type, price, stock, product_type)
+            SELECT %s, 'Zarzour sauvage', 'Zarzour de saison', 'unit', 100, 5, 'fresh'
+            FROM generate_series(1, 5)
+            RETURNING id
+        """, [producer_id])
+        return sorted(row[0] for row in cursor.fetchall())
+
+
+@pytest.fixture
+def pg_trgm():
+    """Skip unless the pg_trgm extension (migration 0007) is installed."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+        if not cursor.fetchone()[0]:
+            pytest.skip('pg_trgm is not installed')
+
+
+def read_all_pages(fetch):
+    """Follow next cursors (at most 10 pages), return every id seen."""
+    ids, cursor = [], None
+    for _ in range(10):
+        rows, cursor = fetch(cursor)
+        ids += [row['id'] for row in rows]
+        if cursor is None:
+            break
+    return ids
+
+
+@pytest.mark.django_db
+class TestRankedPages:
+    """Test pages of equal ranks: the cursor rank must equal the row's rank."""
+
+    def test_search_pages_through_tied_ranks(self, tied_products):
+        """Test every tied search hit is returned exactly once."""
+        ids = read_all_pages(lambda cursor: search_products('zarzour', cursor=cursor, page_size=2))
+
+        assert sorted(ids) == tied_products
+
+    def test_fuzzy_filter_pages_through_tied_similarities(self, tied_products, pg_trgm):
+        """Test every tied fuzzy match is returned exactly once."""
+        ids = read_all_pages(lambda cursor: filter_products(
+            wilaya='Tamanraset', fuzzy=True, cursor=cursor, page_size=2
+        ))
+
+        assert sorted(ids) == tied_products
+
+
+class TestPaginate:
+    """Test page trimming and keyset SQL."""
+
+    def test_next_cursor_points_after_last_row(self):
+        """Test the extra row is dropped and the cursor holds the last sort key."""
+        rows = [{'created_at': datetime(2025, 1, 3 - i), 'id': 10 - i} for i in range(3)]
+        page, next_cursor = paginate(rows, 2, ('created_at', 'id'))
+        assert page == rows[:2]
+        assert decode_cursor(next_cursor, PRODUCT_KEY) == [datetime(2025, 1, 2), 9]
+
+    def test_last_page_has_no_cursor(self):
+        """Test no next cursor when the page is not full."""
+        rows = [{'created_at': datetime(2025, 1, 1), 'id': 1}]
+        assert paginate(rows, 2, ('created_at', 'id')) == (rows, None)
+
+    def test_keyset_condition(self):
+        """Test the row comparison used for DESC sort keys."""
+        assert keyset_condition(['p.created_at', 'p.id']) == '(p.created_at, p.id) < (%s, %s)'
+
+    def test_parse_page_size(self):
+        """Test page size parsing and clamping."""
+        assert parse_page_size(None) == 20
+        assert parse_page_size('abc') == 20
+        assert parse_page_size('0') == 1
+        assert parse_page_size('5000') == MAX_PAGE_SIZE
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+from django.conf import settings
+
+from users import password_pool
+from users.password_pool import (
+    PasswordPoolBusy, check_password_hash, get_password_pool_stats, hash_password,
+)
+
+
+@pytest.fixture
+def busy_workers():
+    """Occupy every pool thread until the test ends."""
+    release = threading.Event()
+    started = []
+    callers = []
+
+    def block():
+        started.append(True)
+        release.wait()
+
+    for _ in range(password_pool.PASSWORD_HASH_WORKERS):
+        caller = threading.Thread(target=password_pool._call, args=(block,))
+        caller.start()
+        callers.append(caller)
+
+    while len(started) < password_pool.PASSWORD_HASH_WORKERS:
+        time.sleep(0.001)
+
+    yield
+
+    release.set()
+    for caller in callers:
+        caller.join()
+
+
+# ============================================
+# PASSWORD POOL TESTS
+# ============================================
+
+class TestPasswordPool:
+    """Test the bounded password hashing pool."""
+
+    def test_hash_and_check(self):
+        """Test hashing and verification run on the pool."""
+        stored = hash_password('s3cret-pass')
+
+        assert check_password_hash('s3cret-pass', stored)
+        assert not check_password_hash('wrong-pass', stored)
+
+    def test_admits_fewer_calls_than_request_threads(self):
+        """Test waiting password calls can never block every request thread."""
+        admitted = password_pool.PASSWORD_HASH_WORKERS + password_pool.PASSWORD_HASH_QUEUE
+
+        assert admitted == password_pool.PASSWORD_HASH_CAPACITY
+        assert admitted < settings.WEB_THREADS
+
+    def test_full_pool_refuses_at_once(self, monkeypatch, busy_workers):
+        """Test a call beyond workers + queue is refused without waiting."""
+        monkeypatch.setattr(password_pool, 'PASSWORD_HASH_QUEUE', 0)
+        rejected = get_password_pool_stats()['rejected']
+
+        start = time.perf_counter()
+        with pytest.raises(PasswordPoolBusy):
+            hash_password('s3cret-pass')
+
+        assert time.perf_counter() - start < 0.05
+        assert get_password_pool_stats()['rejected'] == rejected + 1
+
+    def test_queued_call_times_out(self, monkeypatch, busy_workers):
+        """Test a queued call gives up after the timeout and frees its slot."""
+        monkeypatch.setattr(password_pool, 'PASSWORD_HASH_QUEUE', 1)
+        monkeypatch.setattr(password_pool, 'PASSWORD_HASH_TIMEOUT', 0.05)
+        before = get_password_pool_stats()
+
+        with pytest.raises(PasswordPoolBusy):
+            hash_password('s3cret-pass')
+
+        stats = get_password_pool_stats()
+        assert stats['timeouts'] == before['timeouts'] + 1
+        assert stats['in_flight'] == password_pool.PASSWORD_HASH_WORKERS
+        assert stats['queued'] == 0
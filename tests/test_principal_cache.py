@@ -0,0 +1,164 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+
+from users import principal_cache, queries
+from users.authentication import CustomJWTAuthentication, CustomUser
+from users.principal_cache import (
+    get_cached_principal, get_principal_cache_stats, get_profile_version, invalidate_principal,
+)
+
+
+@pytest.fixture
+def empty_principal_cache():
+    cache.clear()
+    principal_cache.clear_principal_cache()
+    yield
+    cache.clear()
+    principal_cache.clear_principal_cache()
+
+
+@pytest.fixture
+def client_user(empty_principal_cache, warm_revocation_filter):
+    """Create an active client, return its user id."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO users (email, password, user_type, first_name, last_name)
+            VALUES ('principal.client@example.com', '!', 'client', 'Principal', 'Client')
+            RETURNING id
+        """)
+        user_id = cursor.fetchone()[0]
+        cursor.execute(
+            "INSERT INTO clients (user_id, city, wilaya) VALUES (%s, 'Oran', 'Oran')",
+            [user_id]
+        )
+    return user_id
+
+
+# ============================================
+# PRINCIPAL CACHE TESTS
+# ============================================
+
+class TestPrincipalCache:
+    """Test the versioned principal cache with a fake loader."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self, empty_principal_cache):
+        """Count loader calls."""
+        self.loads = []
+
+        def loader(user_id):
+            self.loads.append(user_id)
+            return object() if user_id == 1 else None
+
+        self.loader = loader
+
+    def test_second_read_is_a_hit(self):
+        """Test the loader runs once and the same principal is returned."""
+        first = get_cached_principal(1, self.loader)
+        second = get_cached_principal('1', self.loader)
+
+        assert first is second
+        assert self.loads == [1]
+        assert get_principal_cache_stats()['hits'] == 1
+
+    def test_invalidation_reloads(self):
+        """Test a bumped version forces a reload."""
+        get_cached_principal(1, self.loader)
+        invalidate_principal(1)
+        get_cached_principal(1, self.loader)
+
+        assert self.loads == [1, 1]
+
+    def test_other_process_invalidation(self):
+        """Test a version bumped elsewhere (shared cache only) is seen."""
+        get_cached_principal(1, self.loader)
+        cache.incr(principal_cache._version_key(1))
+        get_cached_principal(1, self.loader)
+
+        assert self.loads == [1, 1]
+
+    def test_every_bump_writes_a_new_version(self):
+        """Test a bump never hands out a version already read."""
+        seen = {get_profile_version(1)}
+        for _ in range(3):
+            invalidate_principal(1)
+            version = get_profile_version(1)
+            assert version not in seen
+            seen.add(version)
+
+    def test_ttl_bounds_staleness(self, monkeypatch):
+        """Test an expired principal is reloaded even without a bump."""
+        monkeypatch.setattr(principal_cache, 'PRINCIPAL_CACHE_TTL', 0)
+
+        get_cached_principal(1, self.loader)
+        get_cached_principal(1, self.loader)
+
+        assert self.loads == [1, 1]
+
+    def test_missing_user_is_not_cached(self):
+        """Test None is never cached."""
+        assert get_cached_principal(2, self.loader) is None
+        assert get_cached_principal(2, self.loader) is None
+        assert self.loads == [2, 2]
+
+    def test_lru_is_bounded(self, monkeypatch):
+        """Test the least recently used principal is evicted."""
+        monkeypatch.setattr(principal_cache, 'PRINCIPAL_CACHE_SIZE', 2)
+
+        for user_id in (1, 3, 4):
+            get_cached_principal(user_id, lambda user_id: object())
+
+        assert list(principal_cache._local) == [3, 4]
+
+
+@pytest.mark.django_db
+class TestCachedAuthentication:
+    """Test CustomJWTAuthentication.get_user through the principal cache."""
+
+    def test_cache_hit_runs_no_query(self, client_user, django_assert_num_queries):
+        """Test the second request of a user does not touch the database."""
+        auth = CustomJWTAuthentication()
+        user = auth.get_user({'user_id': client_user})
+
+        with django_assert_num_queries(0):
+            assert auth.get_user({'user_id': client_user}) is user
+
+        assert isinstance(user, CustomUser)
+        assert user.client_profile.city == 'Oran'
+        assert user.producer_profile is None
+
+    def test_principal_uses_slots(self, client_user):
+        """Test principals carry no per-instance dict."""
+        user = CustomJWTAuthentication().get_user({'user_id': client_user})
+
+        assert not hasattr(user, '__dict__')
+        assert not hasattr(user.client_profile, '__dict__')
+
+    def test_profile_update_is_seen(self, client_user):
+        """Test update_client_profile invalidates the principal."""
+        auth = CustomJWTAuthentication()
+        auth.get_user({'user_id': client_user})
+
+        queries.update_client_profile(client_user, city='Alger')
+
+        assert auth.get_user({'user_id': client_user}).client_profile.city == 'Alger'
+
+    def test_user_update_is_seen(self, client_user):
+        """Test update_user invalidates the principal."""
+        auth = CustomJWTAuthentication()
+        auth.get_user({'user_id': client_user})
+
+        queries.update_user(client_user, first_name='Renamed')
+
+        assert auth.get_user({'user_id': client_user}).first_name == 'Renamed'
+
+    def test_deactivated_user_stops_authenticating(self, client_user):
+        """Test deactivate_user drops the cached principal."""
+        auth = CustomJWTAuthentication()
+        auth.get_user({'user_id': client_user})
+
+        assert queries.deactivate_user(client_user)
+
+        assert auth.get_user({'user_id': client_user}) is None
+        assert not queries.deactivate_user(client_user)
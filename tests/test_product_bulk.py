@@ -0,0 +1,125 @@
+import pytest
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from cart.models import Cart, CartItem
+from cart.serializers import AddToCartSerializer, CartSerializer
+from cart.view_models import CartViewModel
+from products import queries as product_queries
+from products.product_cache import (
+    begin_request_scope, clear_local_product_cache, end_request_scope,
+)
+
+
+# ============================================
+# BULK PRODUCT LOOKUP TESTS
+# ============================================
+
+@pytest.mark.django_db
+class TestProductDetailsBulk:
+    """Test get_product_details_bulk and its use by the cart."""
+
+    def test_one_query_for_many_products(self, producer_products, django_assert_num_queries):
+        """Test 10 products are loaded with a single query."""
+        with django_assert_num_queries(1):
+            products = product_queries.get_product_details_bulk(producer_products)
+
+        assert sorted(products) == sorted(producer_products)
+        assert products[producer_products[0]]['shop_name'] == 'Bulk Farm'
+
+    def test_cached_products_need_no_query(self, producer_products, django_assert_num_queries):
+        """Test a second lookup is served from the product cache."""
+        product_queries.get_product_details_bulk(producer_products)
+
+        with django_assert_num_queries(0):
+            product_queries.get_product_details_bulk(producer_products)
+
+    def test_unknown_ids_are_absent(self, producer_products):
+        """Test missing products are simply not in the result."""
+        products = product_queries.get_product_details_bulk([producer_products[0], 0])
+        assert list(products) == [producer_products[0]]
+
+    def test_cart_serialization_query_count_is_constant(self, producer_products):
+        """Test rendering a cart costs the same with 1 or 10 items."""
+
+        def count_queries(user_id, product_ids):
+            cart = Cart.objects.create(user_id=user_id)
+            for product_id in product_ids:
+                CartItem.objects.create(
+                    cart=cart, product_id=product_id,
+                    quantity=Decimal('1.00'), price_snapshot=Decimal('100.00')
+                )
+            cache.clear()
+            clear_local_product_cache()
+
+            with CaptureQueriesContext(connection) as queries:
+                data = CartSerializer(cart).data
+
+            assert len(data['items']) == len(product_ids)
+            return len(queries)
+
+        assert count_queries(900001, producer_products[:1]) == \
+            count_queries(900002, producer_products)
+
+
+@pytest.mark.django_db
+class TestCartViewModel:
+    """Test the cart view-model used by the cart endpoints."""
+
+    def test_two_queries_whatever_the_cart_size(self, producer_products, django_assert_num_queries):
+        """Test items + products are loaded in two queries, then rendered."""
+        cart = Cart.objects.create(user_id=900003)
+        for product_id in producer_products:
+            CartItem.objects.create(
+                cart=cart, product_id=product_id,
+                quantity=Decimal('2.00'), price_snapshot=Decimal('100.00')
+            )
+
+        with django_assert_num_queries(2):
+            data = CartSerializer(CartViewModel.load(cart)).data
+
+        assert data['items_count'] == 10
+        assert data['total'] == 2000.0
+        assert len(data['items_by_producer']) == 1
+        assert data['items_by_producer'][0]['subtotal'] == 2000.0
+        assert data['items_by_producer'][0]['items'] == data['items']
+
+    def test_empty_cart_needs_no_product_query(self, django_assert_num_queries):
+        """Test an empty cart only reads its items."""
+        cart = Cart.objects.create(user_id=900004)
+
+        with django_assert_num_queries(1):
+            data = CartSerializer(CartViewModel.load(cart)).data
+
+        assert data['items'] == []
+        assert data['total'] == 0.0
+
+
+@pytest.mark.django_db
+class TestRequestIdentityMap:
+    """Test product rows are shared within one request."""
+
+    def test_add_to_cart_reads_the_product_once(self, producer_products):
+        """Test validation, the view and the cart item share one product query."""
+        product_id = producer_products[0]
+        cart = Cart.objects.create(user_id=900005)
+        cart_item = CartItem.objects.create(
+            cart=cart, product_id=product_id,
+            quantity=Decimal('1.00'), price_snapshot=Decimal('100.00')
+        )
+
+        token = begin_request_scope()
+        try:
+            with CaptureQueriesContext(connection) as ctx:
+                serializer = AddToCartSerializer(data={'product_id': product_id, 'quantity': '2'})
+                assert serializer.is_valid(), serializer.errors
+                product = product_queries.get_product_detail(product_id)
+                cart_item.get_product_details()
+        finally:
+            end_request_scope(token)
+
+        product_queries_run = [q for q in ctx.captured_queries if 'FROM products' in q['sql']]
+        assert len(product_queries_run) == 1
+        assert product['id'] == product_id
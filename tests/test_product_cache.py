@@ -0,0 +1,168 @@
+import pytest
+from django.core.cache import cache
+
+from products import product_cache
+from products.product_cache import (
+    get_cached_product_detail, get_product_cache_stats, invalidate_product_detail,
+)
+
+
+# ============================================
+# PRODUCT DETAIL CACHE TESTS
+# ============================================
+
+class TestProductCache:
+    """Test the versioned product detail cache with a fake loader."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Start from an empty cache and count loader calls."""
+        cache.clear()
+        product_cache.clear_local_product_cache()
+        self.loads = []
+        self.rows = {1: {'id': 1, 'name': 'Tomates', 'stock': 10}}
+
+        def loader(product_id):
+            self.loads.append(product_id)
+            row = self.rows.get(product_id)
+            return dict(row) if row else None
+
+        self.loader = loader
+        yield
+        cache.clear()
+        product_cache.clear_local_product_cache()
+
+    def test_second_read_is_a_local_hit(self):
+        """Test the database is read once."""
+        get_cached_product_detail(1, self.loader)
+        product = get_cached_product_detail('1', self.loader)
+
+        assert product['name'] == 'Tomates'
+        assert self.loads == [1]
+        stats = get_product_cache_stats()
+        assert stats['misses'] == 1
+        assert stats['local_hits'] == 1
+
+    def test_returns_a_copy(self):
+        """Test callers can pop keys without corrupting the cache."""
+        get_cached_product_detail(1, self.loader).pop('name')
+        assert get_cached_product_detail(1, self.loader)['name'] == 'Tomates'
+
+    def test_shared_cache_hit_after_local_eviction(self):
+        """Test another process (empty LRU) reads the shared copy."""
+        get_cached_product_detail(1, self.loader)
+        product_cache._local.clear()
+
+        get_cached_product_detail(1, self.loader)
+        assert self.loads == [1]
+        assert get_product_cache_stats()['shared_hits'] == 1
+
+    def test_local_copy_expires(self, monkeypatch):
+        """Test an old local copy is re-read from the shared cache."""
+        get_cached_product_detail(1, self.loader)
+        monkeypatch.setattr(product_cache, 'PRODUCT_CACHE_LOCAL_MAX_AGE', 0)
+
+        get_cached_product_detail(1, self.loader)
+        assert self.loads == [1]
+        assert get_product_cache_stats()['shared_hits'] == 1
+
+    def test_invalidation_reloads(self):
+        """Test a write makes the next read hit the database."""
+        get_cached_product_detail(1, self.loader)
+        self.rows[1]['stock'] = 4
+        invalidate_product_detail(1)
+
+        assert get_cached_product_detail(1, self.loader)['stock'] == 4
+        assert self.loads == [1, 1]
+
+    def test_evicted_version_key_is_not_reused(self):
+        """Test losing the version key never resurrects an old copy."""
+        get_cached_product_detail(1, self.loader)
+        cache.delete(product_cache._version_key(1))
+        self.rows[1]['stock'] = 2
+
+        assert get_cached_product_detail(1, self.loader)['stock'] == 2
+
+    def test_every_bump_writes_a_new_version(self):
+        """Test a bump never hands out a version already read."""
+        seen = {product_cache._current_version(1)}
+        for _ in range(3):
+            invalidate_product_detail(1)
+            version = product_cache._current_version(1)
+            assert version not in seen
+            seen.add(version)
+
+    def test_missing_product_is_not_cached(self):
+        """Test None results always go to the database."""
+        assert get_cached_product_detail(99, self.loader) is None
+        assert get_cached_product_detail(99, self.loader) is None
+        assert self.loads == [99, 99]
+
+
+class TestRequestIdentityMap:
+    """Test the request-scoped product identity map."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Open a request scope with a counting loader."""
+        cache.clear()
+        product_cache.clear_local_product_cache()
+        self.loads = []
+        self.rows = {1: {'id': 1, 'name': 'Tomates', 'stock': 10}}
+
+        def loader(product_id):
+            self.loads.append(product_id)
+            row = self.rows.get(product_id)
+            return dict(row) if row else None
+
+        self.loader = loader
+        token = product_cache.begin_request_scope()
+        yield
+        product_cache.end_request_scope(token)
+        cache.clear()
+        product_cache.clear_local_product_cache()
+
+    def test_reads_share_one_row_without_the_cache(self):
+        """Test later reads of the request skip both cache levels."""
+        get_cached_product_detail(1, self.loader)
+        cache.clear()
+        product_cache._local.clear()
+
+        assert get_cached_product_detail(1, self.loader)['name'] == 'Tomates'
+        assert self.loads == [1]
+        assert get_product_cache_stats()['request_hits'] == 1
+
+    def test_bulk_reads_use_the_map(self):
+        """Test rows read one by one are reused by a bulk read."""
+        self.rows[2] = {'id': 2, 'name': 'Oranges', 'stock': 3}
+        get_cached_product_detail(1, self.loader)
+
+        bulk_loads = []
+
+        def bulk_loader(ids):
+            bulk_loads.append(list(ids))
+            return {product_id: dict(self.rows[product_id]) for product_id in ids}
+
+        products = product_cache.get_cached_product_details([1, 2], bulk_loader)
+
+        assert sorted(products) == [1, 2]
+        assert bulk_loads == [[2]]
+
+    def test_invalidation_evicts_the_row(self):
+        """Test a write in the request is seen by the next read."""
+        get_cached_product_detail(1, self.loader)
+        self.rows[1]['stock'] = 4
+        invalidate_product_detail(1)
+
+        assert get_cached_product_detail(1, self.loader)['stock'] == 4
+        assert self.loads == [1, 1]
+
+    def test_map_is_dropped_at_request_end(self):
+        """Test a new request does not see the previous request's rows."""
+        get_cached_product_detail(1, self.loader)
+        token = product_cache.begin_request_scope()
+        try:
+            assert product_cache._request_products.get() == {}
+        finally:
+            product_cache.end_request_scope(token)
+        assert 1 in product_cache._request_products.get()
@@ -0,0 +1,115 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+
+from products.queries import (
+    PRICE_BUCKETS, filter_products, get_product_facets, normalize_wilaya, price_bucket_label,
+    product_facets_cache_key,
+)
+
+
+# ============================================
+# PRODUCT FACETS TESTS
+# ============================================
+
+def facet_filters(**overrides):
+    filters = {
+        'sale_type': None, 'product_type': None, 'is_anti_gaspi': None,
+        'min_price': None, 'max_price': None, 'wilaya': None, 'fuzzy': False,
+    }
+    filters.update(overrides)
+    return filters
+
+
+class TestProductFacetsCacheKey:
+    """Test filter normalization for the facets cache (no database access)."""
+
+    def test_equivalent_filters_share_a_key(self):
+        """Test normalized wilayas and price formatting share a key."""
+        a = product_facets_cache_key(facet_filters(wilaya=normalize_wilaya('Tizi  Ouzou'), min_price='100'))
+        b = product_facets_cache_key(facet_filters(wilaya=normalize_wilaya(' tizi ouzou'), min_price='100.00'))
+        assert a == b
+
+    def test_normalize_wilaya(self):
+        """Test spacing and case are folded, blank values dropped."""
+        assert normalize_wilaya('  Tizi   Ouzou ') == 'tizi ouzou'
+        assert normalize_wilaya('   ') is None
+        assert normalize_wilaya(None) is None
+
+    def test_unset_filters_are_ignored(self):
+        """Test None, '' and fuzzy=False do not change the key."""
+        assert product_facets_cache_key(facet_filters()) == product_facets_cache_key(
+            facet_filters(sale_type='', fuzzy=False)
+        )
+
+    def test_anti_gaspi_false_is_a_filter(self):
+        """Test is_anti_gaspi=False differs from no anti-gaspi filter."""
+        assert product_facets_cache_key(facet_filters(is_anti_gaspi=False)) != \
+            product_facets_cache_key(facet_filters())
+
+    def test_price_bucket_labels(self):
+        """Test bucket labels cover the open-ended last bucket."""
+        labels = [price_bucket_label(low, high) for low, high in PRICE_BUCKETS]
+        assert labels[0] == '0-100'
+        assert labels[-1].endswith('+')
+
+
+@pytest.mark.django_db
+class TestProductFacets:
+    """Test facet counts against the database."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Create five products of one producer in a wilaya of their own."""
+        cache.clear()
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO users (email, password, user_type, first_name, last_name)
+                VALUES ('facets.producer@example.com', '!', 'producer', 'Facets', 'Producer')
+                RETURNING id
+            """)
+            user_id = cursor.fetchone()[0]
+            cursor.execute("""
+                INSERT INTO producers (user_id, shop_name, city, wilaya)
+                VALUES (%s, 'Facets Farm', 'Oued Facettes', 'Oued Facettes')
+                RETURNING id
+            """, [user_id])
+            producer_id = cursor.fetchone()[0]
+            cursor.execute("""
+                INSERT INTO products (producer_id, name, sale_type, price, stock, product_type, is_anti_gaspi)
+                VALUES (%s, 'Tomates', 'weight', 120, 5, 'fresh', FALSE),
+                       (%s, 'Courgettes', 'weight', 150, 5, 'fresh', FALSE),
+                       (%s, 'Salade', 'unit', 80, 5, 'fresh', TRUE),
+                       (%s, 'Huile d''olive', 'unit', 1500, 5, 'processed', TRUE),
+                       (%s, 'Figues sèches', 'weight', 1200, 5, 'processed', FALSE)
+            """, [producer_id] * 5)
+        yield
+        cache.clear()
+
+    def test_grouping_sets_are_decoded_per_facet(self):
+        """Test each GROUPING SETS row lands in its own facet."""
+        facets = get_product_facets(wilaya='Oued Facettes')
+
+        assert facets['total'] == 5
+        assert facets['product_type'] == [
+            {'value': 'fresh', 'count': 3}, {'value': 'processed', 'count': 2},
+        ]
+        assert facets['sale_type'] == [
+            {'value': 'weight', 'count': 3}, {'value': 'unit', 'count': 2},
+        ]
+        assert facets['is_anti_gaspi'] == [
+            {'value': False, 'count': 3}, {'value': True, 'count': 2},
+        ]
+        assert facets['wilaya'] == [{'value': 'Oued Facettes', 'count': 5}]
+        assert facets['price_bucket'] == [
+            {'value': '100-500', 'count': 2}, {'value': '1000-5000', 'count': 2},
+            {'value': '0-100', 'count': 1},
+        ]
+
+    def test_counts_match_the_filtered_list(self):
+        """Test a wilaya spelled with odd spacing counts the rows it lists."""
+        products, _ = filter_products(wilaya=' oued   FACETTES ')
+        facets = get_product_facets(wilaya=' oued   FACETTES ')
+
+        assert facets['total'] == len(products) == 5
+        assert get_product_facets(wilaya='Oued Facettes') == facets
@@ -1,7 +1,10 @@
 import pytest
 from datetime import date, timedelta
 from decimal import Decimal
+from django.db import connection
 from db import users_queries, products_queries
+import products.queries
+from products.queries import reshuffle_product_random_keys
 
 
 # ============================================
@@ -381,6 +384,21 @@ class TestProductQueries:
         assert 'producer_id' in product
         assert 'producer_name' in product
         assert product['producer_name'] == 'Product Test Farm'
+    
+    def test_reshuffle_rewrites_a_bounded_batch(self, producer_products, monkeypatch):
+        """Test a reshuffle run only rewrites batch_size rows."""
+        def random_keys():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT id, random_key FROM products")
+                return dict(cursor.fetchall())
+        
+        # Start the batch at the lowest keys
+        monkeypatch.setattr(products.queries.random, 'random', lambda: 0.0)
+        before = random_keys()
+        
+        assert reshuffle_product_random_keys(batch_size=3) == 3
+        after = random_keys()
+        assert sum(after[product_id] != key for product_id, key in before.items()) == 3
 
 
 # ============================================
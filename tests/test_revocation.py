@@ -0,0 +1,151 @@
+import time
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+
+from users import queries, revocation
+from users.revocation import (
+    BloomFilter, get_revocation_stats, is_token_revoked, revoke_token, revoke_user_tokens,
+)
+
+
+@pytest.fixture
+def revocation_user(monkeypatch):
+    """Create a user, poll the revocation version on every check."""
+    cache.clear()
+    revocation.reset_revocation_filter()
+    monkeypatch.setattr(revocation, 'REVOCATION_POLL_INTERVAL', 0)
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO users (email, password, user_type, first_name, last_name)
+            VALUES ('revoked.client@example.com', '!', 'client', 'Revoked', 'Client')
+            RETURNING id
+        """)
+        user_id = cursor.fetchone()[0]
+
+    yield user_id
+
+    cache.clear()
+    revocation.reset_revocation_filter()
+
+
+def token(user_id, jti, iat=None):
+    now = int(time.time())
+    return {'user_id': user_id, 'jti': jti, 'iat': iat or now, 'exp': now + 3600}
+
+
+# ============================================
+# BLOOM FILTER TESTS
+# ============================================
+
+class TestBloomFilter:
+    """Test the in-memory filter of revoked jtis."""
+
+    def test_added_keys_are_found(self):
+        """Test there are no false negatives."""
+        bloom = BloomFilter(size=1 << 16, hashes=7)
+        keys = [f'jti-{i}' for i in range(2000)]
+        for key in keys:
+            bloom.add(key)
+
+        assert all(key in bloom for key in keys)
+
+    def test_false_positive_rate(self):
+        """Test unknown keys rarely match a loaded filter."""
+        bloom = BloomFilter(size=1 << 16, hashes=7)
+        for i in range(2000):
+            bloom.add(f'jti-{i}')
+
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        assert false_positives < 100
+
+
+# ============================================
+# TOKEN REVOCATION TESTS
+# ============================================
+
+@pytest.mark.django_db
+class TestTokenRevocation:
+    """Test revocations through the database and the per-process mirror."""
+
+    def test_logout_revokes_only_that_token(self, revocation_user):
+        """Test a revoked jti is rejected and other tokens are not."""
+        revoked = token(revocation_user, 'logged-out')
+        revoke_token(revoked['jti'], revocation_user, revoked['exp'])
+
+        assert is_token_revoked(revoked)
+        assert not is_token_revoked(token(revocation_user, 'other-session'))
+
+    def test_not_revoked_path_runs_no_query(self, revocation_user, monkeypatch,
+                                            django_assert_num_queries):
+        """Test a current filter answers without the database between polls."""
+        revoke_token('logged-out', revocation_user, int(time.time()) + 3600)
+        is_token_revoked(token(revocation_user, 'warm-up'))
+        monkeypatch.setattr(revocation, 'REVOCATION_POLL_INTERVAL', float('inf'))
+
+        with django_assert_num_queries(0):
+            assert not is_token_revoked(token(revocation_user, 'fresh'))
+
+    def test_new_revocations_are_loaded_incrementally(self, revocation_user):
+        """Test a bumped version loads the new rows without a rebuild."""
+        is_token_revoked(token(revocation_user, 'warm-up'))
+        revoke_token('later', revocation_user, int(time.time()) + 3600)
+
+        assert is_token_revoked(token(revocation_user, 'later'))
+        stats = get_revocation_stats()
+        assert stats['rebuilds'] == 1
+        assert stats['refreshes'] == 1
+
+    def test_revocation_by_another_process_is_seen(self, revocation_user):
+        """Test a row written without this process's help is polled from the table."""
+        is_token_revoked(token(revocation_user, 'warm-up'))
+        cache.clear()
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO revoked_tokens (jti, user_id, expires_at)
+                VALUES ('other-worker', %s, now() + interval '1 hour')
+            """, [revocation_user])
+
+        assert is_token_revoked(token(revocation_user, 'other-worker'))
+
+    def test_unchanged_watermark_loads_nothing(self, revocation_user, django_assert_num_queries):
+        """Test a poll with no new rows runs only the watermark query."""
+        revoke_token('logged-out', revocation_user, int(time.time()) + 3600)
+        is_token_revoked(token(revocation_user, 'warm-up'))
+        is_token_revoked(token(revocation_user, 'load'))
+
+        with django_assert_num_queries(1):
+            assert not is_token_revoked(token(revocation_user, 'fresh'))
+
+    def test_filter_false_positive_is_confirmed(self, revocation_user):
+        """Test a filter hit with no row is not a revocation."""
+        is_token_revoked(token(revocation_user, 'warm-up'))
+        revocation._state['bloom'].add('not-revoked')
+
+        assert not is_token_revoked(token(revocation_user, 'not-revoked'))
+        assert get_revocation_stats()['false_positives'] == 1
+
+    def test_user_revocation_keeps_newer_tokens(self, revocation_user):
+        """Test only tokens issued before the revocation are rejected."""
+        revoke_user_tokens(revocation_user)
+
+        assert is_token_revoked(token(revocation_user, 'old', iat=int(time.time()) - 60))
+        assert not is_token_revoked(token(revocation_user, 'new', iat=int(time.time()) + 1))
+
+    def test_password_change_revokes_previous_tokens(self, revocation_user):
+        """Test update_user_password feeds the revocation table."""
+        old = token(revocation_user, 'before-change', iat=int(time.time()) - 60)
+
+        queries.update_user_password(revocation_user, 'new-password-123')
+
+        assert is_token_revoked(old)
+
+    def test_deactivation_revokes_previous_tokens(self, revocation_user):
+        """Test deactivate_user feeds the revocation table."""
+        old = token(revocation_user, 'before-deactivation', iat=int(time.time()) - 60)
+
+        queries.deactivate_user(revocation_user)
+
+        assert is_token_revoked(old)
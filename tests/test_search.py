@@ -0,0 +1,87 @@
+import pytest
+from django.db import connection
+
+from db.search import (
+    SEARCH_CONFIGS, build_prefix_query, headline_sql, similarity_rank_sql,
+    substring_match_sql, tsquery_sql,
+)
+
+
+def highlight(text, term):
+    """Run headline_sql on a literal text."""
+    query_sql, params = tsquery_sql(term)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {headline_sql('%s::text', query_sql)}", [text] + params)
+        return cursor.fetchone()[0]
+
+
+# ============================================
+# FULL-TEXT SEARCH HELPER TESTS
+# ============================================
+
+class TestBuildPrefixQuery:
+    """Test tsquery text building (no database access)."""
+
+    def test_every_word_becomes_a_prefix(self):
+        """Test words are AND-ed prefix terms."""
+        assert build_prefix_query('tomates cerises') == 'tomates:* & cerises:*'
+
+    def test_operators_are_stripped(self):
+        """Test tsquery operators in user input cannot break the query."""
+        assert build_prefix_query("miel & (bio) | !'x':*") == 'miel:* & bio:* & x:*'
+
+    def test_accents_and_arabic_are_kept(self):
+        """Test unicode words are kept as-is (unaccent runs in SQL)."""
+        assert build_prefix_query('légumes طماطم') == 'légumes:* & طماطم:*'
+
+    def test_empty_terms(self):
+        """Test terms without a searchable word."""
+        assert build_prefix_query('') is None
+        assert build_prefix_query(None) is None
+        assert build_prefix_query(' -!? ') is None
+
+    def test_tsquery_sql_params(self):
+        """Test one param per text search configuration."""
+        sql, params = tsquery_sql('miel')
+        assert sql.count('%s') == len(SEARCH_CONFIGS)
+        assert params == ['miel:*'] * len(SEARCH_CONFIGS)
+        assert tsquery_sql('!!') == (None, [])
+
+
+class TestTrigramMatching:
+    """Test substring / fuzzy SQL fragments (no database access)."""
+
+    def test_plain_substring_match(self):
+        """Test the default mode keeps ILIKE '%term%'."""
+        sql, params = substring_match_sql('p.wilaya', 'Alger')
+        assert sql == 'p.wilaya ILIKE %s'
+        assert params == ['%Alger%']
+
+    def test_fuzzy_substring_match(self):
+        """Test the fuzzy mode adds the word-similarity operator."""
+        sql, params = substring_match_sql('p.wilaya', 'Algre', fuzzy=True)
+        assert '<%% p.wilaya' in sql
+        assert params == ['%Algre%', 'Algre']
+
+    def test_similarity_rank(self):
+        """Test ranking over one and several columns."""
+        assert similarity_rank_sql([('p.city', 'Oran')]) == ('word_similarity(%s, p.city)::float8', ['Oran'])
+        sql, params = similarity_rank_sql([('p.city', 'Oran'), ('p.wilaya', 'Oran')])
+        assert sql.startswith('GREATEST(')
+        assert params == ['Oran', 'Oran']
+
+
+@pytest.mark.django_db
+class TestHeadlines:
+    """Test search snippets are safe to render as HTML."""
+
+    def test_user_markup_is_escaped(self):
+        """Test only the <mark> tags added around matches are markup."""
+        result = highlight('Miel <svg/onload=alert(1)> "pur" & l\'olivier', 'miel')
+
+        assert result == ('<mark>Miel</mark> &lt;svg/onload=alert(1)&gt; '
+                          '&quot;pur&quot; &amp; l&#x27;olivier')
+
+    def test_terms_never_match_inside_entities(self):
+        """Test the snippet is highlighted before it is escaped."""
+        assert highlight('Tomates < 5 kg & ltd', 'lt') == 'Tomates &lt; 5 kg &amp; <mark>ltd</mark>'
@@ -0,0 +1,57 @@
+import pytest
+from products.seasonal_utils import SeasonIndex, season_months_mask
+
+
+# ============================================
+# SEASON INDEX TESTS
+# ============================================
+
+class TestSeasonIndex:
+    """Test the compiled season index (no database access)."""
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        """Build an index from a few seasonal rows."""
+        self.index = SeasonIndex([
+            ('Tomato', 5, 9),
+            ('Oignon', 11, 4),
+            ('Fraise', 3, 6),
+            ('طماطم', 5, 9),
+        ])
+
+    def test_season_months_mask_normal_range(self):
+        """Test mask for a season inside one year."""
+        mask = season_months_mask(5, 9)
+        assert [m for m in range(1, 13) if mask & (1 << (m - 1))] == [5, 6, 7, 8, 9]
+
+    def test_season_months_mask_cross_year(self):
+        """Test mask for a season spanning the year boundary."""
+        mask = season_months_mask(11, 2)
+        assert [m for m in range(1, 13) if mask & (1 << (m - 1))] == [1, 2, 11, 12]
+
+    def test_seasonal_name_contained_in_product_name(self):
+        """Test 'tomato' matches 'Cherry Tomatoes'."""
+        assert self.index.in_season(['Cherry Tomatoes'], 7) == [True]
+        assert self.index.in_season(['Cherry Tomatoes'], 1) == [False]
+
+    def test_product_name_contained_in_seasonal_name(self):
+        """Test a short product name matches a longer seasonal name."""
+        assert self.index.in_season(['Frais'], 4) == [True]
+
+    def test_accents_and_case_are_normalized(self):
+        """Test accented, upper-case names still match."""
+        assert self.index.in_season(['FRAÏSE'], 4) == [True]
+
+    def test_cross_year_season(self):
+        """Test a November-April season in January and in July."""
+        assert self.index.in_season(['Oignon rouge', 'Oignon rouge'], 1) == [True, True]
+        assert self.index.in_season(['Oignon rouge'], 7) == [False]
+
+    def test_arabic_names(self):
+        """Test Arabic seasonal names."""
+        assert self.index.in_season(['طماطم طازجة'], 6) == [True]
+
+    def test_batch_keeps_input_order(self):
+        """Test batch results are aligned with input names."""
+        result = self.index.in_season(['Carotte', 'Tomatoes cerise', '', None, 'Fraise'], 5)
+        assert result == [False, True, False, False, True]
@@ -0,0 +1,197 @@
+import pytest
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users import principal_cache, queries
+from users.apps import check_serving_cache, check_stateless_tokens_cache
+from users.authentication import CustomJWTAuthentication
+from users.views import get_tokens_for_user
+
+
+@pytest.fixture
+def producer_user(warm_revocation_filter):
+    """Create an active producer, return its structured user data."""
+    cache.clear()
+    principal_cache.clear_principal_cache()
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO users (email, password, user_type, first_name, last_name)
+            VALUES ('stateless.producer@example.com', '!', 'producer', 'Stateless', 'Producer')
+            RETURNING id
+        """)
+        user_id = cursor.fetchone()[0]
+        cursor.execute(
+            "INSERT INTO producers (user_id, shop_name) VALUES (%s, 'Stateless Farm')",
+            [user_id]
+        )
+
+    yield queries.structure_user_data(queries.get_user_by_id(user_id))
+
+    cache.clear()
+    principal_cache.clear_principal_cache()
+
+
+def access_token(user_data):
+    return AccessToken(get_tokens_for_user(user_data)['access'])
+
+
+# ============================================
+# STATELESS AUTH TESTS
+# ============================================
+
+@pytest.mark.django_db
+class TestStatelessAuthentication:
+    """Test principals built from access token claims."""
+
+    def test_token_carries_profile_claims(self, producer_user):
+        """Test profile ids, is_active and profile_version are in the access token."""
+        token = access_token(producer_user)
+
+        assert token['producer_id'] == producer_user['producer_profile']['id']
+        assert token['client_id'] is None
+        assert token['is_active'] is True
+        assert token['profile_version'] == principal_cache.get_profile_version(producer_user['id'])
+
+    def test_authenticates_without_query(self, settings, producer_user, django_assert_num_queries):
+        """Test a current token builds the principal with no database query."""
+        settings.AUTH_STATELESS_TOKENS = True
+        token = access_token(producer_user)
+        principal_cache.clear_principal_cache()
+
+        with django_assert_num_queries(0):
+            user = CustomJWTAuthentication().get_user(token)
+
+        assert user.id == producer_user['id']
+        assert user.user_type == 'producer'
+        assert user.producer_profile.id == producer_user['producer_profile']['id']
+        assert user.client_profile is None
+
+    def test_profile_write_falls_back_to_the_database(self, settings, producer_user,
+                                                      django_assert_num_queries):
+        """Test a token older than the profile is not trusted."""
+        settings.AUTH_STATELESS_TOKENS = True
+        token = access_token(producer_user)
+
+        queries.update_producer_profile(producer_user['id'], shop_name='Renamed Farm')
+
+        with django_assert_num_queries(1):
+            user = CustomJWTAuthentication().get_user(token)
+
+        assert user.producer_profile.shop_name == 'Renamed Farm'
+
+    def test_deactivation_is_seen(self, settings, producer_user):
+        """Test a deactivated user's token stops authenticating."""
+        settings.AUTH_STATELESS_TOKENS = True
+        token = access_token(producer_user)
+
+        queries.deactivate_user(producer_user['id'])
+
+        assert CustomJWTAuthentication().get_user(token) is None
+
+    def test_disabled_mode_loads_the_user(self, settings, producer_user, django_assert_num_queries):
+        """Test claims are ignored unless AUTH_STATELESS_TOKENS is on."""
+        settings.AUTH_STATELESS_TOKENS = False
+        token = access_token(producer_user)
+        principal_cache.clear_principal_cache()
+
+        with django_assert_num_queries(1):
+            user = CustomJWTAuthentication().get_user(token)
+
+        assert user.producer_profile.shop_name == 'Stateless Farm'
+
+    def test_deactivate_command(self, settings, producer_user):
+        """Test the deactivate_user command revokes the user's tokens."""
+        settings.AUTH_STATELESS_TOKENS = True
+        token = access_token(producer_user)
+
+        call_command('deactivate_user', producer_user['email'])
+
+        assert CustomJWTAuthentication().get_user(token) is None
+
+
+# ============================================
+# STARTUP CHECK TESTS
+# ============================================
+
+class TestStatelessTokensCache:
+    """Test stateless auth is refused without a shared cache."""
+
+    def test_refused_with_a_local_cache(self, settings):
+        """Test a per-process cache stops the startup."""
+        settings.AUTH_STATELESS_TOKENS = True
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+        with pytest.raises(ImproperlyConfigured):
+            check_stateless_tokens_cache()
+
+    def test_refused_with_a_database_cache(self, settings):
+        """Test a cache costing a query per request stops the startup."""
+        settings.AUTH_STATELESS_TOKENS = True
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        }}
+
+        with pytest.raises(ImproperlyConfigured):
+            check_stateless_tokens_cache()
+
+    def test_allowed_with_a_shared_cache(self, settings):
+        """Test Redis is accepted."""
+        settings.AUTH_STATELESS_TOKENS = True
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://localhost:6379/0',
+        }}
+
+        check_stateless_tokens_cache()
+
+    def test_local_cache_allowed_without_stateless_tokens(self, settings):
+        """Test the default (stateful) mode keeps working with LocMem."""
+        settings.AUTH_STATELESS_TOKENS = False
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+        check_stateless_tokens_cache()
+
+
+class TestServingCache:
+    """Test serving is refused without a shared in-memory cache."""
+
+    def test_refused_with_a_database_cache(self, settings):
+        """Test DatabaseCache stops the startup, even with DEBUG."""
+        settings.DEBUG = True
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        }}
+
+        with pytest.raises(ImproperlyConfigured):
+            check_serving_cache()
+
+    def test_local_cache_refused_without_debug(self, settings):
+        """Test LocMem stops a production startup."""
+        settings.DEBUG = False
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+        with pytest.raises(ImproperlyConfigured):
+            check_serving_cache()
+
+    def test_local_cache_allowed_with_debug(self, settings):
+        """Test runserver keeps working without Redis."""
+        settings.DEBUG = True
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+        check_serving_cache()
+
+    def test_allowed_with_redis(self, settings):
+        """Test Redis is accepted."""
+        settings.DEBUG = False
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://localhost:6379/0',
+        }}
+
+        check_serving_cache()
@@ -0,0 +1,115 @@
+import pytest
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from products.queries_stock import InsufficientStock, release_stock, reserve_stock
+
+
+def get_stocks(product_ids):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT id, stock FROM products WHERE id = ANY(%s)", [list(product_ids)])
+        return dict(cursor.fetchall())
+
+
+# ============================================
+# CHECKOUT STOCK RESERVATION TESTS
+# ============================================
+
+@pytest.mark.django_db
+class TestReserveStock:
+    """Test the set-based checkout stock reservation (stock = 50 per product)."""
+
+    def test_decrements_every_line_in_one_update(self, producer_products):
+        """Test all lines are locked, then decremented with a single UPDATE."""
+        first, second = producer_products[:2]
+
+        with CaptureQueriesContext(connection) as ctx:
+            remaining = reserve_stock([(first, Decimal('2')), (second, Decimal('50'))])
+
+        # Only savepoint statements besides the row locks and the UPDATE
+        statements = [q['sql'] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]
+        assert len(statements) == 2
+        assert 'FOR UPDATE' in statements[0]
+
+        assert remaining == {first: Decimal('48.00'), second: Decimal('0.00')}
+        assert get_stocks([first, second]) == remaining
+
+    def test_duplicate_lines_are_summed(self, producer_products):
+        """Test two lines on the same product reserve their total."""
+        product_id = producer_products[0]
+
+        reserve_stock([(product_id, Decimal('10')), (product_id, Decimal('5'))])
+
+        assert get_stocks([product_id])[product_id] == Decimal('35.00')
+
+    def test_reports_exactly_the_failed_lines(self, producer_products):
+        """Test only the lines above their stock are reported."""
+        first, second, third = producer_products[:3]
+
+        with pytest.raises(InsufficientStock) as excinfo:
+            reserve_stock([
+                (first, Decimal('1')),
+                (second, Decimal('51')),
+                (third, Decimal('60')),
+            ])
+
+        assert excinfo.value.failures == [
+            {'product_id': second, 'requested': Decimal('51'), 'available': Decimal('50.00')},
+            {'product_id': third, 'requested': Decimal('60'), 'available': Decimal('50.00')},
+        ]
+
+    def test_failure_decrements_nothing(self, producer_products):
+        """Test lines that fit are rolled back when another line fails."""
+        first, second = producer_products[:2]
+
+        with pytest.raises(InsufficientStock):
+            reserve_stock([(first, Decimal('1')), (second, Decimal('99'))])
+
+        assert get_stocks([first, second]) == {first: Decimal('50.00'), second: Decimal('50.00')}
+
+    def test_unknown_product_is_a_failed_line(self, producer_products):
+        """Test a deleted product is reported with no available stock."""
+        with pytest.raises(InsufficientStock) as excinfo:
+            reserve_stock([(producer_products[0], Decimal('1')), (999999999, Decimal('1'))])
+
+        assert excinfo.value.failures == [
+            {'product_id': 999999999, 'requested': Decimal('1'), 'available': None},
+        ]
+
+    def test_empty_reservation_runs_no_query(self, django_assert_num_queries):
+        """Test an empty cart does not touch the database."""
+        with django_assert_num_queries(0):
+            assert reserve_stock([]) == {}
+
+
+@pytest.mark.django_db
+class TestReleaseStock:
+    """Test the set-based restock used when an order is cancelled."""
+
+    def test_restocks_every_line_in_one_query(self, producer_products, django_assert_num_queries):
+        """Test all lines are restocked with a single UPDATE."""
+        first, second = producer_products[:2]
+
+        with django_assert_num_queries(1):
+            restocked = release_stock([
+                (first, Decimal('2')), (second, Decimal('1.5')), (first, Decimal('1')),
+            ])
+
+        assert sorted(restocked) == sorted([first, second])
+        assert get_stocks([first, second]) == {first: Decimal('53.00'), second: Decimal('51.50')}
+
+    def test_reserve_then_release_restores_the_stock(self, producer_products):
+        """Test a cancelled checkout gives back exactly what it took."""
+        lines = [(product_id, Decimal('7')) for product_id in producer_products]
+
+        reserve_stock(lines)
+        release_stock(lines)
+
+        assert set(get_stocks(producer_products).values()) == {Decimal('50.00')}
+
+    def test_deleted_products_are_skipped(self, producer_products):
+        """Test lines of deleted products do not fail the cancellation."""
+        restocked = release_stock([(producer_products[0], Decimal('1')), (999999999, Decimal('1'))])
+
+        assert restocked == [producer_products[0]]
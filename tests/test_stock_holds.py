@@ -0,0 +1,101 @@
+import pytest
+from decimal import Decimal
+from django.db import connection
+
+from cart.models import Cart, CartItem
+from products.queries_stock import (
+    InsufficientStock, expire_stock_holds, get_available_stock, hold_stock, reserve_stock,
+)
+
+
+def add_line(user_id, product_id, quantity):
+    """Create a cart with one line (no hold yet)."""
+    cart = Cart.objects.create(user_id=user_id)
+    return CartItem.objects.create(
+        cart=cart, product_id=product_id,
+        quantity=Decimal(quantity), price_snapshot=Decimal('100.00')
+    )
+
+
+def expire_all_holds():
+    with connection.cursor() as cursor:
+        cursor.execute("UPDATE stock_holds SET expires_at = now() - interval '1 second'")
+
+
+# ============================================
+# CART STOCK HOLDS TESTS
+# ============================================
+
+@pytest.mark.django_db
+class TestStockHolds:
+    """Test time-limited holds of cart lines (stock = 50 per product)."""
+
+    def test_holds_reduce_the_stock_of_other_carts(self, producer_products):
+        """Test a hold is unavailable to other carts but not to its own."""
+        product_id = producer_products[0]
+        line = add_line(900050, product_id, '30')
+
+        assert hold_stock(line.cart_id, line.id, product_id, Decimal('30')) == (True, Decimal('50.00'))
+
+        assert get_available_stock([product_id])[product_id] == Decimal('20.00')
+        assert get_available_stock([product_id], cart_id=line.cart_id)[product_id] == Decimal('50.00')
+
+    def test_second_cart_is_refused_when_stock_is_held(self, producer_products):
+        """Test the rush case: the refusal happens at add-to-cart."""
+        product_id = producer_products[0]
+        first = add_line(900051, product_id, '40')
+        second = add_line(900052, product_id, '20')
+
+        hold_stock(first.cart_id, first.id, product_id, Decimal('40'))
+        held, available = hold_stock(second.cart_id, second.id, product_id, Decimal('20'))
+
+        assert not held
+        assert available == Decimal('10.00')
+
+    def test_update_replaces_the_hold(self, producer_products):
+        """Test update_quantity moves the line's hold to the new quantity."""
+        product_id = producer_products[0]
+        line = add_line(900053, product_id, '10')
+        hold_stock(line.cart_id, line.id, product_id, Decimal('10'))
+
+        line.update_quantity(Decimal('45'))
+
+        assert get_available_stock([product_id])[product_id] == Decimal('5.00')
+        with pytest.raises(ValueError):
+            line.update_quantity(Decimal('51'))
+
+    def test_removing_the_line_releases_the_hold(self, producer_products):
+        """Test holds are dropped with their cart line."""
+        product_id = producer_products[0]
+        line = add_line(900054, product_id, '50')
+        hold_stock(line.cart_id, line.id, product_id, Decimal('50'))
+
+        line.delete()
+
+        assert get_available_stock([product_id])[product_id] == Decimal('50.00')
+
+    def test_expired_holds_are_ignored_and_swept(self, producer_products):
+        """Test expired holds free the stock at once, then get deleted."""
+        product_id = producer_products[0]
+        for user_id in (900055, 900056, 900057):
+            line = add_line(user_id, product_id, '10')
+            hold_stock(line.cart_id, line.id, product_id, Decimal('10'))
+
+        expire_all_holds()
+
+        assert get_available_stock([product_id])[product_id] == Decimal('50.00')
+        assert expire_stock_holds(batch_size=2) == 3
+
+    def test_checkout_is_served_by_its_own_holds(self, producer_products):
+        """Test held lines pass, while other carts cannot take held units."""
+        product_id = producer_products[0]
+        holder = add_line(900058, product_id, '45')
+        hold_stock(holder.cart_id, holder.id, product_id, Decimal('45'))
+
+        with pytest.raises(InsufficientStock) as excinfo:
+            reserve_stock([(product_id, Decimal('10'))], cart_id=None)
+        assert excinfo.value.failures[0]['available'] == Decimal('5.00')
+
+        assert reserve_stock([(product_id, Decimal('45'))], cart_id=holder.cart_id) == {
+            product_id: Decimal('5.00')
+        }
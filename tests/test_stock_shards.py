@@ -0,0 +1,395 @@
+import threading
+import time
+
+import pytest
+from decimal import Decimal
+from django.db import connection, transaction
+
+from cart.models import Cart, CartItem
+from products.queries import get_product_detail
+from products.queries_stock import (
+    InsufficientStock, disable_stock_sharding, enable_stock_sharding, expire_stock_holds,
+    get_available_stock, hold_stock, release_stock, reserve_stock, set_sharded_stock,
+    sync_sharded_stock,
+)
+
+
+def get_shards(product_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT shard, stock FROM product_stock_shards WHERE product_id = %s ORDER BY shard",
+            [product_id]
+        )
+        return dict(cursor.fetchall())
+
+
+def get_held(product_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT shard, held FROM product_stock_shards WHERE product_id = %s ORDER BY shard",
+            [product_id]
+        )
+        return dict(cursor.fetchall())
+
+
+def get_stock_column(product_id):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT stock FROM products WHERE id = %s", [product_id])
+        return cursor.fetchone()[0]
+
+
+@pytest.fixture
+def committed_product(django_db_blocker):
+    """
+    Commit a product of 10 units, visible to other connections.
+    Deleted (with its carts) after the test.
+    """
+    with django_db_blocker.unblock():
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO users (email, password, user_type, first_name, last_name)
+                VALUES ('shards.race@example.com', '!', 'producer', 'Shards', 'Race')
+                RETURNING id
+            """)
+            user_id = cursor.fetchone()[0]
+            cursor.execute(
+                "INSERT INTO producers (user_id, shop_name) VALUES (%s, 'Race Farm') RETURNING id",
+                [user_id]
+            )
+            producer_id = cursor.fetchone()[0]
+            cursor.execute("""
+                INSERT INTO products (producer_id, name, sale_type, price, stock, product_type)
+                VALUES (%s, 'Rushed product', 'unit', 100, 10, 'fresh')
+                RETURNING id
+            """, [producer_id])
+            product_id = cursor.fetchone()[0]
+
+    yield product_id
+
+    with django_db_blocker.unblock():
+        Cart.objects.filter(items__product_id=product_id).delete()
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM users WHERE id = %s", [user_id])
+
+
+@pytest.fixture
+def committed_sharded_product(committed_product, django_db_blocker):
+    """The committed product, on 2 shards."""
+    with django_db_blocker.unblock():
+        enable_stock_sharding(committed_product, 2)
+    return committed_product
+
+
+def committed_line(user_id, product_id, quantity):
+    cart = Cart.objects.create(user_id=user_id)
+    return CartItem.objects.create(
+        cart=cart, product_id=product_id,
+        quantity=Decimal(quantity), price_snapshot=Decimal('100.00')
+    )
+
+
+def race(django_db_blocker, first, second):
+    """
+    Run second() while the transaction of first() is still open.
+    Returns second()'s result.
+    """
+    reserved = threading.Event()
+    result = {}
+
+    def run_first():
+        try:
+            with transaction.atomic():
+                first()
+                reserved.set()
+                # Let second() reach the stock while this transaction is open
+                time.sleep(0.5)
+        finally:
+            reserved.set()
+            connection.close()
+
+    def run_second():
+        reserved.wait()
+        try:
+            result['value'] = second()
+        finally:
+            connection.close()
+
+    with django_db_blocker.unblock():
+        threads = [threading.Thread(target=run_first), threading.Thread(target=run_second)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    return result['value']
+
+
+def checkout_of_3(product_id):
+    return lambda: reserve_stock([(product_id, Decimal('3'))])
+
+
+# ============================================
+# SHARDED STOCK TESTS
+# ============================================
+
+@pytest.mark.django_db
+class TestStockSharding:
+    """Test sharded stock counters (stock = 50 per product)."""
+
+    def test_enable_splits_the_stock(self, producer_products):
+        """Test the stock is split evenly, remainder on shard 0."""
+        product_id = producer_products[0]
+
+        assert enable_stock_sharding(product_id, 3)
+
+        assert get_shards(product_id) == {
+            0: Decimal('16.68'), 1: Decimal('16.66'), 2: Decimal('16.66'),
+        }
+        assert not enable_stock_sharding(product_id, 3)
+
+    def test_visible_stock_is_the_sum_of_shards(self, producer_products):
+        """Test detail and available stock read the shard sum."""
+        product_id = producer_products[0]
+        enable_stock_sharding(product_id, 4)
+
+        reserve_stock([(product_id, Decimal('5'))])
+
+        assert get_product_detail(product_id)['stock'] == Decimal('45.00')
+        assert get_available_stock([product_id]) == {product_id: Decimal('45.00')}
+        assert sum(get_shards(product_id).values()) == Decimal('45.00')
+
+    def test_reservation_takes_one_shard(self, producer_products):
+        """Test a quantity that fits a shard decrements only that shard."""
+        product_id = producer_products[0]
+        enable_stock_sharding(product_id, 5)
+
+        remaining = reserve_stock([(product_id, Decimal('3'))])
+
+        assert remaining == {product_id: Decimal('47.00')}
+        assert sorted(get_shards(product_id).values()) == [
+            Decimal('7.00'), Decimal('10.00'), Decimal('10.00'), Decimal('10.00'), Decimal('10.00'),
+        ]
+
+    def test_reservation_spanning_shards(self, producer_products):
+        """Test a quantity larger than any shard drains several shards."""
+        product_id = producer_products[0]
+        enable_stock_sharding(product_id, 5)
+
+        remaining = reserve_stock([(product_id, Decimal('25'))])
+
+        assert remaining == {product_id: Decimal('25.00')}
+        assert get_shards(product_id) == {
+            0: Decimal('0.00'), 1: Decimal('0.00'), 2: Decimal('5.00'),
+            3: Decimal('10.00'), 4: Decimal('10.00'),
+        }
+
+    def test_cannot_overdraw(self, producer_products):
+        """Test a sharded line above the total fails and rolls back every line."""
+        sharded, plain = producer_products[:2]
+        enable_stock_sharding(sharded, 4)
+
+        with pytest.raises(InsufficientStock) as excinfo:
+            reserve_stock([(plain, Decimal('1')), (sharded, Decimal('51'))])
+
+        assert excinfo.value.failures == [
+            {'product_id': sharded, 'requested': Decimal('51'), 'available': Decimal('50.00')},
+        ]
+        assert sum(get_shards(sharded).values()) == Decimal('50.00')
+        assert get_stock_column(plain) == Decimal('50.00')
+
+    def test_release_adds_back_to_a_shard(self, producer_products):
+        """Test a cancelled sharded line restores the shard sum."""
+        product_id = producer_products[0]
+        enable_stock_sharding(product_id, 4)
+
+        reserve_stock([(product_id, Decimal('30'))])
+        restocked = release_stock([(product_id, Decimal('30'))])
+
+        assert restocked == [product_id]
+        assert sum(get_shards(product_id).values()) == Decimal('50.00')
+
+    def test_sync_and_disable_fold_the_shards(self, producer_products):
+        """Test the products.stock copy follows the shards."""
+        product_id = producer_products[0]
+        enable_stock_sharding(product_id, 4)
+        reserve_stock([(product_id, Decimal('8'))])
+
+        assert get_stock_column(product_id) == Decimal('50.00')
+        assert sync_sharded_stock() == 1
+        assert get_stock_column(product_id) == Decimal('42.00')
+
+        reserve_stock([(product_id, Decimal('2'))])
+        assert disable_stock_sharding(product_id)
+
+        assert get_shards(product_id) == {}
+        assert get_stock_column(product_id) == Decimal('40.00')
+        assert reserve_stock([(product_id, Decimal('1'))]) == {product_id: Decimal('39.00')}
+
+
+@pytest.mark.django_db
+class TestShardedHolds:
+    """Test holds counted on the shards (stock = 50 per product)."""
+
+    def test_hold_is_counted_on_one_shard(self, producer_products):
+        """Test a hold fitting a shard sits on it and is not sold to other carts."""
+        product_id = producer_products[0]
+        enable_stock_sharding(product_id, 2)
+        line = committed_line(900033, product_id, '10')
+
+        assert hold_stock(line.cart_id, line.id, product_id, Decimal('10')) == (True, Decimal('50.00'))
+
+        assert sorted(get_held(product_id).values()) == [Decimal('0.00'), Decimal('10.00')]
+        with pytest.raises(InsufficientStock) as excinfo:
+            reserve_stock([(product_id, Decimal('41'))])
+        assert excinfo.value.failures[0]['available'] == Decimal('40.00')
+        assert reserve_stock([(product_id, Decimal('40'))]) == {product_id: Decimal('10.00')}
+
+    def test_hold_larger_than_a_shard_moves_stock(self, producer_products):
+        """Test a hold above any shard's free units rebalances the shards."""
+        product_id = producer_products[0]
+        enable_stock_sharding(product_id, 2)
+        line = committed_line(900034, product_id, '30')
+
+        assert hold_stock(line.cart_id, line.id, product_id, Decimal('30'))[0]
+
+        assert get_held(product_id) == {0: Decimal('30.00'), 1: Decimal('0.00')}
+        assert get_shards(product_id) == {0: Decimal('40.00'), 1: Decimal('10.00')}
+
+    def test_checkout_is_served_by_its_own_holds(self, producer_products):
+        """Test a cart takes its held units and its holds leave the shards."""
+        product_id = producer_products[0]
+        enable_stock_sharding(product_id, 2)
+        line = committed_line(900035, product_id, '45')
+        hold_stock(line.cart_id, line.id, product_id, Decimal('45'))
+
+        assert reserve_stock([(product_id, Decimal('45'))], cart_id=line.cart_id) == {
+            product_id: Decimal('5.00')
+        }
+        assert get_held(product_id) == {0: Decimal('0.00'), 1: Decimal('0.00')}
+
+    def test_set_stock_keeps_holds_covered(self, producer_products):
+        """Test a new stock is spread after each shard's holds."""
+        product_id = producer_products[0]
+        enable_stock_sharding(product_id, 2)
+        line = committed_line(900036, product_id, '20')
+        hold_stock(line.cart_id, line.id, product_id, Decimal('20'))
+
+        set_sharded_stock(product_id, Decimal('30'))
+
+        stocks, helds = get_shards(product_id), get_held(product_id)
+        assert sorted(stocks[shard] - helds[shard] for shard in stocks) == [
+            Decimal('5.00'), Decimal('5.00'),
+        ]
+
+    def test_expired_holds_are_swept_from_the_shards(self, producer_products):
+        """Test the sweeper deletes expired sharded holds and their counts."""
+        product_id = producer_products[0]
+        enable_stock_sharding(product_id, 2)
+        line = committed_line(900037, product_id, '10')
+        hold_stock(line.cart_id, line.id, product_id, Decimal('10'))
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE stock_holds SET expires_at = now() - interval '1 second' WHERE product_id = %s",
+                [product_id]
+            )
+
+        assert expire_stock_holds() >= 1
+        assert get_held(product_id) == {0: Decimal('0.00'), 1: Decimal('0.00')}
+
+    def test_sharding_moves_existing_holds_to_shard_0(self, producer_products):
+        """Test holds taken before sharding stay counted."""
+        product_id = producer_products[0]
+        line = committed_line(900038, product_id, '20')
+        hold_stock(line.cart_id, line.id, product_id, Decimal('20'))
+
+        enable_stock_sharding(product_id, 2)
+
+        assert get_held(product_id) == {0: Decimal('20.00'), 1: Decimal('0.00')}
+        assert get_shards(product_id) == {0: Decimal('35.00'), 1: Decimal('15.00')}
+
+        assert disable_stock_sharding(product_id)
+        assert get_available_stock([product_id]) == {product_id: Decimal('30.00')}
+
+
+class TestShardedHoldsConcurrency:
+    """Test holds on sharded products against concurrent checkouts (committed data)."""
+
+    def test_checkouts_on_other_shards_cannot_take_held_units(self, committed_sharded_product,
+                                                              django_db_blocker):
+        """Test a second checkout waits and sees that only 1 unit is not held."""
+        product_id = committed_sharded_product
+        with django_db_blocker.unblock():
+            holder = committed_line(900030, product_id, '6')
+            assert hold_stock(holder.cart_id, holder.id, product_id, Decimal('6'))[0]
+
+        def second_checkout():
+            try:
+                reserve_stock([(product_id, Decimal('3'))])
+                return True
+            except InsufficientStock:
+                return False
+
+        assert race(django_db_blocker, checkout_of_3(product_id), second_checkout) is False
+        with django_db_blocker.unblock():
+            assert sum(get_shards(product_id).values()) == Decimal('7.00')
+
+    def test_held_product_checkouts_run_in_parallel(self, committed_sharded_product,
+                                                    django_db_blocker):
+        """Test two carts holding the product check out on their own shards at once."""
+        product_id = committed_sharded_product
+        with django_db_blocker.unblock():
+            first = committed_line(900039, product_id, '3')
+            second = committed_line(900040, product_id, '3')
+            assert hold_stock(first.cart_id, first.id, product_id, Decimal('3'))[0]
+            assert hold_stock(second.cart_id, second.id, product_id, Decimal('3'))[0]
+
+        def second_checkout():
+            started = time.monotonic()
+            reserve_stock([(product_id, Decimal('3'))], cart_id=second.cart_id)
+            return time.monotonic() - started
+
+        def first_checkout():
+            reserve_stock([(product_id, Decimal('3'))], cart_id=first.cart_id)
+
+        # first() stays open for 0.5s: waiting for its shard would take that long
+        assert race(django_db_blocker, first_checkout, second_checkout) < 0.25
+        with django_db_blocker.unblock():
+            assert get_shards(product_id) == {0: Decimal('2.00'), 1: Decimal('2.00')}
+            assert get_held(product_id) == {0: Decimal('0.00'), 1: Decimal('0.00')}
+
+    def test_hold_waits_for_an_open_checkout(self, committed_sharded_product, django_db_blocker):
+        """Test a hold is computed after the sharded checkout commits."""
+        product_id = committed_sharded_product
+        with django_db_blocker.unblock():
+            line = committed_line(900031, product_id, '8')
+
+        def hold():
+            return hold_stock(line.cart_id, line.id, product_id, Decimal('8'))
+
+        assert race(django_db_blocker, checkout_of_3(product_id), hold) == (False, Decimal('7.00'))
+
+
+class TestHoldsConcurrency:
+    """Test holds against concurrent checkouts of a plain product (committed data)."""
+
+    def test_checkout_sees_holds_committed_while_waiting(self, committed_product,
+                                                         django_db_blocker):
+        """Test a checkout waiting on the row lock does not sell units held meanwhile."""
+        product_id = committed_product
+        with django_db_blocker.unblock():
+            holder = committed_line(900032, product_id, '8')
+
+        def hold():
+            assert hold_stock(holder.cart_id, holder.id, product_id, Decimal('8'))[0]
+
+        def checkout():
+            try:
+                reserve_stock([(product_id, Decimal('5'))])
+                return True
+            except InsufficientStock:
+                return False
+
+        assert race(django_db_blocker, hold, checkout) is False
+        with django_db_blocker.unblock():
+            assert get_stock_column(product_id) == Decimal('10.00')
@@ -0,0 +1,90 @@
+import pytest
+from django.db import connection
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from products import queries
+from products.views import MySubscriptionViewSet
+from users.authentication import load_principal
+
+
+@pytest.fixture
+def subscriber():
+    """Create a client subscribed to a producer's basket, return (principal, subscription id)."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO users (email, password, user_type, first_name, last_name)
+            VALUES ('basket.producer@example.com', '!', 'producer', 'Basket', 'Producer')
+            RETURNING id
+        """)
+        producer_user_id = cursor.fetchone()[0]
+        cursor.execute(
+            "INSERT INTO producers (user_id, shop_name) VALUES (%s, 'Basket Farm') RETURNING id",
+            [producer_user_id]
+        )
+        producer_id = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO users (email, password, user_type, first_name, last_name)
+            VALUES ('basket.client@example.com', '!', 'client', 'Basket', 'Client')
+            RETURNING id
+        """)
+        client_user_id = cursor.fetchone()[0]
+        cursor.execute(
+            "INSERT INTO clients (user_id) VALUES (%s) RETURNING id",
+            [client_user_id]
+        )
+        client_id = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO seasonal_baskets (producer_id, name, discount_percentage,
+                                          original_price, discounted_price)
+            VALUES (%s, 'Weekly basket', 10, 2000, 1800)
+            RETURNING id
+        """, [producer_id])
+        basket_id = cursor.fetchone()[0]
+
+    subscription = queries.create_subscription(client_id, basket_id, 'pickup_producer')
+
+    return load_principal(client_user_id), subscription['id']
+
+
+def call(principal, actions, method='get', **kwargs):
+    request = getattr(APIRequestFactory(), method)('/api/my-subscriptions/')
+    force_authenticate(request, user=principal)
+    return MySubscriptionViewSet.as_view(actions)(request, **kwargs)
+
+
+# ============================================
+# SUBSCRIPTION VIEW QUERY TESTS
+# ============================================
+
+@pytest.mark.django_db
+class TestSubscriptionViewQueries:
+    """Test subscription views read the client profile id from the principal."""
+
+    def test_principal_carries_profile_ids(self, subscriber):
+        """Test the authenticated principal exposes its profile ids."""
+        principal, _ = subscriber
+
+        assert principal.client_id == principal.client_profile.id
+        assert principal.producer_id is None
+
+    def test_list_runs_one_query(self, subscriber, django_assert_num_queries):
+        """Test listing subscriptions does not reload the user."""
+        principal, subscription_id = subscriber
+
+        with django_assert_num_queries(1):
+            response = call(principal, {'get': 'list'})
+
+        assert response.status_code == 200
+        assert [s['id'] for s in response.data['subscriptions']] == [subscription_id]
+
+    @pytest.mark.parametrize('action, expected', [('pause', 'paused'), ('cancel', 'cancelled')])
+    def test_status_change_runs_one_query(self, subscriber, action, expected,
+                                          django_assert_num_queries):
+        """Test pause and cancel only run the status update."""
+        principal, subscription_id = subscriber
+
+        with django_assert_num_queries(1):
+            response = call(principal, {'post': action}, method='post', pk=subscription_id)
+
+        assert response.status_code == 200
+        assert response.data['subscription']['status'] == expected
@@ -1,6 +1,56 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+# Cache backends kept in memory and shared by every worker
+SHARED_CACHE_BACKENDS = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+)
+
+# Cache backends that only live in the process that wrote them
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+def check_stateless_tokens_cache():
+    """
+    Refuse stateless auth without a shared in-memory cache: a profile
+    version bumped by one worker would never reach the others, which would
+    keep accepting the claims of deactivated users. Every request reads
+    that version, which must not cost a query (DatabaseCache).
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.AUTH_STATELESS_TOKENS and backend not in SHARED_CACHE_BACKENDS:
+        raise ImproperlyConfigured(
+            f'AUTH_STATELESS_TOKENS needs a cache shared by every worker, not {backend}'
+        )
+
+
+def check_serving_cache():
+    """
+    Refuse to serve requests without a shared in-memory cache (config/wsgi.py).
+
+    Product details and principals read their version from the cache on
+    every request: with DatabaseCache each read is an SQL query and a bump
+    can be lost (its incr is a read then a write), with LocMemCache a write
+    handled by one worker never reaches the others. LocMemCache is accepted
+    with DEBUG (runserver, one process).
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if backend in SHARED_CACHE_BACKENDS or (settings.DEBUG and backend in LOCAL_CACHE_BACKENDS):
+        return
+    raise ImproperlyConfigured(
+        f'Serving needs a cache shared by every worker (set REDIS_URL), not {backend}'
+    )
 
 
 class UsersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "users"
+
+    def ready(self):
+        check_stateless_tokens_cache()
@@ -1,13 +1,47 @@
+from django.conf import settings
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from . import queries
+from .principal_cache import get_cached_principal, get_profile_version
+from .revocation import is_token_revoked
+
+
+class ProducerPrincipal:
+    """Producer profile fields carried by the authenticated user."""
+
+    __slots__ = ('id', 'shop_name', 'city', 'wilaya')
+
+    def __init__(self, profile):
+        self.id = profile['id']
+        self.shop_name = profile.get('shop_name')
+        self.city = profile.get('city')
+        self.wilaya = profile.get('wilaya')
+
+
+class ClientPrincipal:
+    """Client profile fields carried by the authenticated user."""
+
+    __slots__ = ('id', 'city', 'wilaya')
+
+    def __init__(self, profile):
+        self.id = profile['id']
+        self.city = profile.get('city')
+        self.wilaya = profile.get('wilaya')
 
 
 class CustomUser:
     """
     Custom user object to work with DRF permissions.
     Mimics Django's User model interface.
+
+    Instances are cached across requests (see principal_cache.py):
+    treat them as read-only.
     """
-    
+
+    __slots__ = (
+        'id', 'email', 'user_type', 'first_name', 'last_name', 'phone',
+        'is_active', 'is_verified', 'producer_profile', 'client_profile',
+    )
+
     def __init__(self, user_data):
         self.id = user_data['id']
         self.email = user_data['email']
@@ -17,60 +51,103 @@ class CustomUser:
         self.phone = user_data.get('phone')
         self.is_active = user_data['is_active']
         self.is_verified = user_data['is_verified']
-        
+
         # Store producer_profile data
         if user_data.get('producer_profile'):
-            self.producer_profile = type('obj', (object,), {
-                'id': user_data['producer_profile']['id'],
-                'shop_name': user_data['producer_profile']['shop_name'],
-                'city': user_data['producer_profile'].get('city'),
-                'wilaya': user_data['producer_profile'].get('wilaya'),
-            })()
+            self.producer_profile = ProducerPrincipal(user_data['producer_profile'])
         else:
             self.producer_profile = None
-        
+
         # Store client_profile data
         if user_data.get('client_profile'):
-            self.client_profile = type('obj', (object,), {
-                'id': user_data['client_profile']['id'],
-                'city': user_data['client_profile'].get('city'),
-                'wilaya': user_data['client_profile'].get('wilaya'),
-            })()
+            self.client_profile = ClientPrincipal(user_data['client_profile'])
         else:
             self.client_profile = None
-    
+
     @property
     def is_authenticated(self):
         """Always return True for authenticated users."""
         return True
-    
+
     @property
     def is_anonymous(self):
         """Always return False for authenticated users."""
         return False
-    
+
+    @property
+    def producer_id(self):
+        """Producer profile id, or None."""
+        return self.producer_profile.id if self.producer_profile else None
+
+    @property
+    def client_id(self):
+        """Client profile id, or None."""
+        return self.client_profile.id if self.client_profile else None
+
     def __str__(self):
         return f"{self.email} ({self.user_type})"
 
 
+def load_principal(user_id):
+    """Build the principal of an active user from raw SQL (None otherwise)."""
+    user_data = queries.get_user_by_id(user_id)
+
+    if not user_data or not user_data['is_active']:
+        return None
+
+    return CustomUser(queries.structure_user_data(user_data))
+
+
+def principal_from_claims(validated_token):
+    """
+    Build the principal from the claims of an access token.
+
+    Only valid while the token's profile_version is the user's current
+    one: any profile write or deactivation since the token was issued
+    returns None. Names, phone and shop details are not carried by the
+    token and are left empty.
+    """
+    version = validated_token.get('profile_version')
+    if version is None or not validated_token.get('is_active'):
+        return None
+
+    user_id = validated_token['user_id']
+    if get_profile_version(user_id) != version:
+        return None
+
+    producer_id = validated_token.get('producer_id')
+    client_id = validated_token.get('client_id')
+
+    return CustomUser({
+        'id': user_id,
+        'email': validated_token.get('email'),
+        'user_type': validated_token.get('user_type'),
+        'first_name': None,
+        'last_name': None,
+        'is_active': True,
+        'is_verified': None,
+        'producer_profile': {'id': producer_id} if producer_id else None,
+        'client_profile': {'id': client_id} if client_id else None,
+    })
+
+
 class CustomJWTAuthentication(JWTAuthentication):
     """Custom JWT authentication to use raw SQL queries."""
-    
+
     def get_user(self, validated_token):
         try:
-            user_id = validated_token['user_id']
-            
-            # Get user data from raw SQL
-            user_data = queries.get_user_by_id(user_id)
-            
-            if not user_data or not user_data['is_active']:
+            # Logged out, or issued before a password change / deactivation
+            if is_token_revoked(validated_token):
                 return None
-            
-            # Structure user data
-            user_structured = queries.structure_user_data(user_data)
-            
-            # Return CustomUser object
-            return CustomUser(user_structured)
-            
+
+            # Stateless mode: no lookup while the token's claims are current
+            if settings.AUTH_STATELESS_TOKENS:
+                user = principal_from_claims(validated_token)
+                if user is not None:
+                    return user
+
+            # Cached per user and profile version
+            return get_cached_principal(validated_token['user_id'], load_principal)
+
         except Exception:
-            return None
\ No newline at end of file
+            return None
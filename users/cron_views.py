@@ -0,0 +1,32 @@
+import os
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from django.http import JsonResponse
+from .password_pool import get_password_pool_stats
+from .principal_cache import get_principal_cache_stats
+from .revocation import get_revocation_stats
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def auth_stats(request):
+    """
+    Protected endpoint exposing the password pool queue depth and the
+    principal cache / token revocation counters of the process serving
+    the request.
+    """
+    
+    auth_header = request.headers.get('X-Cron-Secret')
+    expected_secret = os.getenv('CRON_SECRET_TOKEN', 'dz-fellah-secret-2025-anti-gaspi')
+    
+    if auth_header != expected_secret:
+        return JsonResponse({
+            'error': 'Unauthorized - Invalid cron secret'
+        }, status=403)
+    
+    return JsonResponse({
+        'success': True,
+        'password_pool': get_password_pool_stats(),
+        'principal_cache': get_principal_cache_stats(),
+        'revocation': get_revocation_stats()
+    }, status=200)
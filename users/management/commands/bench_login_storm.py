@@ -0,0 +1,169 @@
+"""
+Django management command to benchmark catalogue latency during a login storm
+Compares password checks in the request thread with the bounded password pool.
+
+Usage:
+    python manage.py bench_login_storm
+    python manage.py bench_login_storm --threads 4 --login-clients 32 --browse-clients 4 --duration 20
+
+Like one gunicorn gthread worker, requests are served by a fixed pool of
+--threads request threads: clients queue for a free thread, and the
+latencies below include that wait. Refused logins retry after RETRY_AFTER.
+
+Catalogue requests read the homepage sample of the current database;
+nothing is written.
+"""
+
+import queue
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from products import queries as product_queries
+from users import queries as user_queries
+from users.password_pool import PasswordPoolBusy, get_password_pool_stats
+
+
+# Retry-After of the 503 answered when the password pool is full (seconds)
+RETRY_AFTER = 1
+
+
+class Command(BaseCommand):
+    help = 'Benchmark catalogue p99 during a login storm (unbounded vs password pool)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=settings.WEB_THREADS,
+                            help='Request threads of the simulated gunicorn worker')
+        parser.add_argument('--login-clients', type=int, default=16,
+                            help='Clients logging in continuously')
+        parser.add_argument('--browse-clients', type=int, default=4,
+                            help='Clients reading the catalogue continuously')
+        parser.add_argument('--duration', type=float, default=10,
+                            help='Seconds per mode')
+
+    def handle(self, *args, **options):
+        self.stdout.write('🏁 DZ-Fellah Login Storm Benchmark')
+        self.stdout.write('='*60)
+        self.stdout.write(
+            f"🧵 {options['threads']} request threads, "
+            f"{options['login_clients']} login clients, "
+            f"{options['browse_clients']} catalogue clients, {options['duration']}s per mode"
+        )
+
+        stored = make_password('bench-password')
+        results = []
+
+        for name, login in (
+            ('request thread', lambda: check_password('bench-password', stored)),
+            ('password pool', lambda: user_queries.verify_password(stored, 'bench-password')),
+        ):
+            self.stdout.write(f'🔐 {name}...')
+            results.append((name, self.run_mode(login, options)))
+
+        self.stdout.write('\n' + '='*60)
+        self.stdout.write(self.style.SUCCESS('📊 RESULTS'))
+        self.stdout.write('='*60)
+        self.stdout.write(
+            f'{"mode":>15} | {"logins/s":>8} | {"503":>6} | {"login ms p50 / p99":>19} | '
+            f'{"pages/s":>7} | {"page ms p50 / p99":>18}'
+        )
+        for name, stats in results:
+            self.stdout.write(
+                f"{name:>15} | {stats['logins'] / options['duration']:>8.1f} | {stats['refused']:>6} | "
+                f"{self.fmt(stats['login_timings']):>19} | "
+                f"{len(stats['page_timings']) / options['duration']:>7.1f} | "
+                f"{self.fmt(stats['page_timings']):>18}"
+            )
+        self.stdout.write('='*60)
+        self.stdout.write(f'🧵 Pool: {get_password_pool_stats()}')
+
+    def run_mode(self, login, options):
+        """Run login and catalogue clients against a fixed pool of request threads."""
+        stop = time.perf_counter() + options['duration']
+        lock = threading.Lock()
+        stats = {'logins': 0, 'refused': 0, 'login_timings': [], 'page_timings': []}
+        pending = queue.Queue()
+
+        def request_thread():
+            # One gthread: serves queued requests one at a time
+            try:
+                while True:
+                    job = pending.get()
+                    if job is None:
+                        return
+                    handler, reply = job
+                    try:
+                        reply.put(handler())
+                    except Exception:
+                        reply.put(500)
+            finally:
+                # Each thread has its own connection
+                connection.close()
+
+        def login_request():
+            try:
+                login()
+                return 200
+            except PasswordPoolBusy:
+                return 503
+
+        def page_request():
+            product_queries.get_home_products(limit=20)
+            return 200
+
+        def login_client():
+            reply = queue.Queue()
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                pending.put((login_request, reply))
+                code = reply.get()
+                elapsed = (time.perf_counter() - start) * 1000
+
+                with lock:
+                    if code == 503:
+                        stats['refused'] += 1
+                    else:
+                        stats['logins'] += 1
+                        stats['login_timings'].append(elapsed)
+
+                if code == 503:
+                    # Clients honour Retry-After
+                    time.sleep(RETRY_AFTER)
+
+        def browse_client():
+            reply = queue.Queue()
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                pending.put((page_request, reply))
+                reply.get()
+                elapsed = (time.perf_counter() - start) * 1000
+
+                with lock:
+                    stats['page_timings'].append(elapsed)
+
+        servers = [threading.Thread(target=request_thread) for _ in range(options['threads'])]
+        clients = (
+            [threading.Thread(target=login_client) for _ in range(options['login_clients'])]
+            + [threading.Thread(target=browse_client) for _ in range(options['browse_clients'])]
+        )
+        for thread in servers + clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        for _ in servers:
+            pending.put(None)
+        for thread in servers:
+            thread.join()
+        return stats
+
+    def fmt(self, timings):
+        if not timings:
+            return '-'
+        p50 = statistics.median(timings)
+        p99 = sorted(timings)[min(len(timings) - 1, int(len(timings) * 0.99))]
+        return f'{p50:.2f} / {p99:.2f}'
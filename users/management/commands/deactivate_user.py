@@ -0,0 +1,26 @@
+"""
+Django management command to deactivate a user account
+Its access tokens stop authenticating at once.
+Usage: python manage.py deactivate_user user@example.com
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users import queries
+
+
+class Command(BaseCommand):
+    help = 'Deactivate a user account and revoke its access tokens'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', help='Email of the account')
+
+    def handle(self, *args, **options):
+        user = queries.get_user_by_email(options['email'])
+        if not user:
+            raise CommandError(f"No user with email {options['email']}")
+
+        if queries.deactivate_user(user['id']):
+            self.stdout.write(self.style.SUCCESS(f"✅ {options['email']} deactivated"))
+        else:
+            self.stdout.write(f"ℹ️ {options['email']} was already inactive")
@@ -0,0 +1,16 @@
+"""
+Django management command to delete revocations of expired tokens
+Usage: python manage.py purge_revoked_tokens
+"""
+
+from django.core.management.base import BaseCommand
+
+from users.revocation import purge_revoked_tokens
+
+
+class Command(BaseCommand):
+    help = 'Delete revoked_tokens rows whose tokens have all expired'
+
+    def handle(self, *args, **options):
+        deleted = purge_revoked_tokens()
+        self.stdout.write(self.style.SUCCESS(f'✅ {deleted} expired revocations deleted'))
@@ -0,0 +1,115 @@
+"""
+Bounded password hashing pool.
+
+Password hashing and verification (PBKDF2, tens of milliseconds of CPU)
+run on at most PASSWORD_HASH_WORKERS threads per process. Up to
+PASSWORD_HASH_QUEUE more calls may wait for a thread. Beyond that, or
+after waiting PASSWORD_HASH_TIMEOUT seconds, PasswordPoolBusy is raised
+and the view answers 503 at once: a login storm is refused instead of
+taking every worker thread and CPU core from catalogue requests.
+
+Running and waiting calls each block a request thread, so both limits
+are derived from settings.WEB_THREADS: together they stay at half of the
+request threads (1 running + 1 waiting with the default 4 threads).
+
+hashlib's PBKDF2 releases the GIL, so pool threads hash in parallel with
+request threads (gunicorn runs gthread workers).
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+
+# Password calls admitted per process (running + waiting)
+PASSWORD_HASH_CAPACITY = max(1, settings.WEB_THREADS // 2)
+
+# Threads hashing passwords, per process
+PASSWORD_HASH_WORKERS = max(1, PASSWORD_HASH_CAPACITY // 2)
+
+# Calls allowed to wait for a hashing thread
+PASSWORD_HASH_QUEUE = PASSWORD_HASH_CAPACITY - PASSWORD_HASH_WORKERS
+
+# Longest wait for a result before giving up (seconds)
+PASSWORD_HASH_TIMEOUT = 2.0
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS,
+                               thread_name_prefix='password-hash')
+_lock = threading.Lock()
+_stats = {
+    'in_flight': 0,
+    'max_in_flight': 0,
+    'submitted': 0,
+    'completed': 0,
+    'rejected': 0,
+    'timeouts': 0,
+    'wait_ms': 0.0,
+    'run_ms': 0.0,
+}
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when the password hashing pool cannot take more work."""
+
+
+def _run(function, args, queued_at):
+    started = time.perf_counter()
+    try:
+        return function(*args)
+    finally:
+        finished = time.perf_counter()
+        with _lock:
+            _stats['in_flight'] -= 1
+            _stats['completed'] += 1
+            _stats['wait_ms'] += (started - queued_at) * 1000
+            _stats['run_ms'] += (finished - started) * 1000
+
+
+def _call(function, *args):
+    """Run function(*args) on the pool and wait for its result."""
+    with _lock:
+        if _stats['in_flight'] >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE:
+            _stats['rejected'] += 1
+            raise PasswordPoolBusy()
+        _stats['in_flight'] += 1
+        _stats['submitted'] += 1
+        _stats['max_in_flight'] = max(_stats['max_in_flight'], _stats['in_flight'])
+
+    future = _executor.submit(_run, function, args, time.perf_counter())
+
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except FutureTimeout:
+        with _lock:
+            _stats['timeouts'] += 1
+            # Still queued: drop it and free its slot (a running call frees its own)
+            if future.cancel():
+                _stats['in_flight'] -= 1
+        raise PasswordPoolBusy()
+
+
+def hash_password(raw_password):
+    """make_password on the pool. Raises PasswordPoolBusy when overloaded."""
+    return _call(make_password, raw_password)
+
+
+def check_password_hash(raw_password, stored_password):
+    """check_password on the pool. Raises PasswordPoolBusy when overloaded."""
+    return _call(check_password, raw_password, stored_password)
+
+
+def get_password_pool_stats():
+    """Queue depth and timing counters of this process."""
+    with _lock:
+        stats = dict(_stats)
+
+    stats['workers'] = PASSWORD_HASH_WORKERS
+    stats['queued'] = max(0, stats['in_flight'] - PASSWORD_HASH_WORKERS)
+    completed = stats['completed']
+    wait_ms, run_ms = stats.pop('wait_ms'), stats.pop('run_ms')
+    stats['avg_wait_ms'] = round(wait_ms / completed, 2) if completed else None
+    stats['avg_run_ms'] = round(run_ms / completed, 2) if completed else None
+    return stats
@@ -0,0 +1,128 @@
+"""
+Authenticated principal cache.
+
+CustomJWTAuthentication.get_user runs on every authenticated request.
+Principals (CustomUser) are kept in a small in-process LRU, keyed by user
+id and stamped with the user's profile version, kept in the shared Django
+cache. Profile writes and deactivation bump the version, which makes every
+process drop its copy on the next request. A principal is also reloaded
+after PRINCIPAL_CACHE_TTL seconds, which bounds staleness when a version
+bump is lost (cache flush, rows edited by hand).
+
+A cache hit costs one shared cache read and no database query, since
+serving is refused unless that cache is in memory (Redis, see
+users/apps.py). The stateless path (principal_from_claims) costs the same
+single read.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+
+# Lifetime of a cached principal (seconds)
+PRINCIPAL_CACHE_TTL = 60
+
+# Principals kept in the in-process LRU
+PRINCIPAL_CACHE_SIZE = 4096
+
+_local = OrderedDict()  # user_id -> (version, expires_at, principal)
+_lock = threading.Lock()
+_stats = {
+    'hits': 0,
+    'misses': 0,
+    'invalidations': 0,
+}
+
+
+def _version_key(user_id):
+    return f'principal:version:{user_id}'
+
+
+def get_profile_version(user_id):
+    """Read the profile version of a user, creating one if the key is missing."""
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Never reuse a version, even if the version key was evicted
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def get_cached_principal(user_id, loader):
+    """
+    Return loader(user_id) through the in-process LRU.
+
+    The principal is shared between requests and must not be modified.
+    Missing or inactive users (None) are not cached.
+    """
+    user_id = int(user_id)
+    version = get_profile_version(user_id)
+    now = time.monotonic()
+
+    with _lock:
+        entry = _local.get(user_id)
+        if entry is not None and entry[0] == version and entry[1] > now:
+            _local.move_to_end(user_id)
+            _stats['hits'] += 1
+            return entry[2]
+        _stats['misses'] += 1
+
+    principal = loader(user_id)
+    if principal is None:
+        return None
+
+    with _lock:
+        _local[user_id] = (version, now + PRINCIPAL_CACHE_TTL, principal)
+        _local.move_to_end(user_id)
+        while len(_local) > PRINCIPAL_CACHE_SIZE:
+            _local.popitem(last=False)
+
+    return principal
+
+
+def _bump_version(user_id):
+    # A new value rather than incr: concurrent bumps cannot collapse into
+    # one value that a request has already cached a principal under
+    cache.set(_version_key(user_id), time.time_ns(), None)
+
+    with _lock:
+        _local.pop(user_id, None)
+        _stats['invalidations'] += 1
+
+
+def invalidate_principal(user_id):
+    """
+    Invalidate the cached principal of a user.
+
+    Runs immediately, and again after commit when called inside a
+    transaction, so a concurrent request cannot re-cache the old row.
+    """
+    user_id = int(user_id)
+
+    _bump_version(user_id)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump_version(user_id))
+
+
+def get_principal_cache_stats():
+    """Hit/miss counters of this process."""
+    with _lock:
+        stats = dict(_stats)
+        stats['local_size'] = len(_local)
+
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else None
+    return stats
+
+
+def clear_principal_cache():
+    """Empty the in-process LRU and reset counters (tests)."""
+    with _lock:
+        _local.clear()
+        for stat in _stats:
+            _stats[stat] = 0
@@ -1,5 +1,10 @@
 from django.db import connection
-from django.contrib.auth.hashers import make_password, check_password
+
+from db.search import headline_sql, similarity_rank_sql, substring_match_sql, tsquery_sql
+
+from .password_pool import check_password_hash, hash_password
+from .principal_cache import invalidate_principal
+from .revocation import revoke_user_tokens
 
 
 def dict_fetchall(cursor):
@@ -123,8 +128,9 @@ def create_user(email, password, user_type, first_name, last_name, phone=None):
     """
     Create a new user.
     PostgreSQL: Uses RETURNING clause to get created user data.
+    The password is hashed on the bounded password pool.
     """
-    hashed_password = make_password(password)
+    hashed_password = hash_password(password)
     
     sql = """
         INSERT INTO users (email, password, user_type, first_name, last_name, phone)
@@ -143,22 +149,43 @@ def create_user(email, password, user_type, first_name, last_name, phone=None):
 def verify_password(stored_password, raw_password):
     """
     Verify password against stored hash.
-    Uses Django's check_password for bcrypt/PBKDF2 verification.
+    Uses Django's check_password for bcrypt/PBKDF2 verification, on the
+    bounded password pool (raises PasswordPoolBusy when overloaded).
     """
-    return check_password(raw_password, stored_password)
+    return check_password_hash(raw_password, stored_password)
 
 
 def update_user_password(user_id, new_password):
     """
     Update user password.
     PostgreSQL: Hashes password before storing.
+    Tokens issued before the change stop authenticating.
     """
-    hashed_password = make_password(new_password)
+    hashed_password = hash_password(new_password)
     
     sql = "UPDATE users SET password = %s WHERE id = %s"
     
     with connection.cursor() as cursor:
         cursor.execute(sql, [hashed_password, user_id])
+    
+    revoke_user_tokens(user_id)
+
+
+def deactivate_user(user_id):
+    """
+    Deactivate a user account; its tokens stop authenticating.
+    Returns False if the user does not exist or was already inactive.
+    """
+    sql = "UPDATE users SET is_active = FALSE, updated_at = NOW() WHERE id = %s AND is_active"
+    
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id])
+        deactivated = cursor.rowcount > 0
+    
+    invalidate_principal(user_id)
+    if deactivated:
+        revoke_user_tokens(user_id)
+    return deactivated
 
 
 # ============================================
@@ -251,7 +278,10 @@ def update_producer_profile(user_id, updates):
     
     with connection.cursor() as cursor:
         cursor.execute(sql, params)
-        return dict_fetchone(cursor)
+        profile = dict_fetchone(cursor)
+    
+    invalidate_principal(user_id)
+    return profile
 >>>>>>> 33f7a2d22d51c7734ecadb4759a1c8c2dc77ec6b
 
 
@@ -318,7 +348,10 @@ def update_client_profile(user_id, updates):
     
     with connection.cursor() as cursor:
         cursor.execute(sql, params)
-        return dict_fetchone(cursor)
+        profile = dict_fetchone(cursor)
+    
+    invalidate_principal(user_id)
+    return profile
 >>>>>>> 33f7a2d22d51c7734ecadb4759a1c8c2dc77ec6b
 
 
@@ -327,47 +360,72 @@ def update_client_profile(user_id, updates):
 # ============================================
 
 <<<<<<< HEAD
-def get_all_producers(city=None, wilaya=None, is_bio_certified=None, search=None):  # ✅ ADD search
+def get_all_producers(city=None, wilaya=None, is_bio_certified=None, search=None,  # ✅ ADD search
+                      fuzzy=False):
 =======
 def get_all_producers(city=None, wilaya=None, is_bio_certified=None):
 >>>>>>> 33f7a2d22d51c7734ecadb4759a1c8c2dc77ec6b
     """
     Get all producers with optional filters - SINGLE QUERY.
-    PostgreSQL: Uses ILIKE for case-insensitive search.
+    PostgreSQL: Uses ILIKE for city/wilaya (trigram indexes), full-text
+    search (ts_rank) for search. With fuzzy=True, misspelled city, wilaya and
+    shop names also match and results are ordered by similarity.
     """
-    sql = """
+    producer_query, params = tsquery_sql(search)
+    if search and producer_query is None:
+        return []
+    
+    sql = f"""
+        WITH q AS (SELECT {producer_query or 'NULL::tsquery'} AS query)
         SELECT 
             p.id, p.shop_name, p.description, p.photo_url,
             p.address, p.city, p.wilaya, p.methods, p.is_bio_certified,
             p.created_at,
-            u.id as user_id, u.email, u.first_name, u.last_name, u.phone
+            u.id as user_id, u.email, u.first_name, u.last_name, u.phone,
+            COALESCE(ts_rank(p.search_vector, q.query), 0) as search_rank,
+            {headline_sql('p.shop_name', 'q.query')} as shop_name_highlight
         FROM producers p
         INNER JOIN users u ON p.user_id = u.id
+        CROSS JOIN q
         WHERE u.is_active = TRUE
     """
-    params = []
+    similarity_matches = []
     
 <<<<<<< HEAD
     # ✅ ADD THIS
-    if search:
-        sql += " AND p.shop_name ILIKE %s"
-        params.append(f'%{search}%')
+    if producer_query and fuzzy:
+        sql += " AND (p.search_vector @@ q.query OR %s <%% p.shop_name)"
+        params.append(search)
+        similarity_matches.append(('p.shop_name', search))
+    elif producer_query:
+        sql += " AND p.search_vector @@ q.query"
     
 =======
 >>>>>>> 33f7a2d22d51c7734ecadb4759a1c8c2dc77ec6b
     if city:
-        sql += " AND p.city ILIKE %s"
-        params.append(f'%{city}%')
+        match_sql, match_params = substring_match_sql('p.city', city, fuzzy)
+        sql += f" AND {match_sql}"
+        params.extend(match_params)
+        if fuzzy:
+            similarity_matches.append(('p.city', city))
     
     if wilaya:
-        sql += " AND p.wilaya ILIKE %s"
-        params.append(f'%{wilaya}%')
+        match_sql, match_params = substring_match_sql('p.wilaya', wilaya, fuzzy)
+        sql += f" AND {match_sql}"
+        params.extend(match_params)
+        if fuzzy:
+            similarity_matches.append(('p.wilaya', wilaya))
     
     if is_bio_certified is not None:
         sql += " AND p.is_bio_certified = %s"
         params.append(is_bio_certified)
     
-    sql += " ORDER BY p.created_at DESC"
+    if similarity_matches:
+        rank_sql, rank_params = similarity_rank_sql(similarity_matches)
+        sql += f" ORDER BY {rank_sql} DESC, search_rank DESC, p.created_at DESC"
+        params.extend(rank_params)
+    else:
+        sql += " ORDER BY search_rank DESC, p.created_at DESC"
     
     with connection.cursor() as cursor:
         cursor.execute(sql, params)
@@ -504,6 +562,8 @@ def update_user(user_id, **kwargs):
     
     with connection.cursor() as cursor:
         cursor.execute(sql, params)
+    
+    invalidate_principal(user_id)
 
 
 def update_client_profile(user_id, **kwargs):
@@ -530,6 +590,8 @@ def update_client_profile(user_id, **kwargs):
     
     with connection.cursor() as cursor:
         cursor.execute(sql, params)
+    
+    invalidate_principal(user_id)
 
 
 def update_producer_profile(user_id, **kwargs):
@@ -556,6 +618,8 @@ def update_producer_profile(user_id, **kwargs):
     
     with connection.cursor() as cursor:
         cursor.execute(sql, params)
+    
+    invalidate_principal(user_id)
 =======
     return user_data
 >>>>>>> 33f7a2d22d51c7734ecadb4759a1c8c2dc77ec6b
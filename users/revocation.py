@@ -0,0 +1,259 @@
+"""
+Access token revocation.
+
+Revocations are stored in revoked_tokens (db/schemas/05_schema_auth.sql):
+one row per token (logout) or per user (password change, deactivation:
+every token issued before the change).
+
+Each process mirrors the table in memory: revoked jtis in a Bloom filter,
+per-user cutoffs in a dict. The "not revoked" path is a few bit probes and
+a dict lookup; only a filter hit (a revoked token, or a rare false
+positive) is confirmed in the database.
+
+Processes poll the table itself at most every REVOCATION_POLL_INTERVAL
+seconds: a watermark (number and highest id of the rows above the last
+loaded id, minus an overlap) read from the primary key index. When it
+moves they load only those rows, so a revocation written by any worker is
+seen everywhere within a poll interval. The filter is rebuilt from scratch
+every REVOCATION_REBUILD_INTERVAL seconds, which drops expired rows.
+"""
+
+import hashlib
+import threading
+import time
+
+from django.db import connection
+from rest_framework_simplejwt.settings import api_settings
+
+
+# Seconds between two checks of the revocation watermark
+REVOCATION_POLL_INTERVAL = 1.0
+
+# Seconds between two full rebuilds of the filter
+REVOCATION_REBUILD_INTERVAL = 300
+
+# Ids re-read below the last loaded one, for revocations committed out of order
+REVOCATION_REFRESH_OVERLAP = 64
+
+# Bloom filter size: ~1% false positives up to 100k revoked tokens
+REVOCATION_BLOOM_BITS = 1 << 20
+REVOCATION_BLOOM_HASHES = 7
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter of strings (double hashing over blake2b)."""
+
+    __slots__ = ('bits', 'size', 'hashes')
+
+    def __init__(self, size=REVOCATION_BLOOM_BITS, hashes=REVOCATION_BLOOM_HASHES):
+        self.bits = bytearray(size // 8)
+        self.size = size
+        self.hashes = hashes
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+
+_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_state = {
+    'bloom': BloomFilter(),
+    'user_cutoffs': {},  # user_id -> tokens with iat below are revoked
+    'last_id': 0,
+    'watermark': None,
+    'polled_at': float('-inf'),
+    'rebuilt_at': float('-inf'),
+}
+_stats = {
+    'checks': 0,
+    'filter_hits': 0,
+    'false_positives': 0,
+    'revoked': 0,
+    'refreshes': 0,
+    'rebuilds': 0,
+}
+
+
+def _read_watermark(after_id):
+    """
+    (after_id, number of rows, highest id) of the rows with id > after_id.
+
+    The count catches rows committed out of order below the highest id.
+    Expired rows are counted too: they only leave the filter at a rebuild.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*), COALESCE(MAX(id), 0) FROM revoked_tokens WHERE id > %s",
+            [after_id]
+        )
+        return (after_id,) + tuple(cursor.fetchone())
+
+
+def _load_rows(after_id=None):
+    """Unexpired rows, all of them or those with id > after_id."""
+    sql = """
+        SELECT id, jti, user_id, floor(extract(epoch FROM issued_before))::bigint
+        FROM revoked_tokens
+        WHERE expires_at > now()
+    """
+    params = []
+    if after_id is not None:
+        sql += " AND id > %s"
+        params.append(after_id)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql + " ORDER BY id", params)
+        return cursor.fetchall()
+
+
+def _apply(rows, bloom, user_cutoffs):
+    for _, jti, user_id, issued_before in rows:
+        if jti:
+            bloom.add(jti)
+        if issued_before is not None:
+            user_cutoffs[user_id] = max(user_cutoffs.get(user_id, 0), issued_before)
+
+
+def _refresh():
+    """Poll the database watermark; load new rows or rebuild when needed."""
+    now = time.monotonic()
+    if now - _state['polled_at'] < REVOCATION_POLL_INTERVAL:
+        return
+
+    # One refreshing thread per process; others keep using the current filter
+    if not _refresh_lock.acquire(blocking=False):
+        return
+
+    try:
+        _state['polled_at'] = now
+
+        if now - _state['rebuilt_at'] >= REVOCATION_REBUILD_INTERVAL:
+            rows = _load_rows()
+            bloom, user_cutoffs = BloomFilter(), {}
+            _apply(rows, bloom, user_cutoffs)
+
+            with _lock:
+                _state['bloom'] = bloom
+                _state['user_cutoffs'] = user_cutoffs
+                _state['last_id'] = rows[-1][0] if rows else 0
+                # Rows committed during the load are picked up by the next poll
+                _state['watermark'] = None
+                _state['rebuilt_at'] = now
+                _stats['rebuilds'] += 1
+            return
+
+        after_id = max(0, _state['last_id'] - REVOCATION_REFRESH_OVERLAP)
+        # Read before the rows: a row committed in between moves the next one
+        watermark = _read_watermark(after_id)
+        if watermark == _state['watermark']:
+            return
+
+        rows = _load_rows(after_id)
+
+        with _lock:
+            _apply(rows, _state['bloom'], _state['user_cutoffs'])
+            if rows:
+                _state['last_id'] = max(_state['last_id'], rows[-1][0])
+            _state['watermark'] = watermark
+            _stats['refreshes'] += 1
+    finally:
+        _refresh_lock.release()
+
+
+def is_token_revoked(validated_token):
+    """Whether a validated access token has been revoked."""
+    _refresh()
+
+    jti = validated_token.get(api_settings.JTI_CLAIM)
+    user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+
+    with _lock:
+        _stats['checks'] += 1
+        cutoff = _state['user_cutoffs'].get(user_id)
+        # Tokens without iat predate the cutoff
+        if cutoff is not None and validated_token.get('iat', 0) < cutoff:
+            _stats['revoked'] += 1
+            return True
+        if not jti or jti not in _state['bloom']:
+            return False
+        _stats['filter_hits'] += 1
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM revoked_tokens WHERE jti = %s)", [jti])
+        revoked = cursor.fetchone()[0]
+
+    with _lock:
+        _stats['revoked' if revoked else 'false_positives'] += 1
+    return revoked
+
+
+def revoke_token(jti, user_id, expires_at):
+    """
+    Revoke one access token (logout).
+    expires_at: the token's exp claim (epoch seconds).
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO revoked_tokens (jti, user_id, expires_at)
+            VALUES (%s, %s, to_timestamp(%s))
+            ON CONFLICT (jti) DO NOTHING
+        """, [jti, user_id, expires_at])
+
+
+def revoke_user_tokens(user_id):
+    """
+    Revoke every access token of a user issued before now
+    (password change, deactivation).
+
+    Tokens issued within the same second as the revocation stay valid,
+    so tokens handed out by the request making the change keep working.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO revoked_tokens (user_id, issued_before, expires_at)
+            VALUES (%s, clock_timestamp(), clock_timestamp() + make_interval(secs => %s))
+        """, [user_id, api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()])
+
+
+def purge_revoked_tokens():
+    """Delete rows whose tokens have all expired. Returns the number deleted."""
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM revoked_tokens WHERE expires_at <= now()")
+        return cursor.rowcount
+
+
+def get_revocation_stats():
+    """Revocation check counters of this process."""
+    with _lock:
+        stats = dict(_stats)
+        stats['user_cutoffs'] = len(_state['user_cutoffs'])
+        stats['last_id'] = _state['last_id']
+    return stats
+
+
+def reset_revocation_filter():
+    """Drop the in-memory mirror and reset counters (tests)."""
+    with _lock:
+        _state.update({
+            'bloom': BloomFilter(),
+            'user_cutoffs': {},
+            'last_id': 0,
+            'watermark': None,
+            'polled_at': float('-inf'),
+            'rebuilt_at': float('-inf'),
+        })
+        for stat in _stats:
+            _stats[stat] = 0
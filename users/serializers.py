@@ -18,6 +18,10 @@ class ProducerProfileSerializer(serializers.Serializer):
     methods = serializers.CharField(allow_null=True, required=False, allow_blank=True)
     is_bio_certified = serializers.BooleanField(default=False)
     created_at = serializers.DateTimeField(read_only=True)
+    
+    # Full-text search results only
+    search_rank = serializers.FloatField(read_only=True, required=False)
+    shop_name_highlight = serializers.CharField(read_only=True, required=False, allow_null=True)
 
 
 class ClientProfileSerializer(serializers.Serializer):
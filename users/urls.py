@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import AuthViewSet, UserViewSet, ProducerViewSet
+from .cron_views import auth_stats
 
 # Create router
 router = DefaultRouter()
@@ -12,4 +13,5 @@ router.register(r'producers', ProducerViewSet, basename='producer')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('cron/auth-stats/', auth_stats, name='cron_auth_stats'),
 ]
\ No newline at end of file
@@ -18,14 +18,28 @@ from .serializers import (
     ClientProfileSerializer
 )
 from .authentication import CustomJWTAuthentication
+from .password_pool import PasswordPoolBusy
+from .principal_cache import get_profile_version
+from .revocation import revoke_token
 
 
 def get_tokens_for_user(user_data):
-    """Generate JWT tokens for user."""
+    """
+    Generate JWT tokens for user.
+    Profile ids, is_active and profile_version let CustomJWTAuthentication
+    skip the user lookup when AUTH_STATELESS_TOKENS is on.
+    """
+    producer_profile = user_data.get('producer_profile')
+    client_profile = user_data.get('client_profile')
+    
     refresh = RefreshToken()
     refresh['user_id'] = user_data['id']
     refresh['email'] = user_data['email']
     refresh['user_type'] = user_data['user_type']
+    refresh['producer_id'] = producer_profile['id'] if producer_profile else None
+    refresh['client_id'] = client_profile['id'] if client_profile else None
+    refresh['is_active'] = user_data['is_active']
+    refresh['profile_version'] = get_profile_version(user_data['id'])
     
     return {
         'refresh': str(refresh),
@@ -33,6 +47,13 @@ def get_tokens_for_user(user_data):
     }
 
 
+def password_pool_busy_response():
+    """Fast 503 when the password hashing pool is saturated."""
+    return Response({
+        'error': 'Too many login attempts, please retry in a moment'
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': '1'})
+
+
 class AuthViewSet(viewsets.ViewSet):
     """
     ViewSet for authentication operations.
@@ -95,6 +116,9 @@ class AuthViewSet(viewsets.ViewSet):
                     'tokens': tokens
                 }, status=status.HTTP_201_CREATED)
         
+        except PasswordPoolBusy:
+            return password_pool_busy_response()
+        
         except Exception as e:
             return Response({
                 'error': f'Registration failed: {str(e)}'
@@ -149,6 +173,9 @@ class AuthViewSet(viewsets.ViewSet):
                     'tokens': tokens
                 }, status=status.HTTP_201_CREATED)
         
+        except PasswordPoolBusy:
+            return password_pool_busy_response()
+        
         except Exception as e:
             return Response({
                 'error': f'Registration failed: {str(e)}'
@@ -176,8 +203,13 @@ class AuthViewSet(viewsets.ViewSet):
                 'error': 'Invalid email or password'
             }, status=status.HTTP_401_UNAUTHORIZED)
         
-        # Verify password
-        if not queries.verify_password(user_data['password'], password):
+        # Verify password (bounded pool, 503 when saturated)
+        try:
+            password_ok = queries.verify_password(user_data['password'], password)
+        except PasswordPoolBusy:
+            return password_pool_busy_response()
+        
+        if not password_ok:
             return Response({
                 'error': 'Invalid email or password'
             }, status=status.HTTP_401_UNAUTHORIZED)
@@ -204,8 +236,11 @@ class AuthViewSet(viewsets.ViewSet):
     def logout(self, request):
         """
         POST /api/auth/logout/
-        Logout user (client-side should delete tokens).
+        Logout user: the access token used for this request is revoked
+        (client-side should still delete tokens).
         """
+        revoke_token(request.auth['jti'], request.user.id, request.auth['exp'])
+        
         return Response({
             'message': 'Logged out successfully'
         }, status=status.HTTP_200_OK)
@@ -282,13 +317,14 @@ class UserViewSet(viewsets.ViewSet):
                     updates['email'] = request.data['email']
                 if 'phone' in request.data:
                     updates['phone'] = request.data['phone']
-                if 'password' in request.data:
-                    from django.contrib.auth.hashers import make_password
-                    updates['password'] = make_password(request.data['password'])
                 
                 if updates:
                     queries.update_user(user_id, **updates)
                 
+                # Revokes the tokens issued before the change
+                if 'password' in request.data:
+                    queries.update_user_password(user_id, request.data['password'])
+                
                 # Update profile based on user type
                 if user_data['user_type'] == 'client':
                     profile_updates = {}
@@ -351,10 +387,19 @@ class UserViewSet(viewsets.ViewSet):
                 updated_user_data = queries.get_user_by_id(user_id)
                 user_structured = queries.structure_user_data(updated_user_data)
                 
-                return Response({
+                response_data = {
                     'message': 'Profile updated successfully',
                     'user': UserSerializer(user_structured).data
-                }, status=status.HTTP_200_OK)
+                }
+                
+                # The token of this request was just revoked
+                if 'password' in request.data:
+                    response_data['tokens'] = get_tokens_for_user(user_structured)
+                
+                return Response(response_data, status=status.HTTP_200_OK)
+        
+        except PasswordPoolBusy:
+            return password_pool_busy_response()
         
         except Exception as e:
             import traceback
@@ -385,6 +430,7 @@ class ProducerViewSet(viewsets.ViewSet):
         """
 <<<<<<< HEAD
         search = request.query_params.get('search') 
+        fuzzy = request.query_params.get('fuzzy', '').lower() == 'true'
 =======
 >>>>>>> 33f7a2d22d51c7734ecadb4759a1c8c2dc77ec6b
         city = request.query_params.get('city')
@@ -395,6 +441,7 @@ class ProducerViewSet(viewsets.ViewSet):
         producers = queries.get_all_producers(
 <<<<<<< HEAD
             search=search,
+            fuzzy=fuzzy,
 =======
 >>>>>>> 33f7a2d22d51c7734ecadb4759a1c8c2dc77ec6b
             city=city,
@@ -409,6 +456,7 @@ class ProducerViewSet(viewsets.ViewSet):
             'filters': {
 <<<<<<< HEAD
                 'search': search,
+                'fuzzy': fuzzy,
 =======
 >>>>>>> 33f7a2d22d51c7734ecadb4759a1c8c2dc77ec6b
                 'city': city,